@@ -0,0 +1,100 @@
+"""
+Benchmark del almacenamiento de reservas
+Compara el almacenamiento en memoria con SQLite: reservas por segundo con
+varios hilos concurrentes y latencia de búsqueda de reservas por código.
+
+Uso:
+    python -m benchmarks.bench_booking_store
+    python -m benchmarks.bench_booking_store --threads 16 --bookings 500
+"""
+
+import argparse
+import copy
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from data.booking_store import MemoryBookingStore, SQLiteBookingStore
+from data.confirmation_codes import ConfirmationCodeAllocator
+from data.flights import ALTERNATIVE_FLIGHTS
+from data.inventory import SeatInventory
+
+
+def percentile(values, pct: float) -> float:
+    """Percentil simple (valores ordenados, índice más cercano)"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_benchmark(name: str, store, threads: int, bookings_per_thread: int, lookups: int):
+    """Medir throughput de reservas y latencia de búsqueda de un almacenamiento"""
+    allocator = ConfirmationCodeAllocator(store.next_code_block)
+    flight_numbers = list(ALTERNATIVE_FLIGHTS)
+    codes = []
+    codes_lock = threading.Lock()
+
+    def book():
+        created = []
+        for idx in range(bookings_per_thread):
+            booking = {
+                "confirmation_code": None,
+                "passenger_name": f"Pasajero {idx}",
+                "flight_number": random.choice(flight_numbers),
+                "flight_details": None,
+                "booking_date": datetime.now().isoformat(),
+                "status": "CONFIRMED"
+            }
+            if store.add_booking(booking, allocator.next_code):
+                created.append(booking["confirmation_code"])
+        with codes_lock:
+            codes.extend(created)
+
+    workers = [threading.Thread(target=book) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for code in random.choices(codes, k=lookups):
+        lookup_start = time.perf_counter()
+        store.get_booking(code)
+        latencies.append((time.perf_counter() - lookup_start) * 1_000_000)
+
+    print(f"\n{name}")
+    print(f"  Reservas: {len(codes)} en {elapsed:.2f} s -> {len(codes) / elapsed:,.0f} reservas/s")
+    print(
+        f"  Búsqueda por código: p50 {statistics.median(latencies):.1f} µs, "
+        f"p99 {percentile(latencies, 99):.1f} µs"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del almacenamiento de reservas")
+    parser.add_argument("--threads", type=int, default=8, help="Hilos que reservan en paralelo")
+    parser.add_argument("--bookings", type=int, default=250, help="Reservas por hilo")
+    parser.add_argument("--lookups", type=int, default=5000, help="Búsquedas por código")
+    args = parser.parse_args()
+
+    # Copia de los vuelos con asientos de sobra para medir sin agotar cupos
+    flights = copy.deepcopy(ALTERNATIVE_FLIGHTS)
+    for flight in flights.values():
+        flight["available_seats"] = 10 ** 9
+
+    memory_store = MemoryBookingStore(flights, {}, SeatInventory(flights))
+    run_benchmark("Memoria", memory_store, args.threads, args.bookings, args.lookups)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_store = SQLiteBookingStore(os.path.join(tmp_dir, "bookings.sqlite"), flights)
+        run_benchmark("SQLite (WAL, commits agrupados)", sqlite_store, args.threads,
+                      args.bookings, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark del matcher de keywords del StateManager
+Compara, sobre respuestas largas del agente:
+
+- Anterior: `.lower()` + un `any(keyword in texto)` por lista, listas armadas en cada llamada
+- Regex: una alternación compilada por categoría, `search()` sobre el texto en minúsculas
+- KeywordMatcher: una sola alternación anclada en el carácter más raro de
+  cada keyword, recorrida una vez sobre el texto original
+
+y verifica que las tres detecten las mismas categorías. La columna `lower()`
+es solo el costo de pasar el texto a minúsculas, que pagan la implementación
+anterior y la regex por categoría: en respuestas largas con emojis es la
+mayor parte de su tiempo. El matcher no lo necesita.
+
+Uso:
+    python -m benchmarks.bench_keyword_matcher
+    python -m benchmarks.bench_keyword_matcher --sizes 1 10 50 --iterations 2000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from data.flights import find_alternatives
+from tools.flight_tools import _format_alternatives
+from utils.state_manager import AGENT_KEYWORDS, AGENT_MATCHER, USER_KEYWORDS, USER_MATCHER
+
+FILLER_WORDS = [
+    "su", "pasajero", "horario", "salida", "aeropuerto", "equipaje", "documento",
+    "llegue", "anticipación", "clase", "economy", "destino", "lima", "gracias"
+]
+
+
+def legacy_match(text: str, categories: dict) -> frozenset:
+    """Implementación anterior: bajar a minúsculas y recorrer cada lista"""
+    text_lower = text.lower()
+    return frozenset(
+        category for category, keywords in categories.items()
+        if any(keyword in text_lower for keyword in list(keywords))
+    )
+
+
+def make_regex_match(categories: dict):
+    """Una alternación compilada por categoría, con search() (corta en el primer match)"""
+    patterns = tuple(
+        (category, re.compile("|".join(map(re.escape, sorted({k.lower() for k in keywords},
+                                                             key=len, reverse=True)))))
+        for category, keywords in categories.items()
+    )
+
+    def regex_match(text: str) -> frozenset:
+        text = text.lower()
+        return frozenset(category for category, pattern in patterns if pattern.search(text))
+
+    return regex_match
+
+
+def build_responses(size: int, count: int, rng: random.Random) -> list:
+    """Respuestas largas del agente: listados de alternativas + texto de relleno"""
+    listing = _format_alternatives(find_alternatives("ITTI-FLY-001"))
+    responses = []
+    for _ in range(count):
+        filler = " ".join(rng.choice(FILLER_WORDS) for _ in range(80 * size))
+        # La mitad sin keywords de resolución (el peor caso: hay que recorrer todo)
+        ending = "¡Reserva Confirmada! Código de Confirmación: ITTI-ABC123" if rng.random() < 0.5 else ""
+        responses.append("\n".join([listing] * size) + "\n" + filler + "\n" + ending)
+    return responses
+
+
+def time_per_call(func, texts: list, iterations: int) -> float:
+    """Microsegundos promedio por llamada"""
+    start = time.perf_counter()
+    for idx in range(iterations):
+        func(texts[idx % len(texts)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def compare(label: str, texts: list, categories: dict, matcher, iterations: int) -> tuple:
+    """Verificar que coincidan y medir las tres implementaciones"""
+    regex_match = make_regex_match(categories)
+    for text in texts:
+        expected = legacy_match(text, categories)
+        assert matcher.match(text) == expected, text[:80]
+        assert regex_match(text) == expected, text[:80]
+
+    return (
+        label,
+        time_per_call(str.lower, texts, iterations),
+        time_per_call(lambda text: legacy_match(text, categories), texts, iterations),
+        time_per_call(regex_match, texts, iterations),
+        time_per_call(matcher.match, texts, iterations)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del matcher de keywords")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 20],
+                        help="Repeticiones del listado de alternativas por respuesta")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_messages = ["2", "quiero ver los vuelos", "prefiero el reembolso", "sí, confirmo",
+                     "me devuelvan la plata", "MUÉSTRAME las opciones disponibles"]
+
+    rows = [compare("usuario (corto)", user_messages, USER_KEYWORDS, USER_MATCHER, args.iterations)]
+    for size in args.sizes:
+        responses = build_responses(size, 20, rng)
+        avg_chars = sum(len(response) for response in responses) // len(responses)
+        rows.append(compare(f"agente ~{avg_chars} car.", responses, AGENT_KEYWORDS, AGENT_MATCHER,
+                            args.iterations))
+
+    print(f"{'Texto':<22} {'lower() (µs)':>13} {'Anterior (µs)':>14} {'Regex (µs)':>11} "
+          f"{'Matcher (µs)':>13} {'Mejora':>8}")
+    for label, lower_us, legacy_us, regex_us, matcher_us in rows:
+        print(f"{label:<22} {lower_us:>13.1f} {legacy_us:>14.1f} {regex_us:>11.1f} {matcher_us:>13.1f} "
+              f"{legacy_us / matcher_us:>7.2f}x")
+
+    print("\n✅ Las tres implementaciones detectan las mismas categorías")
+
+
+if __name__ == "__main__":
+    main()
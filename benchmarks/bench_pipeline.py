@@ -0,0 +1,342 @@
+"""
+Benchmark end-to-end del pipeline del agente (sin red)
+Recorre conversaciones completas con los mismos pasos por turno que bot.py
+(y que benchmarks/eval_prompts.py): mensaje del sistema con las
+instrucciones del estado, router previo al LLM (FAST_PATH_ROUTER_ENABLED),
+contexto acotado (CONTEXT_MANAGEMENT_ENABLED), agente ReAct con el conteo de
+tokens del turno, herramientas y StateManager. Usa ScriptedChatModel en
+lugar de ChatOpenAI y mide la latencia de cada turno separada por etapa:
+
+- prompt: mensaje del sistema, router y armado de los mensajes (ventana + resumen)
+- llm: tiempo dentro del modelo (simulado: --llm-latency-ms)
+- tools: ejecución de herramientas (data-layer incluido)
+- graph: overhead de LangGraph (total del agente - llm - tools)
+- fsm: extracción de eventos + StateManager.update_state
+
+Quedan afuera: el render en streaming (el agente se llama con invoke/ainvoke),
+el presupuesto de tokens de la sesión, trazas, métricas y logs. El resumen
+del contexto es la transcripción de los turnos que salen de la ventana (sin
+llamar al modelo, como el modo simulado de eval_prompts).
+
+Uso:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --conversations 50 --async --checkpoint
+    python -m benchmarks.bench_pipeline --json resultados.json
+    python -m benchmarks.bench_pipeline --baseline resultados.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from benchmarks.fake_chat_model import ScriptedChatModel, passenger_policy
+from config.settings import (
+    CONTEXT_MANAGEMENT_ENABLED, CONTEXT_MAX_TURNS, CONTEXT_TOKEN_BUDGET, FAST_PATH_ROUTER_ENABLED,
+    PROMPT_VARIANT, SYSTEM_MESSAGE_ID, get_cancelled_flight_data
+)
+from data.flights import ALTERNATIVE_FLIGHTS, FLIGHT_ALTERNATIVES_MAP
+from prompts.system_prompt import get_cancellation_notification, get_state_instructions, get_system_message
+from tools.flight_tools import TOOL_RESULT_CACHE, get_flight_tools
+from utils.agent_factory import build_agent_executor, get_checkpointer
+from utils.agent_stream import get_turn_tool_events
+from utils.background_loop import run_in_background_loop
+from utils.context_manager import ConversationContext, format_transcript
+from utils.router import route_turn
+from utils.state_manager import StateManager
+from utils.token_usage import TokenUsageHandler
+
+STAGES = ("prompt", "llm", "tools", "graph", "fsm", "total")
+
+SCENARIO_NAMES = ("rebooking", "reembolso", "consulta")
+
+
+def build_scenarios(cancelled_flight_number: str) -> Dict[str, List[str]]:
+    """Conversaciones de los flujos principales (mensajes del pasajero)"""
+    chosen_flight = FLIGHT_ALTERNATIVES_MAP[cancelled_flight_number][0]
+    return {
+        "rebooking": [
+            "Quiero ver los vuelos alternativos",
+            f"Quiero el vuelo {chosen_flight}",
+            "Sí, confirmo",
+        ],
+        "reembolso": [
+            "Prefiero el reembolso",
+            "Sí, confirmo el reembolso",
+        ],
+        "consulta": [
+            "¿Cuál es el estado de mi vuelo?",
+            "Quiero ver las alternativas",
+        ],
+    }
+
+
+def percentile(values, pct: float) -> float:
+    """Percentil simple (valores ordenados, índice más cercano)"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class StageTimer(BaseCallbackHandler):
+    """Acumula el tiempo pasado en el modelo y en las herramientas durante un turno"""
+
+    # Ejecutar en el mismo hilo también en ainvoke (si no, el tiempo incluye el salto al executor)
+    run_inline = True
+
+    def __init__(self):
+        self.llm = 0.0
+        self.tools = 0.0
+        self._started: Dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.llm += time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self.tools += time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+def set_system_message(messages: List[BaseMessage], passenger_name: str, flight_number: str,
+                       state_manager: StateManager, variant: str = PROMPT_VARIANT):
+    """
+    Armar el mensaje del sistema como bot.py en cada rerun (prefijo, datos del
+    pasajero e instrucciones del estado del FSM) y dejarlo primero en `messages`.
+    """
+    flight = get_cancelled_flight_data(flight_number)
+    system_message = SystemMessage(content=get_system_message(
+        passenger_name, flight_number, flight["origin"], flight["destination"], flight["reason"], variant
+    ) + get_state_instructions(
+        state_manager.needs_confirmation(), state_manager.is_final_state()
+    ), id=SYSTEM_MESSAGE_ID)
+    if messages and isinstance(messages[0], SystemMessage):
+        messages[0] = system_message
+    else:
+        messages.insert(0, system_message)
+
+
+def transcript_summarizer(previous_summary: str, messages: List[BaseMessage]) -> str:
+    """Resumen sin red: la transcripción de los turnos que salen de la ventana"""
+    return "\n".join(filter(None, [previous_summary, format_transcript(messages)]))
+
+
+def reset_seats(initial_seats: Dict[str, int]):
+    """Restaurar los asientos entre conversaciones (y el caché que los refleja)"""
+    for number, seats in initial_seats.items():
+        ALTERNATIVE_FLIGHTS[number]["available_seats"] = seats
+    TOOL_RESULT_CACHE.clear()
+
+
+def run_conversation(agent_executor, turns: List[str], flight_number: str,
+                     use_async: bool, use_checkpoint: bool) -> List[dict]:
+    """
+    Ejecutar una conversación completa con los pasos por turno de bot.py.
+
+    Returns:
+        Por turno: tiempos por etapa (segundos), ruta y tokens de entrada
+    """
+    flight = get_cancelled_flight_data(flight_number)
+    passenger_name = "Pasajero Benchmark"
+    state_manager = StateManager()
+    context: Optional[ConversationContext] = None
+    if CONTEXT_MANAGEMENT_ENABLED:
+        context = ConversationContext(transcript_summarizer, CONTEXT_MAX_TURNS, CONTEXT_TOKEN_BUDGET)
+    messages = [AIMessage(content=get_cancellation_notification(
+        passenger_name, flight_number, flight["destination"], flight["reason"]
+    ))]
+    synced_count, synced_system = 0, None
+    thread_id = uuid.uuid4().hex
+    timings = []
+
+    for user_input in turns:
+        timer = StageTimer()
+        token_usage = TokenUsageHandler()
+        callbacks = [timer, token_usage]
+        start = time.perf_counter()
+
+        # Etapa prompt: mensaje del sistema, router y mensajes a enviar (igual que bot.py)
+        set_system_message(messages, passenger_name, flight_number, state_manager)
+        messages.append(HumanMessage(content=user_input))
+        routed_turn = None
+        if FAST_PATH_ROUTER_ENABLED:
+            routed_turn = route_turn(user_input, messages, state_manager, flight_number)
+
+        config = {"callbacks": callbacks}
+        if use_checkpoint:
+            # Solo los mensajes nuevos (y el del sistema si cambió); el resto sale del checkpoint
+            agent_messages = messages[synced_count:]
+            if synced_count > 0 and synced_system != messages[0].content:
+                agent_messages = [messages[0]] + agent_messages
+            config["configurable"] = {"thread_id": thread_id, "conversation_context": context}
+        elif context is not None and routed_turn is None:
+            agent_messages = context.build(messages, config=config)
+        else:
+            agent_messages = messages
+        prompt_done = time.perf_counter()
+
+        # Etapa agente (llm + tools + overhead del grafo); el router no llama al agente
+        if routed_turn is not None:
+            response, events = routed_turn.response, []
+            if use_checkpoint:
+                agent_executor.update_state(
+                    config, {"messages": agent_messages + [AIMessage(content=response)]}, as_node="agent"
+                )
+        else:
+            if use_async:
+                # Como bot.py: el único event loop de fondo del proceso
+                result = run_in_background_loop(
+                    agent_executor.ainvoke({"messages": agent_messages}, config=config)
+                )
+            else:
+                result = agent_executor.invoke({"messages": agent_messages}, config=config)
+            response, events = result["messages"][-1].content, get_turn_tool_events(result["messages"])
+        agent_done = time.perf_counter()
+
+        # Etapa FSM
+        state_manager.update_state(user_input, response, events=events)
+        messages.append(AIMessage(content=response))
+        synced_count, synced_system = len(messages), messages[0].content
+        end = time.perf_counter()
+
+        agent_time = agent_done - prompt_done
+        timings.append({
+            "prompt": prompt_done - start,
+            "llm": timer.llm,
+            "tools": timer.tools,
+            "graph": max(0.0, agent_time - timer.llm - timer.tools),
+            "fsm": end - agent_done,
+            "total": end - start,
+            "route": routed_turn.route if routed_turn is not None else "agent",
+            "input_tokens": token_usage.input_tokens,
+        })
+
+    return timings
+
+
+def summarize(samples: List[dict]) -> Dict[str, dict]:
+    """Media, p50, p95 y máximo por etapa (milisegundos)"""
+    summary = {}
+    for stage in STAGES:
+        values = [sample[stage] * 1000 for sample in samples]
+        summary[stage] = {
+            "mean": statistics.mean(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": max(values),
+        }
+    return summary
+
+
+def compare_with_baseline(summary: Dict[str, dict], baseline_path: str, tolerance: float) -> bool:
+    """
+    Comparar el p50 de cada etapa con una corrida guardada.
+
+    Returns:
+        True si ninguna etapa empeoró más que `tolerance` (ej: 0.25 = 25%)
+    """
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["summary"]
+
+    ok = True
+    print(f"\nComparación con {baseline_path} (p50, tolerancia {tolerance:.0%}):")
+    for stage in STAGES:
+        before, now = baseline[stage]["p50"], summary[stage]["p50"]
+        # Etapas de fracciones de ms: no marcar ruido como regresión
+        regressed = now > before * (1 + tolerance) and now - before > 0.05
+        ok = ok and not regressed
+        mark = "❌" if regressed else "✅"
+        print(f"  {mark} {stage:<7} {before:8.3f} ms → {now:8.3f} ms")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end del pipeline del agente (offline)")
+    parser.add_argument("--conversations", type=int, default=20, help="Conversaciones por escenario")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIO_NAMES), choices=SCENARIO_NAMES)
+    parser.add_argument("--flight", default="ITTI-FLY-003", help="Vuelo cancelado del escenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latencia simulada del modelo")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Usar ainvoke")
+    parser.add_argument("--checkpoint", action="store_true", help="Checkpointer SQLite (solo mensajes nuevos)")
+    parser.add_argument("--json", help="Guardar los resultados en un archivo JSON")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(args.flight)
+    model = ScriptedChatModel(script=passenger_policy, latency=args.llm_latency_ms / 1000)
+    checkpointer = None
+    if args.checkpoint:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="bench-pipeline-"), "checkpoints.sqlite")
+        checkpointer = get_checkpointer(db_path)
+    agent_executor = build_agent_executor(model, get_flight_tools(), checkpointer)
+
+    initial_seats = {number: flight["available_seats"] for number, flight in ALTERNATIVE_FLIGHTS.items()}
+
+    # Calentamiento (imports perezosos, compilación de regex, cachés de LangChain)
+    run_conversation(agent_executor, scenarios["rebooking"], args.flight, args.use_async, args.checkpoint)
+
+    samples: List[dict] = []
+    per_turn: Dict[str, List[dict]] = {}
+    start = time.perf_counter()
+    for scenario in args.scenarios:
+        for _ in range(args.conversations):
+            reset_seats(initial_seats)
+            timings = run_conversation(agent_executor, scenarios[scenario], args.flight,
+                                       args.use_async, args.checkpoint)
+            samples.extend(timings)
+            for turn_index, timing in enumerate(timings, 1):
+                per_turn.setdefault(f"{scenario} #{turn_index}", []).append(timing)
+    elapsed = time.perf_counter() - start
+    reset_seats(initial_seats)
+
+    mode = "async" if args.use_async else "sync"
+    routed = sum(1 for sample in samples if sample["route"] != "agent")
+    print(f"Pipeline offline ({mode}{', checkpoint' if args.checkpoint else ''}, "
+          f"LLM simulado {args.llm_latency_ms:.0f} ms): {len(samples)} turnos en {elapsed:.2f}s "
+          f"({routed} por el router, {sum(sample['input_tokens'] for sample in samples)} tokens de entrada)")
+
+    summary = summarize(samples)
+    print(f"\n{'Etapa':<8} {'media':>9} {'p50':>9} {'p95':>9} {'max':>9}   (ms)")
+    for stage in STAGES:
+        stats = summary[stage]
+        print(f"{stage:<8} {stats['mean']:>9.3f} {stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['max']:>9.3f}")
+
+    print(f"\n{'Turno':<14}" + "".join(f"{stage:>9}" for stage in STAGES) + "   (p50 ms)")
+    turn_summaries = {}
+    for label, timings in per_turn.items():
+        turn_summaries[label] = summarize(timings)
+        print(f"{label:<14}" + "".join(f"{turn_summaries[label][stage]['p50']:>9.3f}" for stage in STAGES))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({
+                "config": vars(args),
+                "summary": summary,
+                "turns": turn_summaries
+            }, output, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.json}")
+
+    if args.baseline and not compare_with_baseline(summary, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
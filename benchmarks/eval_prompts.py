@@ -0,0 +1,302 @@
+"""
+Evaluación offline de variantes del prompt del sistema
+Recorre las mismas conversaciones con cada variante del prefijo estático
+(SYSTEM_PROMPT_PREFIXES) y compara, turno a turno, contra la variante base:
+
+- decisiones del agente: herramientas pedidas (nombre + argumentos)
+- ruta del turno: agente o router previo al LLM
+- resultado del FSM: estado de la conversación tras cada turno
+- tokens de entrada del turno (prompt + tool loop)
+
+Cada turno pasa por lo mismo que en bot.py: router (FAST_PATH_ROUTER_ENABLED)
+y contexto acotado (CONTEXT_MANAGEMENT_ENABLED).
+
+Modos del modelo:
+- por defecto: ScriptedChatModel(passenger_policy), sin red. La política no
+  lee las reglas del prompt: mide el ahorro de tokens pero no da veredicto
+  sobre el comportamiento
+- --record cassette.json: modelo real (DEFAULT_MODEL, necesita OPENAI_API_KEY);
+  guarda las respuestas del modelo (y los resúmenes del contexto) de cada
+  variante y escenario
+- --replay cassette.json: reproduce las respuestas grabadas sin red (las
+  herramientas, el router y el FSM se vuelven a ejecutar), para repetir la
+  comparación en cada cambio sin pagar llamadas
+
+Con --record o --replay sale con código 1 si alguna variante difiere de la base.
+
+Uso:
+    python -m benchmarks.eval_prompts
+    python -m benchmarks.eval_prompts --record cassette.json
+    python -m benchmarks.eval_prompts --replay cassette.json --json eval.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, messages_from_dict, messages_to_dict
+
+from benchmarks.bench_pipeline import build_scenarios, reset_seats, set_system_message, transcript_summarizer
+from benchmarks.fake_chat_model import ScriptedChatModel, passenger_policy
+from config.settings import (
+    CONTEXT_MANAGEMENT_ENABLED, CONTEXT_MAX_TURNS, CONTEXT_TOKEN_BUDGET, DEFAULT_MODEL, DEFAULT_TEMPERATURE,
+    FAST_PATH_ROUTER_ENABLED, get_cancelled_flight_data
+)
+from data.flights import ALTERNATIVE_FLIGHTS
+from prompts.system_prompt import SYSTEM_PROMPT_PREFIXES, get_cancellation_notification
+from tools.flight_tools import get_flight_tools
+from utils.agent_factory import build_agent_executor, get_chat_model
+from utils.agent_stream import get_turn_tool_events
+from utils.context_manager import ConversationContext, make_llm_summarizer
+from utils.router import route_turn
+from utils.state_manager import StateManager
+from utils.token_usage import TokenUsageHandler
+
+
+def build_eval_scenarios(cancelled_flight_number: str) -> Dict[str, List[str]]:
+    """
+    Flujos principales del benchmark, un cambio de decisión (alternativas →
+    reembolso) y una elección por número de opción (la resuelve el router si
+    el listado del agente respeta el formato "Opción N").
+    """
+    scenarios = build_scenarios(cancelled_flight_number)
+    scenarios["cambio"] = [
+        "Quiero ver los vuelos alternativos",
+        "Mejor prefiero el reembolso",
+        "Sí, confirmo el reembolso",
+    ]
+    scenarios["opcion"] = [
+        "Quiero ver los vuelos alternativos",
+        "2",
+        "Sí, confirmo",
+    ]
+    return scenarios
+
+
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+
+def recording_summarizer(summarizer: Summarizer, summaries: List[str]) -> Summarizer:
+    """Resumidor que guarda cada resumen (para grabarlo en el cassette)"""
+    def summarize(previous_summary: str, messages: List[BaseMessage]) -> str:
+        summary = summarizer(previous_summary, messages)
+        summaries.append(summary)
+        return summary
+
+    return summarize
+
+
+def replay_summarizer(summaries: List[str]) -> Summarizer:
+    """Resumidor que devuelve, en orden, los resúmenes grabados"""
+    pending = list(summaries)
+    return lambda previous_summary, messages: pending.pop(0)
+
+
+def run_conversation(agent_executor, turns: List[str], flight_number: str, variant: str,
+                     context: Optional[ConversationContext] = None, use_router: bool = True) -> dict:
+    """
+    Ejecutar una conversación con el mismo armado de mensajes y los mismos
+    pasos por turno que bot.py.
+
+    Args:
+        agent_executor: Grafo del agente
+        turns: Mensajes del pasajero
+        flight_number: Vuelo cancelado
+        variant: Variante del prompt
+        context: Contexto acotado de esta conversación (None = historial completo)
+        use_router: Resolver con el router los turnos que no necesitan al LLM
+
+    Returns:
+        turns: por turno, ruta, herramientas pedidas, estado del FSM y tokens de entrada
+        model_messages: respuestas del modelo (para grabar el cassette)
+    """
+    flight = get_cancelled_flight_data(flight_number)
+    passenger_name = "Pasajero Evaluación"
+    state_manager = StateManager()
+    messages = [AIMessage(content=get_cancellation_notification(
+        passenger_name, flight_number, flight["destination"], flight["reason"]
+    ))]
+    results, model_messages = [], []
+
+    for user_input in turns:
+        set_system_message(messages, passenger_name, flight_number, state_manager, variant)
+        messages.append(HumanMessage(content=user_input))
+
+        routed_turn = route_turn(user_input, messages, state_manager, flight_number) if use_router else None
+        if routed_turn is not None:
+            route, response, events = routed_turn.route, routed_turn.response, []
+            turn_ai_messages, input_tokens = [], 0
+        else:
+            agent_messages = context.build(messages) if context is not None else messages
+            token_usage = TokenUsageHandler()
+            result = agent_executor.invoke({"messages": agent_messages}, config={"callbacks": [token_usage]})
+            new_messages = result["messages"][len(agent_messages):]
+            turn_ai_messages = [message for message in new_messages if isinstance(message, AIMessage)]
+            model_messages.extend(turn_ai_messages)
+            route, response = "agent", result["messages"][-1].content
+            events, input_tokens = get_turn_tool_events(result["messages"]), token_usage.input_tokens
+
+        state_manager.update_state(user_input, response, events=events)
+        messages.append(AIMessage(content=response))
+
+        results.append({
+            "user": user_input,
+            "route": route,
+            "tool_calls": [
+                {"name": call["name"], "args": call["args"]}
+                for message in turn_ai_messages for call in message.tool_calls
+            ],
+            "state": state_manager.get_current_state().value,
+            "input_tokens": input_tokens,
+        })
+
+    return {"turns": results, "model_messages": model_messages}
+
+
+def compare_runs(baseline: dict, candidate: dict) -> List[str]:
+    """Diferencias de ruta, herramientas y estado turno a turno (vacío si coinciden)"""
+    differences = []
+    for index, (before, now) in enumerate(zip(baseline["turns"], candidate["turns"]), 1):
+        if before["route"] != now["route"]:
+            differences.append(f"turno {index}: ruta {before['route']} → {now['route']}")
+        if before["tool_calls"] != now["tool_calls"]:
+            differences.append(f"turno {index}: herramientas {before['tool_calls']} → {now['tool_calls']}")
+        if before["state"] != now["state"]:
+            differences.append(f"turno {index}: estado {before['state']} → {now['state']}")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar variantes del prompt del sistema (offline)")
+    parser.add_argument("--variants", nargs="+", default=list(SYSTEM_PROMPT_PREFIXES),
+                        choices=list(SYSTEM_PROMPT_PREFIXES), help="La primera es la base de la comparación")
+    parser.add_argument("--flight", default="ITTI-FLY-003", help="Vuelo cancelado del escenario")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", help="Usar el modelo real y grabar sus respuestas en este archivo")
+    mode.add_argument("--replay", help="Reproducir las respuestas grabadas con --record")
+    parser.add_argument("--json", help="Guardar el reporte en un archivo JSON")
+    args = parser.parse_args()
+
+    scenarios = build_eval_scenarios(args.flight)
+    # Solo con las respuestas de un modelo real las decisiones dependen del prompt
+    behavior_checked = bool(args.record or args.replay)
+    cassette = None
+    use_router = FAST_PATH_ROUTER_ENABLED
+    context_settings = (
+        {"max_turns": CONTEXT_MAX_TURNS, "token_budget": CONTEXT_TOKEN_BUDGET} if CONTEXT_MANAGEMENT_ENABLED else None
+    )
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as cassette_file:
+            cassette = json.load(cassette_file)
+        model_label = f"grabado ({cassette['model']})"
+        # Mismos pasos que al grabar, para que el guion se consuma en el mismo orden
+        # (los cassettes anteriores al router y al contexto acotado no tienen estas claves)
+        use_router = cassette.get("fast_path_router", False)
+        context_settings = cassette.get("context")
+        recorded_scenarios = cassette["conversations"][args.variants[0]]
+        scenarios = {name: turns for name, turns in scenarios.items() if name in recorded_scenarios}
+    elif args.record:
+        model_label = f"{DEFAULT_MODEL} (real)"
+    else:
+        model_label = "simulado (passenger_policy)"
+
+    tools = get_flight_tools()
+    shared_executor = None
+    chat_model = None
+    if not args.replay:
+        chat_model = (get_chat_model(DEFAULT_MODEL, DEFAULT_TEMPERATURE) if args.record
+                      else ScriptedChatModel(script=passenger_policy))
+        shared_executor = build_agent_executor(chat_model, tools)
+
+    initial_seats = {number: flight["available_seats"] for number, flight in ALTERNATIVE_FLIGHTS.items()}
+    runs: Dict[str, Dict[str, dict]] = {}
+    for variant in args.variants:
+        runs[variant] = {}
+        for scenario, turns in scenarios.items():
+            reset_seats(initial_seats)
+            agent_executor = shared_executor
+            summaries: List[str] = []
+            summarizer = None
+            if cassette is not None:
+                # Un modelo por conversación: el guion grabado se consume en orden
+                recorded = messages_from_dict(cassette["conversations"][variant][scenario])
+                agent_executor = build_agent_executor(ScriptedChatModel(script=recorded), tools)
+                if context_settings is not None:
+                    summarizer = replay_summarizer(cassette["summaries"][variant][scenario])
+            elif context_settings is not None:
+                summarizer = (recording_summarizer(make_llm_summarizer(chat_model), summaries) if args.record
+                              else transcript_summarizer)
+            context = ConversationContext(summarizer, **context_settings) if summarizer is not None else None
+            runs[variant][scenario] = run_conversation(agent_executor, turns, args.flight, variant,
+                                                       context, use_router)
+            runs[variant][scenario]["summaries"] = summaries
+    reset_seats(initial_seats)
+
+    baseline_variant = args.variants[0]
+    baseline_tokens = sum(turn["input_tokens"] for run in runs[baseline_variant].values() for turn in run["turns"])
+    print(f"Evaluación de prompts · modelo: {model_label} · base: {baseline_variant}")
+    print(f"\n{'variante':<10}{'escenario':<12}{'turnos':>8}{'iguales':>9}{'estado final':>16}{'tokens':>9}")
+
+    ok = True
+    report = {"model": model_label, "baseline": baseline_variant, "variants": {}}
+    for variant in args.variants:
+        variant_tokens = 0
+        scenario_reports = {}
+        for scenario, run in runs[variant].items():
+            differences = compare_runs(runs[baseline_variant][scenario], run)
+            ok = ok and not differences
+            tokens = sum(turn["input_tokens"] for turn in run["turns"])
+            variant_tokens += tokens
+            matching = len(run["turns"]) - len({difference.split(":")[0] for difference in differences})
+            print(f"{variant:<10}{scenario:<12}{len(run['turns']):>8}{matching if behavior_checked else '-':>9}"
+                  f"{run['turns'][-1]['state']:>16}{tokens:>9}")
+            for difference in differences:
+                print(f"    ❌ {difference}")
+            scenario_reports[scenario] = {"turns": run["turns"], "differences": differences}
+        reduction = 1 - variant_tokens / baseline_tokens if baseline_tokens else 0.0
+        report["variants"][variant] = {
+            "input_tokens": variant_tokens, "reduction": reduction, "scenarios": scenario_reports
+        }
+
+    print()
+    for variant, variant_report in report["variants"].items():
+        print(f"{variant:<10} tokens de entrada: {variant_report['input_tokens']:>7} "
+              f"({variant_report['reduction']:.1%} menos que {baseline_variant})")
+    if not behavior_checked:
+        print("\n⚠️  Sin veredicto: el modelo simulado no lee el prompt, sus decisiones no dependen de la "
+              "variante. Para comparar el comportamiento usar --record (modelo real) o --replay")
+    else:
+        print("\n✅ Mismas decisiones y estados que la base" if ok else "\n❌ Hay variantes que difieren de la base")
+    report["verdict"] = ok if behavior_checked else None
+
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as cassette_file:
+            json.dump({
+                "model": DEFAULT_MODEL,
+                "flight": args.flight,
+                "fast_path_router": use_router,
+                "context": context_settings,
+                "conversations": {
+                    variant: {scenario: messages_to_dict(run["model_messages"])
+                              for scenario, run in variant_runs.items()}
+                    for variant, variant_runs in runs.items()
+                },
+                "summaries": {
+                    variant: {scenario: run["summaries"] for scenario, run in variant_runs.items()}
+                    for variant, variant_runs in runs.items()
+                }
+            }, cassette_file, ensure_ascii=False, indent=2)
+        print(f"Respuestas grabadas en {args.record}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+        print(f"Reporte guardado en {args.json}")
+
+    if behavior_checked and not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
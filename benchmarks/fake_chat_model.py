@@ -0,0 +1,197 @@
+"""
+Modelo de chat simulado para benchmarks
+Reemplaza a ChatOpenAI sin red: devuelve respuestas y pedidos de herramientas
+según un guion, con latencia configurable, así los benchmarks miden el resto
+del pipeline (grafo, herramientas, data-layer, FSM) de forma reproducible.
+
+- ScriptedChatModel(script=[AIMessage, ...]): respuestas en orden
+- ScriptedChatModel(script=passenger_policy): respuesta decidida a partir de
+  la conversación (sin estado propio: un mismo modelo sirve a muchas sesiones)
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from utils.context_manager import estimate_tokens
+
+_FLIGHT_NUMBER = re.compile(r"ITTI-FLY-\d{3}", re.IGNORECASE)
+_SCENARIO_FIELD = re.compile(r"^- (Pasajero|Vuelo cancelado): (.+)$", re.MULTILINE)
+_SELECTED_FLIGHT = re.compile(r"(?<=^Ha seleccionado el vuelo \*\*)ITTI-FLY-\d{3}")
+
+
+def tool_call(name: str, **args) -> AIMessage:
+    """Mensaje del modelo que pide una herramienta"""
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}])
+
+
+def passenger_policy(messages: List[BaseMessage]) -> AIMessage:
+    """
+    Política determinística de un agente "ideal" para los flujos del README.
+
+    - Tras una herramienta: resume su resultado (las alternativas se muestran
+      completas, como hace el agente, así el router puede leer las opciones)
+    - "estado" → check_flight_status del vuelo cancelado
+    - "vuelos" / "alternativas" → find_alternative_flights
+    - Elegir un vuelo (ITTI-FLY-xxx) → pedido de confirmación
+    - "confirmo" → make_booking del último vuelo elegido (por número o por
+      opción, ya confirmada por el router), o process_refund si el pasajero
+      pidió reembolso
+    - "reembolso" → pedido de confirmación del reembolso
+    """
+    scenario = dict(_SCENARIO_FIELD.findall(next(
+        (message.content for message in messages if isinstance(message, SystemMessage)), ""
+    )))
+    passenger_name = scenario.get("Pasajero", "Pasajero")
+    cancelled_flight = scenario.get("Vuelo cancelado", "ITTI-FLY-001")
+    last = messages[-1]
+
+    if isinstance(last, ToolMessage):
+        summary = last.content.strip()
+        if last.name != "find_alternative_flights":
+            summary = summary.splitlines()[0]
+        return AIMessage(content=f"{summary}\n\n¿Hay algo más en lo que pueda ayudarle?")
+
+    text = last.content.lower()
+    user_texts = [message.content.lower() for message in messages if isinstance(message, HumanMessage)]
+
+    if "confirmo" in text:
+        if any("reembolso" in user_text for user_text in user_texts):
+            return tool_call("process_refund", passenger_name=passenger_name, flight_number=cancelled_flight)
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                chosen = _FLIGHT_NUMBER.search(message.content)
+            elif isinstance(message, AIMessage):
+                # Opción elegida por número: el router ya pidió la confirmación
+                chosen = _SELECTED_FLIGHT.search(message.content)
+            else:
+                continue
+            if chosen:
+                return tool_call("make_booking", passenger_name=passenger_name, flight_number=chosen.group().upper())
+        return AIMessage(content="¿Qué vuelo desea confirmar?")
+
+    if "estado" in text:
+        return tool_call("check_flight_status", flight_number=cancelled_flight)
+    if "vuelos" in text or "alternativas" in text:
+        return tool_call("find_alternative_flights", cancelled_flight_number=cancelled_flight)
+
+    chosen = _FLIGHT_NUMBER.search(last.content)
+    if chosen:
+        return AIMessage(content=(
+            f"Ha seleccionado el vuelo {chosen.group().upper()}.\n\n"
+            "⚠️ **¿Está completamente seguro de esta decisión?** Para cambios posteriores "
+            "deberá llamar al **0800-ITTI**. Por favor confirme escribiendo 'Sí, confirmo'."
+        ))
+    if "reembolso" in text:
+        return AIMessage(content=(
+            "Procesaremos el reembolso del 100% del valor de su boleto.\n\n"
+            "⚠️ **¿Está completamente seguro de solicitar el reembolso?** "
+            "Por favor confirme escribiendo 'Sí, confirmo el reembolso'."
+        ))
+    return AIMessage(content="Entiendo. ¿Prefiere ver vuelos alternativos o solicitar el reembolso?")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Stand-in local de ChatOpenAI con la interfaz que usa create_react_agent.
+
+    Soporta invoke/ainvoke y stream/astream (texto palabra a palabra; los
+    pedidos de herramientas en un solo chunk). Informa usage_metadata estimado
+    (~4 caracteres por token) para que la contabilidad de tokens funcione.
+    """
+
+    script: Union[List[AIMessage], Callable[[List[BaseMessage]], AIMessage]]
+    latency: float = 0.0  # Segundos simulados por llamada al modelo
+
+    _position: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs) -> "ScriptedChatModel":
+        """Las herramientas ya están en el guion: no hace falta enlazarlas"""
+        return self
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        if callable(self.script):
+            template = self.script(messages)
+        else:
+            with self._lock:
+                template = self.script[self._position % len(self.script)]
+                self._position += 1
+
+        input_tokens = estimate_tokens(messages)
+        output_tokens = max(1, len(template.content) // 4)
+        return AIMessage(
+            content=template.content,
+            tool_calls=[{**call, "id": f"call_{uuid.uuid4().hex[:12]}"} for call in template.tool_calls],
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens
+            }
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]),
+                     "id": call["id"], "index": index}
+                    for index, call in enumerate(message.tool_calls)
+                ],
+                usage_metadata=message.usage_metadata
+            ))
+            return
+        words = message.content.split(" ")
+        for index, word in enumerate(words):
+            last = index == len(words) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=word if last else word + " ",
+                usage_metadata=message.usage_metadata if last else None
+            ))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        for chunk in self._chunks(self._next_message(messages)):
+            if run_manager and chunk.message.content:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._next_message(messages)):
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
@@ -0,0 +1,214 @@
+"""
+Generador de carga: conversaciones de rebooking concurrentes
+Simula N pasajeros de un vuelo cancelado atendidos a la vez por un mismo
+proceso. Cada uno recorre el flujo de rebooking con el agente completo
+(modelo simulado con latencia configurable, herramientas, data-layer, FSM):
+
+    estado del vuelo → vuelos alternativos → reserva (make_booking)
+
+Informa throughput, latencia por turno (p50/p95/p99), espera por los locks
+del inventario y verifica que los asientos finales de ALTERNATIVE_FLIGHTS
+coincidan con las reservas confirmadas (sin sobreventa).
+
+Uso:
+    python -m benchmarks.load_conversations
+    python -m benchmarks.load_conversations --passengers 500 --concurrency 100 --llm-latency-ms 300
+    python -m benchmarks.load_conversations --async --target ITTI-FLY-028
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from benchmarks.bench_pipeline import percentile
+from benchmarks.fake_chat_model import ScriptedChatModel, passenger_policy
+from config.settings import SYSTEM_MESSAGE_ID, get_cancelled_flight_data
+from data.flights import (
+    ALTERNATIVE_FLIGHTS, BOOKING_STORE, FLIGHT_ALTERNATIVES_MAP, LOOKUP_COALESCER, SEAT_INVENTORY
+)
+from prompts.system_prompt import get_cancellation_notification, get_system_message
+from tools.flight_tools import TOOL_RESULT_CACHE, get_flight_tools, get_tool_cache_stats
+from utils.agent_factory import build_agent_executor
+from utils.agent_stream import get_turn_tool_events
+from utils.state_manager import EVENT_BOOKING_CONFIRMED, ConversationState, StateManager
+
+
+class PassengerResult:
+    """Resultado de la conversación de un pasajero"""
+
+    def __init__(self):
+        self.turn_latencies: List[float] = []
+        self.booked_flight: Optional[str] = None
+        self.resolved = False
+        self.error: Optional[str] = None
+
+
+class Conversation:
+    """Estado de una conversación simulada (lo que bot.py guarda en session_state)"""
+
+    def __init__(self, passenger_name: str, flight_number: str, chosen_flight: str):
+        self.flight = get_cancelled_flight_data(flight_number)
+        self.passenger_name = passenger_name
+        self.flight_number = flight_number
+        self.turns = [
+            "¿Cuál es el estado de mi vuelo?",
+            "Quiero ver los vuelos alternativos",
+            f"Sí, confirmo el vuelo {chosen_flight}",
+        ]
+        self.state_manager = StateManager()
+        self.messages = [
+            SystemMessage(content=get_system_message(
+                passenger_name, flight_number, self.flight["origin"],
+                self.flight["destination"], self.flight["reason"]
+            ), id=SYSTEM_MESSAGE_ID),
+            AIMessage(content=get_cancellation_notification(
+                passenger_name, flight_number, self.flight["destination"], self.flight["reason"]
+            ))
+        ]
+        self.result = PassengerResult()
+
+    def record(self, user_input: str, agent_messages: list, latency: float):
+        """Registrar la respuesta del agente y avanzar el FSM"""
+        events = get_turn_tool_events(agent_messages)
+        response = agent_messages[-1].content
+        self.state_manager.update_state(user_input, response, events=events)
+        self.messages.append(AIMessage(content=response))
+        self.result.turn_latencies.append(latency)
+        for event in events or []:
+            if event["type"] == EVENT_BOOKING_CONFIRMED:
+                self.result.booked_flight = event["flight_number"]
+        self.result.resolved = self.state_manager.current_state == ConversationState.RESOLVED
+
+
+def run_passenger(agent_executor, conversation: Conversation) -> PassengerResult:
+    """Conversación completa con invoke (un hilo por sesión, como Streamlit)"""
+    try:
+        for user_input in conversation.turns:
+            conversation.messages.append(HumanMessage(content=user_input))
+            start = time.perf_counter()
+            result = agent_executor.invoke({"messages": conversation.messages})
+            conversation.record(user_input, result["messages"], time.perf_counter() - start)
+    except Exception as error:
+        conversation.result.error = repr(error)
+    return conversation.result
+
+
+async def arun_passenger(agent_executor, conversation: Conversation, semaphore: asyncio.Semaphore) -> PassengerResult:
+    """Conversación completa con ainvoke (muchas sesiones en un event loop)"""
+    async with semaphore:
+        try:
+            for user_input in conversation.turns:
+                conversation.messages.append(HumanMessage(content=user_input))
+                start = time.perf_counter()
+                result = await agent_executor.ainvoke({"messages": conversation.messages})
+                conversation.record(user_input, result["messages"], time.perf_counter() - start)
+        except Exception as error:
+            conversation.result.error = repr(error)
+    return conversation.result
+
+
+async def run_all_async(agent_executor, conversations: List[Conversation], concurrency: int) -> List[PassengerResult]:
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(
+        arun_passenger(agent_executor, conversation, semaphore) for conversation in conversations
+    ))
+
+
+def check_seats(initial_seats: Dict[str, int], results: List[PassengerResult]) -> bool:
+    """
+    Comparar los asientos finales con las reservas confirmadas por vuelo.
+
+    Returns:
+        True si cada vuelo descontó exactamente sus reservas y ninguno quedó negativo
+    """
+    confirmed: Dict[str, int] = {}
+    for result in results:
+        if result.booked_flight:
+            confirmed[result.booked_flight] = confirmed.get(result.booked_flight, 0) + 1
+
+    final_seats = {flight["number"]: flight["available_seats"]
+                   for flight in BOOKING_STORE.get_flights(list(initial_seats))}
+    ok = True
+    print(f"\n{'Vuelo':<14} {'Inicial':>8} {'Reservas':>9} {'Final':>6}")
+    for number, initial in initial_seats.items():
+        booked = confirmed.get(number, 0)
+        final = final_seats[number]
+        flight_ok = final >= 0 and initial - final == booked
+        ok = ok and flight_ok
+        print(f"{number:<14} {initial:>8} {booked:>9} {final:>6}  {'OK' if flight_ok else 'INCONSISTENTE'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de conversaciones de rebooking concurrentes")
+    parser.add_argument("--passengers", type=int, default=200, help="Pasajeros (conversaciones) a simular")
+    parser.add_argument("--concurrency", type=int, default=50, help="Conversaciones atendidas a la vez")
+    parser.add_argument("--flight", default="ITTI-FLY-003", help="Vuelo cancelado de los pasajeros")
+    parser.add_argument("--target", help="Vuelo alternativo que eligen todos (por defecto, se reparten)")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Latencia simulada por llamada al modelo")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="ainvoke en un event loop en vez de hilos")
+    args = parser.parse_args()
+
+    alternatives = FLIGHT_ALTERNATIVES_MAP[args.flight]
+    initial_seats = {number: ALTERNATIVE_FLIGHTS[number]["available_seats"] for number in alternatives}
+    conversations = [
+        Conversation(f"Pasajero {idx}", args.flight, args.target or alternatives[idx % len(alternatives)])
+        for idx in range(args.passengers)
+    ]
+
+    model = ScriptedChatModel(script=passenger_policy, latency=args.llm_latency_ms / 1000)
+    agent_executor = build_agent_executor(model, get_flight_tools())
+    SEAT_INVENTORY.reset_lock_stats()
+
+    start = time.perf_counter()
+    if args.use_async:
+        results = asyncio.run(run_all_async(agent_executor, conversations, args.concurrency))
+    else:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda conversation: run_passenger(agent_executor, conversation), conversations))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency * 1000 for result in results for latency in result.turn_latencies]
+    errors = [result.error for result in results if result.error]
+    booked = sum(1 for result in results if result.booked_flight)
+    resolved = sum(1 for result in results if result.resolved)
+    lock_stats = SEAT_INVENTORY.get_lock_stats()
+    cache_stats = get_tool_cache_stats()
+    lookup_stats = LOOKUP_COALESCER.get_stats()
+
+    mode = "async" if args.use_async else "hilos"
+    print(f"{args.passengers} pasajeros, concurrencia {args.concurrency}, {mode}, "
+          f"LLM simulado {args.llm_latency_ms:.0f} ms")
+    print(f"Tiempo total: {elapsed:.2f}s | {args.passengers / elapsed:.1f} conversaciones/s | "
+          f"{len(latencies) / elapsed:.1f} turnos/s")
+    if latencies:
+        print(f"Latencia por turno (ms): p50 {percentile(latencies, 50):.1f} | "
+              f"p95 {percentile(latencies, 95):.1f} | p99 {percentile(latencies, 99):.1f} | "
+              f"max {max(latencies):.1f}")
+    print(f"Reservas confirmadas: {booked} | Sin asiento: {args.passengers - booked - len(errors)} | "
+          f"Conversaciones resueltas: {resolved} | Errores: {len(errors)}")
+    print(f"Locks del inventario: {lock_stats['operations']} operaciones, espera promedio "
+          f"{lock_stats['avg_wait_ms']:.3f} ms, máxima {lock_stats['max_wait_ms']:.3f} ms")
+    print(f"Caché de herramientas: {cache_stats['hits']} aciertos / {cache_stats['misses']} fallos | "
+          f"Consultas compartidas: {lookup_stats['shared']} de {lookup_stats['calls']}")
+    for error in errors[:5]:
+        print(f"  ⚠️ {error}")
+
+    ok = check_seats(initial_seats, results) and not errors
+
+    # Dejar el inventario en memoria como estaba
+    for number, seats in initial_seats.items():
+        ALTERNATIVE_FLIGHTS[number]["available_seats"] = seats
+    TOOL_RESULT_CACHE.clear()
+
+    print("\nAsientos consistentes, sin sobreventa" if ok else "\nSe detectaron inconsistencias")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Reporte de tokens del mensaje del sistema (prompt caching)
+Arma el mensaje del sistema de cada escenario (vuelos cancelados x estados
+del FSM) igual que bot.py y mide:
+
+- prefijo estático: compartido por todas las sesiones y turnos (cacheable)
+- cola dinámica: datos del pasajero + instrucciones del estado
+- schema de las herramientas: también forma parte del prefijo que se envía
+- cacheable: prefijo estático + schema de las herramientas, sobre el total
+  que se envía antes de los mensajes (mensaje del sistema + schema)
+- prefijo común real entre todos los mensajes armados (verifica que ningún
+  dato de la sesión se haya colado en la parte estática)
+
+El proveedor cachea prefijos de al menos --min-cacheable tokens (OpenAI: 1024);
+el ahorro estimado usa el precio de entrada de MODEL_PRICING_PER_1M_TOKENS y
+el descuento de los tokens cacheados (--cached-discount).
+
+Cuenta con tiktoken si la codificación del modelo está disponible; si no,
+estima ~4 caracteres por token (como utils/context_manager.py).
+
+Uso:
+    python -m benchmarks.prompt_tokens
+    python -m benchmarks.prompt_tokens --variant compact
+    python -m benchmarks.prompt_tokens --model gpt-4o --json prompt_tokens.json
+"""
+
+import argparse
+import json
+import os
+from typing import Callable, List, Tuple
+
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from config.settings import (
+    AVAILABLE_CANCELLED_FLIGHTS, DEFAULT_MODEL, DEFAULT_PASSENGER_NAME, MODEL_PRICING_PER_1M_TOKENS,
+    PROMPT_VARIANT, get_cancelled_flight_data
+)
+from prompts.system_prompt import (
+    SYSTEM_PROMPT_PREFIXES, get_state_instructions, get_system_message, get_system_prompt_prefix
+)
+from tools.flight_tools import get_flight_tools
+
+# (necesita confirmación, estado final) de los estados del FSM
+STATE_VARIANTS = {
+    "sin instrucciones": (False, False),
+    "confirmación": (True, False),
+    "estado final": (False, True),
+}
+
+
+def get_token_counter(model: str) -> Tuple[Callable[[str], int], str]:
+    """Contador de tokens del modelo (tiktoken) o estimación si no está disponible"""
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(model)
+        return (lambda text: len(encoding.encode(text))), f"tiktoken ({encoding.name})"
+    except Exception:
+        return (lambda text: len(text) // 4), "estimación (~4 caracteres por token)"
+
+
+def common_prefix(texts: List[str]) -> str:
+    """Prefijo común más largo de todos los textos"""
+    return os.path.commonprefix(texts)
+
+
+def build_system_messages(passenger_name: str, variant: str) -> List[Tuple[str, str, str]]:
+    """(vuelo, estado, mensaje del sistema) de cada escenario"""
+    messages = []
+    for flight_number in AVAILABLE_CANCELLED_FLIGHTS:
+        flight = get_cancelled_flight_data(flight_number)
+        for label, (needs_confirmation, is_final_state) in STATE_VARIANTS.items():
+            content = get_system_message(
+                passenger_name, flight_number, flight["origin"],
+                flight["destination"], flight["reason"], variant
+            ) + get_state_instructions(needs_confirmation, is_final_state)
+            messages.append((flight_number, label, content))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens del prefijo estático y de la cola dinámica del prompt")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--passenger", default=DEFAULT_PASSENGER_NAME)
+    parser.add_argument("--variant", default=PROMPT_VARIANT, choices=list(SYSTEM_PROMPT_PREFIXES))
+    parser.add_argument("--min-cacheable", type=int, default=1024, help="Tokens mínimos que cachea el proveedor")
+    parser.add_argument("--cached-discount", type=float, default=0.5, help="Descuento de los tokens cacheados")
+    parser.add_argument("--json", help="Guardar el reporte en un archivo JSON")
+    args = parser.parse_args()
+
+    count_tokens, method = get_token_counter(args.model)
+    prefix = get_system_prompt_prefix(args.variant)
+    messages = build_system_messages(args.passenger, args.variant)
+    shared = common_prefix([content for _, _, content in messages])
+    tools_schema = json.dumps([convert_to_openai_tool(tool) for tool in get_flight_tools()], ensure_ascii=False)
+
+    prefix_tokens = count_tokens(prefix)
+    tools_tokens = count_tokens(tools_schema)
+    # Una sola definición para las filas y el resumen: lo que se repite idéntico en cada llamada
+    cacheable_tokens = prefix_tokens + tools_tokens
+    rows = []
+    for flight_number, label, content in messages:
+        system_tokens = count_tokens(content)
+        total = system_tokens + tools_tokens
+        rows.append({
+            "flight": flight_number,
+            "state": label,
+            "system": system_tokens,
+            "total": total,
+            "tail": system_tokens - prefix_tokens,
+            "cacheable_pct": cacheable_tokens / total * 100 if total else 0.0
+        })
+
+    print(f"Modelo: {args.model} · prompt: {args.variant} · tokens: {method}")
+    print(f"Prefijo estático:        {prefix_tokens:>6} tokens ({len(prefix)} caracteres)")
+    print(f"Schema de herramientas:  {tools_tokens:>6} tokens")
+    print(f"Prefijo común real:      {count_tokens(shared):>6} tokens "
+          f"({'ok: contiene todo el prefijo estático' if shared.startswith(prefix) else 'ERROR: difiere del prefijo estático'})")
+    print()
+    print(f"{'vuelo':<14}{'estado':<20}{'sistema':>9}{'+ tools':>9}{'cola':>8}{'cacheable':>11}")
+    for row in rows:
+        print(f"{row['flight']:<14}{row['state']:<20}{row['system']:>9}{row['total']:>9}{row['tail']:>8}"
+              f"{row['cacheable_pct']:>10.1f}%")
+
+    pricing = MODEL_PRICING_PER_1M_TOKENS.get(args.model)
+    cache_hit = cacheable_tokens >= args.min_cacheable
+    saving = cacheable_tokens * pricing[0] / 1_000_000 * args.cached_discount if pricing and cache_hit else 0.0
+    print()
+    if cache_hit:
+        print(f"Prefijo cacheable (≥ {args.min_cacheable} tokens): {cacheable_tokens} tokens por llamada al modelo")
+    else:
+        print(f"El prefijo ({cacheable_tokens} tokens) no llega al mínimo cacheable ({args.min_cacheable})")
+    if pricing:
+        print(f"Ahorro estimado por llamada al modelo: US$ {saving:.6f} "
+              f"(US$ {saving * 1000:.4f} cada 1000 llamadas)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as report_file:
+            json.dump({
+                "model": args.model,
+                "variant": args.variant,
+                "token_counter": method,
+                "prefix_tokens": prefix_tokens,
+                "tools_tokens": tools_tokens,
+                "shared_prefix_tokens": count_tokens(shared),
+                "prefix_is_shared": shared.startswith(prefix),
+                "cacheable": cache_hit,
+                "saving_per_call_usd": saving,
+                "messages": rows
+            }, report_file, ensure_ascii=False, indent=2)
+        print(f"Reporte guardado en {args.json}")
+
+    # Falla si un dato de la sesión quedó dentro de la parte estática
+    raise SystemExit(0 if shared.startswith(prefix) else 1)
+
+
+if __name__ == "__main__":
+    main()
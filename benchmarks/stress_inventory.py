@@ -0,0 +1,115 @@
+"""
+Prueba de estrés del inventario de asientos
+Lanza cientos de reservas concurrentes sobre un mismo vuelo alternativo y
+verifica que nunca se vendan más asientos de los disponibles y que cada
+reserva confirmada quede guardada.
+
+Cada ronda reserva en un vuelo alternativo distinto y sin reponer asientos:
+todo se lee por la API del almacenamiento (BOOKING_STORE), así sirve igual
+con BOOKING_STORE=sqlite (usar un BOOKING_DB_PATH aparte: las reservas quedan).
+
+Uso:
+    python -m benchmarks.stress_inventory
+    python -m benchmarks.stress_inventory --threads 500 --flight ITTI-FLY-022
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from data.flights import ALTERNATIVE_FLIGHTS, BOOKING_STORE, create_booking
+
+
+def run_round(flight_number: str, threads: int) -> dict:
+    """
+    Lanzar `threads` reservas a la vez sobre un vuelo y validar el resultado.
+
+    Returns:
+        Asientos antes y después, reservas confirmadas y guardadas, duración y "ok"
+    """
+    seats_before = BOOKING_STORE.get_flights([flight_number])[0]["available_seats"]
+    codes = []
+    results_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def book(passenger_idx: int):
+        barrier.wait()  # Todas las reservas arrancan a la vez
+        result = create_booking(f"Pasajero {passenger_idx}", flight_number)
+        if result["success"]:
+            with results_lock:
+                codes.append(result["booking"]["confirmation_code"])
+
+    workers = [threading.Thread(target=book, args=(idx,)) for idx in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    confirmed = len(codes)
+    stored = sum(
+        1 for code in set(codes)
+        if (BOOKING_STORE.get_booking(code) or {}).get("flight_number") == flight_number
+    )
+    final_seats = BOOKING_STORE.get_flights([flight_number])[0]["available_seats"]
+    return {
+        "seats_before": seats_before,
+        "confirmed": confirmed,
+        "stored": stored,
+        "final_seats": final_seats,
+        "elapsed": elapsed,
+        "ok": (
+            confirmed == min(threads, seats_before)
+            and stored == confirmed
+            and final_seats == seats_before - confirmed
+            and final_seats >= 0
+        ),
+    }
+
+
+def run_stress(flight_numbers: list, threads: int, rounds: int) -> bool:
+    """
+    Ejecutar rondas de reservas concurrentes y validar que no haya sobreventa.
+
+    Args:
+        flight_numbers: Vuelos a usar, uno por ronda (se repiten si hay más rondas)
+
+    Returns:
+        True si todas las rondas terminaron sin sobreventa
+    """
+    all_ok = True
+    for round_number in range(1, rounds + 1):
+        flight_number = flight_numbers[(round_number - 1) % len(flight_numbers)]
+        result = run_round(flight_number, threads)
+        all_ok = all_ok and result["ok"]
+
+        print(
+            f"Ronda {round_number} ({flight_number}, {result['seats_before']} asientos): "
+            f"{threads} intentos, {result['confirmed']} confirmadas, {result['stored']} guardadas, "
+            f"asientos finales {result['final_seats']} ({result['elapsed'] * 1000:.1f} ms) "
+            f"-> {'OK' if result['ok'] else 'SOBREVENTA'}"
+        )
+    return all_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrés del inventario de asientos")
+    parser.add_argument("--flight", help="Vuelo alternativo a reservar en todas las rondas "
+                                         "(por defecto uno distinto por ronda)")
+    parser.add_argument("--threads", type=int, default=300, help="Reservas concurrentes por ronda")
+    parser.add_argument("--rounds", type=int, default=20, help="Cantidad de rondas")
+    args = parser.parse_args()
+
+    # Cambios de hilo muy frecuentes para forzar intercalados
+    sys.setswitchinterval(1e-6)
+
+    flight_numbers = [args.flight] if args.flight else list(ALTERNATIVE_FLIGHTS)
+    ok = run_stress(flight_numbers, args.threads, args.rounds)
+    print("Sin sobreventa" if ok else "Se detectó sobreventa")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
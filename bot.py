@@ -1,19 +1,34 @@
 import streamlit as st
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langgraph.prebuilt import create_react_agent
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from utils.state_manager import StateManager, ConversationState
+from utils.agent_stream import AgentStream, get_tool_events, get_tool_progress_label, get_turn_tool_events
 from dotenv import load_dotenv
+import logging
 import os
+import time
+import uuid
 
 # Importar configuración, prompts y tools
 from config.settings import *
-from prompts.system_prompt import get_cancellation_notification, get_system_message
-from tools.flight_tools import get_flight_tools
+from prompts.system_prompt import (
+    get_budget_handoff_message, get_cancellation_notification, get_state_instructions, get_system_message
+)
+from utils.agent_factory import get_agent_executor, get_chat_model, get_tool_names
+from utils.background_loop import run_in_background_loop
+from utils.context_manager import ConversationContext, make_llm_summarizer
+from tools.flight_tools import get_tool_cache_stats
+from utils.metrics import record_turn, start_metrics_server
+from utils.router import RoutedTurn, route_turn
+from utils.structured_logging import configure_logging, log_event
+from utils.token_usage import SessionUsage, TokenUsageHandler, enforce_session_budget
+from utils.tracing import TurnTrace, get_trace_exporter
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Logs JSON lines desde un hilo de fondo (una vez por proceso)
+configure_logging(LOG_LEVEL, LOG_FILE, LOG_SAMPLE_RATE, LOG_MAX_FIELD_CHARS)
+
 # Configuración de página
 st.set_page_config(
     page_title=PAGE_TITLE,
@@ -27,6 +42,66 @@ st.markdown("*Gestión inteligente de vuelos con IA*")
 # Estilos personalizados
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
+# Endpoint de métricas (opcional, uno por proceso; si el puerto está ocupado, se omite)
+if METRICS_ENABLED and METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+
+# Obtener el agente compilado (se construye una vez por proceso y se comparte
+# entre sesiones; el mensaje del sistema de cada pasajero viaja en los mensajes)
+agent_executor = get_agent_executor(
+    DEFAULT_MODEL,
+    DEFAULT_TEMPERATURE,
+    get_tool_names(),
+    CHECKPOINT_DB_PATH if CHECKPOINT_ENABLED else None
+)
+
+# Hilo de conversación persistido en el checkpointer
+# El thread_id viaja en la URL para poder retomar la sesión desde otro worker
+if CHECKPOINT_ENABLED and "thread_id" not in st.session_state:
+    st.session_state.thread_id = st.query_params.get("thread_id") or uuid.uuid4().hex
+    st.query_params["thread_id"] = st.session_state.thread_id
+
+    checkpoint_messages = agent_executor.get_state(
+        {"configurable": {"thread_id": st.session_state.thread_id}}
+    ).values.get("messages", [])
+
+    if checkpoint_messages:
+        # Restaurar solo lo que se renderiza (sin pedidos ni resultados de herramientas)
+        restored_messages = [
+            msg for msg in checkpoint_messages
+            if isinstance(msg, (SystemMessage, HumanMessage))
+            or (isinstance(msg, AIMessage) and msg.content)
+        ]
+        st.session_state.messages = restored_messages
+        st.session_state.synced_count = len(restored_messages)
+        st.session_state.synced_system = restored_messages[0].content
+        st.session_state.initial_message_sent = True
+
+        # Reconstruir el FSM reproduciendo los turnos (usuario, eventos de herramientas, respuesta)
+        restored_state_manager = StateManager()
+        last_user_message = None
+        turn_tool_messages = []
+        for msg in checkpoint_messages:
+            if isinstance(msg, HumanMessage):
+                last_user_message = msg.content
+                turn_tool_messages = []
+            elif isinstance(msg, ToolMessage):
+                turn_tool_messages.append(msg)
+            elif (isinstance(msg, AIMessage) and msg.content and not msg.tool_calls
+                    and last_user_message is not None):
+                restored_state_manager.update_state(
+                    last_user_message, msg.content, events=get_tool_events(turn_tool_messages)
+                )
+                last_user_message = None
+        st.session_state.state_manager = restored_state_manager
+        st.session_state.session_usage = SessionUsage.from_messages(
+            checkpoint_messages, MODEL_PRICING_PER_1M_TOKENS.get(DEFAULT_MODEL)
+        )
+
+# Identificador de la sesión para logs y trazas (el thread_id si hay checkpointer)
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.session_state.get("thread_id") or uuid.uuid4().hex
+
 # Sidebar con configuración del escenario
 with st.sidebar:
     st.header("Configuración del Escenario")
@@ -70,11 +145,10 @@ with st.sidebar:
 
     # Botón de reinicio/inicio de simulación
     if st.button("🚀 Iniciar simulación", use_container_width=True):
-        print("\n\n" + "🔄"*40)
-        print("NUEVA CONVERSACIÓN INICIADA")
-        print("🔄"*40 + "\n\n")
+        log_event("session_reset", session_id=st.session_state.session_id)
         for key in list(st.session_state.keys()):
             del st.session_state[key]
+        st.query_params.clear()
         st.rerun()
 
     st.divider()
@@ -142,6 +216,7 @@ with st.sidebar:
     with st.expander("Información del Modelo"):
         st.write(f"**Modelo:** {DEFAULT_MODEL}")
         st.write(f"**Temperatura:** {DEFAULT_TEMPERATURE}")
+        st.write(f"**Prompt:** {PROMPT_VARIANT}")
         st.caption("Configuración optimizada para atención al cliente")
     
     st.divider()
@@ -151,28 +226,50 @@ with st.sidebar:
         st.write("**Estado actual:**")
         st.write(f"Mensajes: {len(st.session_state.get('messages', []))}")
         st.write(f"Proactivo enviado: {st.session_state.get('initial_message_sent', False)}")
+        if "conversation_context" in st.session_state:
+            context_stats = st.session_state.conversation_context.get_stats()
+            st.write(f"Mensajes resumidos: {context_stats['summarized_messages']}")
+            st.write(f"Tokens del resumen: ~{context_stats['summary_tokens']}")
+        st.write(f"Turnos resueltos sin LLM: {st.session_state.get('fast_path_turns', 0)}")
+        if "session_usage" in st.session_state:
+            usage = st.session_state.session_usage
+            st.write("**Tokens de la sesión:**")
+            st.write(
+                f"Prompt: {usage.prompt_tokens} · Tool loop: {usage.tool_loop_tokens} · "
+                f"Completion: {usage.completion_tokens} · Resumen: {usage.summary_tokens}"
+            )
+            budget_label = f" de {SESSION_TOKEN_BUDGET}" if SESSION_TOKEN_BUDGET is not None else ""
+            st.write(f"Total: {usage.total_tokens}{budget_label} · Costo estimado: US$ {usage.cost_usd:.4f}")
+            if usage.budget_exceeded:
+                st.write(f"Presupuesto superado ({SESSION_BUDGET_ACTION})")
+            if usage.last_turn:
+                last_turn = usage.last_turn
+                st.caption(
+                    f"Último turno del agente: prompt {last_turn['prompt_tokens']} · "
+                    f"tool loop {last_turn['tool_loop_tokens']} · completion {last_turn['completion_tokens']} · "
+                    f"resumen {last_turn.get('summary_tokens', 0)} "
+                    f"({last_turn['llm_calls']} llamadas al modelo)"
+                )
+        cache_stats = get_tool_cache_stats()
+        st.write(f"Caché de herramientas: {cache_stats['hits']} aciertos / {cache_stats['misses']} fallos")
         
         #  Debug del state manager
         if "state_manager" in st.session_state:
             st.write("**Historial de Estados:**")
-            for state, time in st.session_state.state_manager.get_state_history():
-                st.write(f"- {time}: {st.session_state.state_manager.get_state_label(state)}")
+            for state, timestamp in st.session_state.state_manager.get_state_history():
+                st.write(f"- {timestamp}: {st.session_state.state_manager.get_state_label(state)}")
+
+        # Cascada de los últimos turnos (más reciente primero)
+        if st.session_state.get("traces"):
+            st.write("**Latencia por turno:**")
+            for trace in reversed(st.session_state.traces):
+                with st.expander(f"Turno {trace.turn} · {trace.duration_ms:.0f} ms"):
+                    st.code(trace.format_waterfall(), language=None)
     
     # Footer en el sidebar
     st.divider()
     st.caption("Challenge para Itti - Viviana Choque")
 
-# Cachear el modelo LLM
-@st.cache_resource
-def get_chat_model(model: str, temp: float):
-    """Crear modelo LLM con caché para evitar recreaciones"""
-    return ChatOpenAI(model=model, temperature=temp, streaming=True)
-
-chat_model = get_chat_model(DEFAULT_MODEL, DEFAULT_TEMPERATURE)
-
-# Obtener herramientas
-tools = get_flight_tools()
-
 # Inicializar estado de la sesión
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -180,91 +277,78 @@ if "messages" not in st.session_state:
 if "initial_message_sent" not in st.session_state:
     st.session_state.initial_message_sent = False
 
+# Cantidad de mensajes ya guardados en el checkpoint del hilo
+if "synced_count" not in st.session_state:
+    st.session_state.synced_count = 0
+
+# Turnos respondidos por el router sin llamar al LLM
+if "fast_path_turns" not in st.session_state:
+    st.session_state.fast_path_turns = 0
+
+# Tokens y costo acumulados de la conversación
+if "session_usage" not in st.session_state:
+    st.session_state.session_usage = SessionUsage()
+
+# Trazas de los últimos turnos (Modo Debug)
+if "traces" not in st.session_state:
+    st.session_state.traces = []
+
 #  Inicializar state manager
 if "state_manager" not in st.session_state:
     st.session_state.state_manager = StateManager()
 
+# Inicializar el contexto acotado (resumen de turnos antiguos)
+if "conversation_context" not in st.session_state:
+    st.session_state.conversation_context = ConversationContext(
+        summarizer=make_llm_summarizer(get_chat_model(DEFAULT_MODEL, DEFAULT_TEMPERATURE)),
+        max_turns=CONTEXT_MAX_TURNS,
+        token_budget=CONTEXT_TOKEN_BUDGET
+    )
+
 # ===== LOGGING ESCENARIO =====
 if "scenario_logged" not in st.session_state:
-    print("\n" + "🎬"*40)
-    print("ESCENARIO CONFIGURADO:")
-    print("🎬"*40)
-    print(f"📝 Pasajero: {passenger_name}")
-    print(f"✈️  Vuelo cancelado: {flight_number}")
-    print(f"🗺️  Ruta: {origin} → {destination}")
-    print(f"⚠️  Motivo: {cancellation_reason}")
-    print("🎬"*40 + "\n")
+    log_event(
+        "session_started",
+        session_id=st.session_state.session_id,
+        passenger_name=passenger_name,
+        flight_number=flight_number,
+        origin=origin,
+        destination=destination,
+        cancellation_reason=cancellation_reason
+    )
     st.session_state.scenario_logged = True
 
 # Crear mensaje del sistema con el contexto
+# (inicio del turno para las trazas: el prompt se arma en cada rerun)
+prompt_started = time.perf_counter()
 system_message_content = get_system_message(
     passenger_name,
     flight_number,
     origin,
     destination,
-    cancellation_reason
+    cancellation_reason,
+    PROMPT_VARIANT
 )
 
 # AGREGAR INSTRUCCIONES DINÁMICAS BASADAS EN EL ESTADO
-if "state_manager" in st.session_state:
-    state_mgr = st.session_state.state_manager
-    
-    # Si necesita confirmación, agregar instrucciones
-    if state_mgr.needs_confirmation():
-        confirmation_instructions = """
-
-## 🔒 ACCIÓN REQUERIDA: SOLICITAR CONFIRMACIÓN
-
-El usuario acaba de tomar una decisión importante. DEBES pedir confirmación explícita ANTES de proceder.
-
-### Formato de Confirmación Obligatorio:
-
-"Perfecto, ha elegido [la opción]. 
-
-⚠️ **¿Está completamente seguro de esta decisión?** 
-
-Una vez confirmado, procesaremos inmediatamente y NO podrá hacer cambios sin comunicarse al **0800-ITTI**.
-
-Por favor confirme con 'Sí, confirmo' o si desea reconsiderar, puede decirme 'No, quiero cambiar'."
-
-**CRÍTICO:** NO PROCESES NADA hasta recibir confirmación explícita del usuario.
-"""
-        system_message_content += confirmation_instructions
-    
-    # Si está en estado final (100%), no permitir cambios
-    if state_mgr.is_final_state():
-        final_state_instructions = """
-
-## 🚫 ESTADO FINAL ALCANZADO - NO MÁS CAMBIOS
-
-El proceso ya fue completado al 100%. NO PUEDES realizar más cambios directamente.
-
-Si el usuario intenta cambiar algo, responde exactamente así:
-
-"Su [reserva/reembolso] ya ha sido procesado y confirmado exitosamente. ✅
-
-Para realizar cualquier modificación, necesitará comunicarse con nuestro centro de atención al cliente al **0800-ITTI**.
-
-Nuestro equipo estará encantado de ayudarle con cualquier cambio que necesite. ¿Hay algo más en lo que pueda asistirle?"
-
-**NO ofrezcas hacer cambios tú mismo. SIEMPRE redirige al 0800-ITTI.**
-"""
-        system_message_content += final_state_instructions
+# (pedido de confirmación pendiente / estado final: cambios solo por el 0800-ITTI)
+state_mgr = st.session_state.state_manager
+system_message_content += get_state_instructions(
+    state_mgr.needs_confirmation(),
+    state_mgr.is_final_state()
+)
 
 # Actualizar o agregar mensaje del sistema al inicio
+# (con id fijo: en el checkpoint, reenviarlo reemplaza al anterior en su lugar)
+system_message = SystemMessage(content=system_message_content, id=SYSTEM_MESSAGE_ID)
 if len(st.session_state.messages) == 0:
-    st.session_state.messages.insert(0, SystemMessage(content=system_message_content))
+    st.session_state.messages.insert(0, system_message)
 elif isinstance(st.session_state.messages[0], SystemMessage):
     # Actualizar el mensaje del sistema si los parámetros cambiaron
-    st.session_state.messages[0] = SystemMessage(content=system_message_content)
+    st.session_state.messages[0] = system_message
 else:
-    st.session_state.messages.insert(0, SystemMessage(content=system_message_content))
-
-# Crear agente con herramientas usando la nueva API de LangGraph
-agent_executor = create_react_agent(
-    chat_model,
-    tools
-)
+    st.session_state.messages.insert(0, system_message)
+prompt_done = time.perf_counter()
 
 # Mostrar mensaje proactivo inicial
 if not st.session_state.initial_message_sent:
@@ -286,13 +370,11 @@ if not st.session_state.initial_message_sent:
     st.session_state.initial_message_sent = True
 
     # ===== LOGGING CONVERSACIÓN =====
-    print("\n" + "="*80)
-    print("🤖 BOT (MENSAJE PROACTIVO):")
-    print("="*80)
-    print(cancellation_notification)
-    print("="*80 + "\n")
+    log_event("bot_message", sample=True, session_id=st.session_state.session_id, turn=0,
+              text=cancellation_notification)
 
 # Renderizar historial de messages
+render_started = time.perf_counter()
 # Encontrar el índice del primer mensaje AI (el mensaje proactivo inicial)
 first_ai_message_idx = None
 for idx, msg in enumerate(st.session_state.messages):
@@ -314,17 +396,16 @@ for idx, msg in enumerate(st.session_state.messages):
 
     with st.chat_message(role, avatar=avatar):
         st.markdown(msg.content)
+render_done = time.perf_counter()
 
 # Input del usuario y generación de respuesta
 user_input = st.chat_input("Escriba su mensaje aquí...")
 
 if user_input:
     # ===== LOGGING CONVERSACIÓN =====
-    print("\n" + "="*80)
-    print("👤 USUARIO:")
-    print("="*80)
-    print(user_input)
-    print("="*80 + "\n")
+    turn = sum(1 for msg in st.session_state.messages if isinstance(msg, HumanMessage)) + 1
+    log_event("user_message", sample=True, session_id=st.session_state.session_id, turn=turn,
+              state=st.session_state.state_manager.current_state.value, text=user_input)
 
     # Mostrar mensaje del usuario
     with st.chat_message("user", avatar=USER_AVATAR):
@@ -332,47 +413,175 @@ if user_input:
 
     st.session_state.messages.append(HumanMessage(content=user_input))
 
+    # Traza del turno (el prompt y el historial ya se armaron en este rerun)
+    trace = TurnTrace(st.session_state.session_id, turn=turn, start=prompt_started)
+    trace.add_span("prompt", "prompt", prompt_started, prompt_done)
+    trace.add_span("render_history", "render", render_started, render_done)
+
     # Generar respuesta del asistente
     try:
+        # Turnos simples tras listar alternativas se resuelven sin el LLM
+        routed_turn = None
+        if FAST_PATH_ROUTER_ENABLED:
+            with trace.span("router"):
+                routed_turn = route_turn(
+                    user_input,
+                    st.session_state.messages,
+                    st.session_state.state_manager,
+                    flight_number
+                )
+
+        # Sesión que superó su presupuesto de tokens: contexto reducido o derivación al 0800-ITTI
+        if routed_turn is None and enforce_session_budget(
+                st.session_state.session_usage,
+                SESSION_TOKEN_BUDGET,
+                SESSION_BUDGET_ACTION,
+                st.session_state.conversation_context if CONTEXT_MANAGEMENT_ENABLED else None,
+                BUDGET_TRIM_TOKEN_BUDGET,
+                BUDGET_TRIM_MAX_TURNS):
+            routed_turn = RoutedTurn("budget_handoff", get_budget_handoff_message(passenger_name))
+
+        # Tokens del turno (también los del resumen de contexto) y spans de
+        # cada llamada al modelo y de cada herramienta
+        token_usage = TokenUsageHandler(MODEL_PRICING_PER_1M_TOKENS.get(DEFAULT_MODEL))
+        callbacks = [token_usage]
+        if TRACING_ENABLED:
+            callbacks.append(trace.callback_handler())
+
+        agent_config = None
+        if CHECKPOINT_ENABLED:
+            # Solo se envían los mensajes nuevos (y el del sistema si cambió);
+            # el grafo retoma el resto del historial desde el checkpoint
+            agent_messages = st.session_state.messages[st.session_state.synced_count:]
+            system_message = st.session_state.messages[0]
+            if (st.session_state.synced_count > 0
+                    and st.session_state.get("synced_system") != system_message.content):
+                agent_messages = [system_message] + agent_messages
+
+            agent_config = {"configurable": {
+                "thread_id": st.session_state.thread_id,
+                "conversation_context": (
+                    st.session_state.conversation_context if CONTEXT_MANAGEMENT_ENABLED else None
+                )
+            }}
+        elif CONTEXT_MANAGEMENT_ENABLED and routed_turn is None:
+            # Mensajes a enviar: ventana + resumen (el resumen cuenta en los tokens del turno)
+            agent_messages = st.session_state.conversation_context.build(
+                st.session_state.messages, config={"callbacks": callbacks}
+            )
+        else:
+            agent_messages = st.session_state.messages
+
+        agent_config = {**(agent_config or {}), "callbacks": callbacks}
+
+        response_started = time.perf_counter()
         with st.chat_message("assistant", avatar=ASSISTANT_AVATAR):
-            with st.spinner("Procesando..."):
-                # Ejecutar agente con la nueva API de LangGraph
-                result = agent_executor.invoke({
-                    "messages": st.session_state.messages
-                })
-
-                # Obtener la última respuesta del agente
-                full_response = result["messages"][-1].content
+            if routed_turn is not None:
+                full_response = routed_turn.response
+                turn_events = []
                 st.markdown(full_response)
+                st.session_state.fast_path_turns += 1
+
+                # El checkpoint también debe tener el turno (como si lo hubiera respondido el agente)
+                if CHECKPOINT_ENABLED:
+                    agent_executor.update_state(
+                        agent_config,
+                        {"messages": agent_messages + [AIMessage(content=full_response)]},
+                        as_node="agent"
+                    )
+            elif STREAMING_ENABLED:
+                # Mostrar tokens y progreso de herramientas a medida que llegan
+                tool_status = st.empty()
+                agent_stream = AgentStream(
+                    agent_executor,
+                    {"messages": agent_messages},
+                    on_tool_start=lambda name: tool_status.caption(get_tool_progress_label(name)),
+                    on_tool_end=lambda name: tool_status.empty(),
+                    config=agent_config
+                )
+                # Con ASYNC_AGENT_ENABLED se consume el stream async (astream)
+                st.write_stream(agent_stream.iter_async() if ASYNC_AGENT_ENABLED else agent_stream)
+                full_response = agent_stream.final_response
+                turn_events = agent_stream.tool_events
+            else:
+                with st.spinner("Procesando..."):
+                    # Ejecutar agente con la nueva API de LangGraph
+                    if ASYNC_AGENT_ENABLED:
+                        result = run_in_background_loop(agent_executor.ainvoke({
+                            "messages": agent_messages
+                        }, config=agent_config))
+                    else:
+                        result = agent_executor.invoke({
+                            "messages": agent_messages
+                        }, config=agent_config)
+
+                    # Obtener la última respuesta del agente
+                    full_response = result["messages"][-1].content
+                    turn_events = get_turn_tool_events(result["messages"])
+                    st.markdown(full_response)
+
+        # Respuesta completa: agente (o router) + render en streaming
+        trace.add_span("respond", "agent", response_started, time.perf_counter(),
+                       route=routed_turn.route if routed_turn is not None else "agent")
 
         # ===== LOGGING CONVERSACIÓN =====
-        print("="*80)
-        print("🤖 BOT:")
-        print("="*80)
-        print(full_response)
-        print("="*80 + "\n")
+        log_event("bot_message", sample=True, session_id=st.session_state.session_id, turn=turn,
+                  text=full_response)
 
         st.session_state.messages.append(AIMessage(content=full_response))
+        st.session_state.synced_count = len(st.session_state.messages)
+        st.session_state.synced_system = st.session_state.messages[0].content
 
         #  ACTUALIZAR ESTADO DEL FSM
         previous_state = st.session_state.state_manager.current_state
-        st.session_state.state_manager.update_state(
-            user_message=user_input,
-            agent_response=full_response
-        )
+        previous_interruptions = st.session_state.state_manager.get_interruption_count()
+        transition_mark = st.session_state.state_manager.get_transition_count()
+        with trace.span("fsm"):
+            st.session_state.state_manager.update_state(
+                user_message=user_input,
+                agent_response=full_response,
+                events=turn_events
+            )
         new_state = st.session_state.state_manager.current_state
 
-        # ===== LOGGING ESTADO FSM =====
-        if previous_state != new_state:
-            print("📊 CAMBIO DE ESTADO FSM:")
-            print(f"   {previous_state.value} → {new_state.value}")
-            print(f"   Progreso: {st.session_state.state_manager.get_progress_percentage()}%")
-            print()
-        
+        agent_turn = routed_turn is None
+        if agent_turn:
+            st.session_state.session_usage.add_turn(token_usage)
+        if METRICS_ENABLED:
+            record_turn(
+                "agent" if agent_turn else routed_turn.route,
+                [(start.value, end.value)
+                 for start, end in st.session_state.state_manager.get_transitions_since(transition_mark)],
+                st.session_state.state_manager.get_interruption_count() - previous_interruptions,
+                token_usage if agent_turn else None
+            )
+
+        if TRACING_ENABLED:
+            st.session_state.traces = (st.session_state.traces + [trace])[-TRACE_HISTORY_TURNS:]
+            if TRACE_EXPORT_PATH:
+                get_trace_exporter(TRACE_EXPORT_PATH).export(trace)
+
+        # ===== LOGGING TURNO Y ESTADO FSM =====
+        log_event(
+            "turn_completed",
+            session_id=st.session_state.session_id,
+            turn=turn,
+            route=routed_turn.route if routed_turn is not None else "agent",
+            state=new_state.value,
+            previous_state=previous_state.value,
+            progress=st.session_state.state_manager.get_progress_percentage(),
+            events=[event["type"] for event in turn_events],
+            **token_usage.to_dict(),
+            session_tokens=st.session_state.session_usage.total_tokens,
+            duration_ms=round(trace.duration_ms, 1)
+        )
+
         #  Forzar rerun para actualizar el sidebar
         st.rerun()
         
     except Exception as e:
+        log_event("turn_failed", logging.ERROR, exc_info=e,
+                  session_id=st.session_state.session_id, turn=turn)
         st.error(f"Error al generar respuesta: {str(e)}")
         st.info("**Posibles soluciones:**")
         st.write("1. Verifica que tu `OPENAI_API_KEY` esté configurada en el archivo .env")
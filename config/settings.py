@@ -2,12 +2,91 @@
 Configuración centralizada de la aplicación.
 """
 
+import os
+
 from data.flights import CANCELLED_FLIGHTS
 
 # Configuración del modelo
 DEFAULT_MODEL = "gpt-4o-mini"
 DEFAULT_TEMPERATURE = 0.3
 
+# Mostrar la respuesta del agente token a token (False = esperar la respuesta completa)
+STREAMING_ENABLED = True
+
+# Ejecutar el turno con la API async del agente (ainvoke/astream): las herramientas
+# esperan E/S sin bloquear el hilo
+ASYNC_AGENT_ENABLED = True
+
+# Contexto acotado: últimos N turnos textuales + resumen de los anteriores
+CONTEXT_MANAGEMENT_ENABLED = True
+CONTEXT_MAX_TURNS = 6          # Turnos recientes que se envían sin resumir
+CONTEXT_TOKEN_BUDGET = 3000    # Tokens de historial (sin el prompt) antes de resumir
+
+# Prefijo estático del mensaje del sistema: "full" (completo) o "compact" (~la mitad de tokens)
+# Comparar el comportamiento de ambas con: python -m benchmarks.eval_prompts
+PROMPT_VARIANT = "full"
+
+# Consumo de tokens por sesión (usage_metadata del modelo) y costo estimado
+# Precio en USD por millón de tokens (entrada, salida)
+MODEL_PRICING_PER_1M_TOKENS = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00)
+}
+# Al superar SESSION_TOKEN_BUDGET (None = sin tope) la sesión sigue con contexto reducido
+# ("trim") o deriva los turnos siguientes al 0800-ITTI sin llamar al modelo ("handoff")
+SESSION_TOKEN_BUDGET = 60000
+SESSION_BUDGET_ACTION = "trim"
+BUDGET_TRIM_TOKEN_BUDGET = 1000
+BUDGET_TRIM_MAX_TURNS = 2
+
+# Sesiones persistidas con checkpointer de LangGraph (SQLite)
+# Cada turno envía solo los mensajes nuevos; el historial se retoma del checkpoint.
+# Se activa definiendo la variable de entorno CHECKPOINT_DB_PATH (ej: /var/lib/vuela/checkpoints.sqlite);
+# el archivo crece con cada turno y no se poda
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH") or None
+CHECKPOINT_ENABLED = CHECKPOINT_DB_PATH is not None
+SYSTEM_MESSAGE_ID = "system-prompt"
+
+# Caché de resultados de herramientas de consulta (estado de vuelo / alternativas)
+# Se invalida al confirmar una reserva en el vuelo afectado
+TOOL_CACHE_ENABLED = True
+TOOL_CACHE_TTL_SECONDS = 30
+TOOL_CACHE_MAX_ENTRIES = 256
+
+# Resolver sin LLM los turnos simples tras listar alternativas ("1", "opción 2", "ITTI-FLY-021")
+FAST_PATH_ROUTER_ENABLED = True
+
+# Trazas por turno (prompt, router, LLM, herramientas, FSM, render)
+# Las últimas TRACE_HISTORY_TURNS se ven en cascada en el Modo Debug;
+# con TRACE_EXPORT_PATH (ej: "traces.jsonl") se exportan como JSON lines
+TRACING_ENABLED = True
+TRACE_HISTORY_TURNS = 5
+TRACE_EXPORT_PATH = None
+
+# Métricas en formato Prometheus (herramientas, reservas, FSM, tokens por turno)
+# server.py las sirve en GET /metrics; bot.py, solo si se define METRICS_PORT (variable
+# de entorno, ej: 9464), en http://127.0.0.1:METRICS_PORT/metrics. Si el puerto ya está
+# en uso (otro worker u otra app) el bot sigue sin endpoint propio
+METRICS_ENABLED = True
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0) or None
+
+# Logs estructurados (JSON lines, escritos desde un hilo de fondo)
+# LOG_LEVEL y LOG_FILE se pueden definir como variables de entorno (LOG_FILE vacío = stdout);
+# el texto de los mensajes se loguea para LOG_SAMPLE_RATE de las sesiones, truncado a LOG_MAX_FIELD_CHARS
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE") or None
+LOG_SAMPLE_RATE = 1.0
+LOG_MAX_FIELD_CHARS = 2000
+
+# Sesiones del servidor headless (server.py): solo las activas quedan en memoria;
+# las inactivas o menos usadas se guardan comprimidas en disco y se restauran al volver
+SESSION_SNAPSHOT_DIR = "session_snapshots"
+SESSION_MAX_IN_MEMORY = 1000
+SESSION_MEMORY_BUDGET_MB = 256
+SESSION_IDLE_TTL_SECONDS = 15 * 60
+SESSION_SNAPSHOT_RETENTION_SECONDS = 24 * 60 * 60
+SESSION_SWEEP_INTERVAL_SECONDS = 60
+
 # Función helper para obtener datos de un vuelo cancelado
 def get_cancelled_flight_data(flight_number: str) -> dict:
     """
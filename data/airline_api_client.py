@@ -0,0 +1,222 @@
+"""
+Cliente HTTP de la API de la aerolínea
+Implementa los mismos endpoints que simulan las funciones de data/flights.py,
+con conexiones keep-alive reutilizadas, timeouts, reintentos acotados y
+circuit breaker.
+
+Se activa con la variable de entorno AIRLINE_API_BASE_URL. Para probarlo sin
+la API real, levantar el stub local:
+    python -m data.stub_server --port 8080
+    AIRLINE_API_BASE_URL=http://127.0.0.1:8080 python -m streamlit run bot.py
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from typing import Optional
+from urllib.parse import quote
+
+import httpx
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# Errores en los que el request nunca llegó al servidor: reintentar es seguro incluso en POST
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Fallas del request que se reintentan (red, redirects, decodificación, 5xx, JSON inválido)
+_REQUEST_ERRORS = (httpx.RequestError, httpx.HTTPStatusError, ValueError)
+
+
+class AirlineAPIError(Exception):
+    """La API respondió con error o no respondió tras los reintentos"""
+
+
+class AirlineAPIClient:
+    """
+    Cliente de la API de vuelos con pool de conexiones.
+
+    Las respuestas tienen el mismo formato que las funciones mockeadas
+    (`{"found": ...}` / `{"success": ...}`), así las herramientas no cambian.
+    Si la API no está disponible se devuelve un error en ese mismo formato.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 5.0, max_retries: int = 2,
+                 max_connections: int = 20, backoff: float = 0.1,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            base_url: URL base de la API (ej: http://127.0.0.1:8080)
+            timeout: Timeout total por request en segundos
+            max_retries: Reintentos después del primer intento
+            max_connections: Conexiones máximas del pool (se mantienen vivas)
+            backoff: Espera base entre reintentos (se duplica en cada intento)
+            circuit_breaker: Circuit breaker compartido (por defecto, uno nuevo)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        self._timeout = httpx.Timeout(timeout, connect=min(timeout, 2.0))
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._client = httpx.Client(base_url=self.base_url, timeout=self._timeout, limits=self._limits)
+        # Un AsyncClient por event loop: sus conexiones no se pueden compartir entre loops.
+        # bot.py usa un único loop de fondo (utils/background_loop.py) y el servidor, el de uvicorn
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_env(cls) -> Optional["AirlineAPIClient"]:
+        """Crear el cliente desde AIRLINE_API_BASE_URL (None si no está configurada)"""
+        base_url = os.getenv("AIRLINE_API_BASE_URL")
+        if not base_url:
+            return None
+        return cls(base_url, timeout=float(os.getenv("AIRLINE_API_TIMEOUT", "5")))
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Obtener el AsyncClient del event loop actual"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(base_url=self.base_url, timeout=self._timeout, limits=self._limits)
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Cerrar el AsyncClient del event loop actual (ej: al apagar el servidor)"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _should_retry(self, method: str, error: Exception) -> bool:
+        """GET se reintenta ante cualquier falla de red o 5xx; POST solo si no se envió"""
+        if method == "GET":
+            return True
+        return isinstance(error, _NOT_SENT_ERRORS)
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> dict:
+        """Validar la respuesta y devolver su JSON"""
+        if response.status_code >= 500:
+            raise httpx.HTTPStatusError(
+                f"Error {response.status_code} de la API", request=response.request, response=response
+            )
+        return response.json()
+
+    def _request(self, method: str, path: str, **kwargs) -> dict:
+        """Request sync con circuit breaker y reintentos acotados"""
+        self.circuit_breaker.before_call()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = self._parse(self._client.request(method, path, **kwargs))
+                except _REQUEST_ERRORS as error:
+                    if attempt < self.max_retries and self._should_retry(method, error):
+                        time.sleep(self.backoff * 2 ** attempt)
+                        continue
+                    raise AirlineAPIError(str(error)) from error
+                self.circuit_breaker.record_success()
+                return result
+        except Exception:
+            self.circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            # Interrumpida sin resultado: no dejar el circuito trabado en HALF_OPEN
+            self.circuit_breaker.release_probe()
+            raise
+
+    async def _arequest(self, method: str, path: str, **kwargs) -> dict:
+        """Request async con circuit breaker y reintentos acotados"""
+        self.circuit_breaker.before_call()
+        try:
+            client = self._get_async_client()
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = self._parse(await client.request(method, path, **kwargs))
+                except _REQUEST_ERRORS as error:
+                    if attempt < self.max_retries and self._should_retry(method, error):
+                        await asyncio.sleep(self.backoff * 2 ** attempt)
+                        continue
+                    raise AirlineAPIError(str(error)) from error
+                self.circuit_breaker.record_success()
+                return result
+        except Exception:
+            self.circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelada (ej: el cliente se desconectó durante la prueba): liberar el HALF_OPEN
+            self.circuit_breaker.release_probe()
+            raise
+
+    @staticmethod
+    def _unavailable(result_key: str) -> dict:
+        """Respuesta de error con el formato de las funciones del data-layer"""
+        return {
+            result_key: False,
+            "error": "El sistema de vuelos no está disponible en este momento. Intente nuevamente en unos minutos"
+        }
+
+    def _call(self, result_key: str, method: str, path: str, **kwargs) -> dict:
+        try:
+            return self._request(method, path, **kwargs)
+        except (AirlineAPIError, CircuitOpenError):
+            return self._unavailable(result_key)
+
+    async def _acall(self, result_key: str, method: str, path: str, **kwargs) -> dict:
+        try:
+            return await self._arequest(method, path, **kwargs)
+        except (AirlineAPIError, CircuitOpenError):
+            return self._unavailable(result_key)
+
+    # ------------------------------------------------------------------------
+    # Endpoints
+    # ------------------------------------------------------------------------
+
+    def get_flight_status(self, flight_number: str) -> dict:
+        """GET /api/flights/{flight_number}/status"""
+        return self._call("found", "GET", f"/api/flights/{quote(flight_number, safe='')}/status")
+
+    def find_alternatives(self, cancelled_flight_number: str) -> dict:
+        """GET /api/flights/alternatives?cancelled={flight_number}"""
+        return self._call("found", "GET", "/api/flights/alternatives",
+                          params={"cancelled": cancelled_flight_number})
+
+    def create_booking(self, passenger_name: str, flight_number: str) -> dict:
+        """POST /api/bookings"""
+        return self._call("success", "POST", "/api/bookings",
+                          json={"passenger_name": passenger_name, "flight_number": flight_number})
+
+    def get_booking(self, confirmation_code: str) -> dict:
+        """GET /api/bookings/{confirmation_code}"""
+        return self._call("found", "GET", f"/api/bookings/{quote(confirmation_code, safe='')}")
+
+    def create_refund(self, passenger_name: str, flight_number: str) -> dict:
+        """POST /api/refunds"""
+        return self._call("success", "POST", "/api/refunds",
+                          json={"passenger_name": passenger_name, "flight_number": flight_number})
+
+    async def aget_flight_status(self, flight_number: str) -> dict:
+        """GET /api/flights/{flight_number}/status (async)"""
+        return await self._acall("found", "GET", f"/api/flights/{quote(flight_number, safe='')}/status")
+
+    async def afind_alternatives(self, cancelled_flight_number: str) -> dict:
+        """GET /api/flights/alternatives?cancelled={flight_number} (async)"""
+        return await self._acall("found", "GET", "/api/flights/alternatives",
+                                 params={"cancelled": cancelled_flight_number})
+
+    async def acreate_booking(self, passenger_name: str, flight_number: str) -> dict:
+        """POST /api/bookings (async)"""
+        return await self._acall("success", "POST", "/api/bookings",
+                                 json={"passenger_name": passenger_name, "flight_number": flight_number})
+
+    async def aget_booking(self, confirmation_code: str) -> dict:
+        """GET /api/bookings/{confirmation_code} (async)"""
+        return await self._acall("found", "GET", f"/api/bookings/{quote(confirmation_code, safe='')}")
+
+    async def acreate_refund(self, passenger_name: str, flight_number: str) -> dict:
+        """POST /api/refunds (async)"""
+        return await self._acall("success", "POST", "/api/refunds",
+                                 json={"passenger_name": passenger_name, "flight_number": flight_number})
@@ -0,0 +1,387 @@
+"""
+Almacenamiento de reservas, reembolsos y asientos
+Dos implementaciones con la misma interfaz, usadas por data/flights.py:
+
+- MemoryBookingStore: diccionarios del proceso (comportamiento original)
+- SQLiteBookingStore: archivo SQLite compartido entre procesos y persistente
+  entre reinicios (WAL, pool de conexiones, commits agrupados)
+"""
+
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from data.confirmation_codes import make_memory_block_source
+from data.inventory import SeatInventory
+
+
+class MemoryBookingStore:
+    """Reservas y asientos en memoria del proceso"""
+
+    # Las operaciones no hacen E/S: las variantes async las ejecutan directo
+    blocking_io = False
+
+    def __init__(self, flights: Dict[str, dict], bookings: Dict[str, dict],
+                 inventory: SeatInventory, refunds: Optional[Dict[tuple, dict]] = None):
+        """
+        Args:
+            flights: Vuelos alternativos (se descuentan asientos sobre estos dicts)
+            bookings: Diccionario de reservas por código de confirmación
+            inventory: Inventario atómico de asientos sobre `flights`
+            refunds: Diccionario de reembolsos por (pasajero, vuelo cancelado)
+        """
+        self.flights = flights
+        self.bookings = bookings
+        self.inventory = inventory
+        self.refunds = refunds if refunds is not None else {}
+        self.next_code_block = make_memory_block_source()
+
+    def get_flights(self, flight_numbers: List[str]) -> List[dict]:
+        """Obtener vuelos alternativos con sus asientos actuales"""
+        return [self.flights[number] for number in flight_numbers]
+
+    def add_booking(self, booking: dict, allocate_code: Callable[[], str]) -> bool:
+        """
+        Reservar el asiento y guardar la reserva (completa `confirmation_code`
+        y `flight_details`).
+
+        Args:
+            booking: Reserva sin código
+            allocate_code: Genera el código; se llama solo si hay asiento, así
+                los intentos sin asientos no gastan códigos
+
+        Returns:
+            True si se guardó, False si el vuelo no tiene asientos
+        """
+        flight_number = booking["flight_number"]
+        if not self.inventory.reserve(flight_number):
+            return False
+        try:
+            booking["confirmation_code"] = allocate_code()
+        except Exception:
+            self.inventory.release(flight_number)
+            raise
+        booking["flight_details"] = self.flights[flight_number]
+
+        # Nunca pisar una reserva existente
+        if self.bookings.setdefault(booking["confirmation_code"], booking) is not booking:
+            self.inventory.release(flight_number)
+            raise KeyError(f"Código de confirmación duplicado: {booking['confirmation_code']}")
+        return True
+
+    def get_booking(self, confirmation_code: str) -> Optional[dict]:
+        """Obtener una reserva por código"""
+        return self.bookings.get(confirmation_code)
+
+    def add_refund(self, refund: dict) -> dict:
+        """
+        Guardar un reembolso (idempotente: uno por pasajero y vuelo cancelado).
+
+        Returns:
+            El reembolso guardado (el existente si ya se había procesado)
+        """
+        key = (_passenger_key(refund["passenger_name"]), refund["flight_number"])
+        return self.refunds.setdefault(key, refund)
+
+
+def _passenger_key(passenger_name: str) -> str:
+    """Nombre normalizado para detectar reembolsos repetidos"""
+    return " ".join(passenger_name.lower().split())
+
+
+# Sentencias SQL (constantes: sqlite3 las prepara una vez y las cachea por conexión)
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS flight_seats (
+    flight_number TEXT PRIMARY KEY,
+    available_seats INTEGER NOT NULL CHECK (available_seats >= 0)
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    confirmation_code TEXT PRIMARY KEY,
+    passenger_name TEXT NOT NULL,
+    flight_number TEXT NOT NULL REFERENCES flight_seats (flight_number),
+    booking_date TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS code_blocks (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    next_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refunds (
+    refund_code TEXT PRIMARY KEY,
+    passenger_key TEXT NOT NULL,
+    passenger_name TEXT NOT NULL,
+    flight_number TEXT NOT NULL,
+    refund_percentage INTEGER NOT NULL,
+    refund_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    UNIQUE (passenger_key, flight_number)
+);
+INSERT OR IGNORE INTO code_blocks (id, next_block) VALUES (1, 0);
+"""
+_SEED_SEATS_SQL = "INSERT OR IGNORE INTO flight_seats (flight_number, available_seats) VALUES (?, ?)"
+_SELECT_SEATS_SQL = "SELECT available_seats FROM flight_seats WHERE flight_number = ?"
+_RESERVE_SEAT_SQL = (
+    "UPDATE flight_seats SET available_seats = available_seats - 1 "
+    "WHERE flight_number = ? AND available_seats > 0"
+)
+_INSERT_BOOKING_SQL = (
+    "INSERT INTO bookings (confirmation_code, passenger_name, flight_number, booking_date, status) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_SELECT_BOOKING_SQL = (
+    "SELECT confirmation_code, passenger_name, flight_number, booking_date, status "
+    "FROM bookings WHERE confirmation_code = ?"
+)
+_INSERT_REFUND_SQL = (
+    "INSERT OR IGNORE INTO refunds (refund_code, passenger_key, passenger_name, flight_number, "
+    "refund_percentage, refund_date, status) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_SELECT_REFUND_SQL = (
+    "SELECT refund_code, passenger_name, flight_number, refund_percentage, refund_date, status "
+    "FROM refunds WHERE passenger_key = ? AND flight_number = ?"
+)
+_NEXT_BLOCK_SQL = "UPDATE code_blocks SET next_block = next_block + 1 WHERE id = 1"
+_SELECT_BLOCK_SQL = "SELECT next_block - 1 FROM code_blocks WHERE id = 1"
+
+
+class SQLiteBookingStore:
+    """
+    Reservas y asientos en SQLite.
+
+    - WAL: las lecturas no bloquean a la escritura ni entre sí
+    - Pool de conexiones para lecturas (una conexión por consulta en curso)
+    - Un hilo escritor agrupa las reservas concurrentes en una sola transacción
+      (un commit por lote); cada reserva usa su propio SAVEPOINT para que un
+      error no afecte al resto del lote
+    - El descuento de asientos es un UPDATE condicional: atómico también
+      entre procesos que comparten el archivo
+    """
+
+    # Las operaciones hacen E/S: las variantes async las ejecutan en un hilo
+    blocking_io = True
+
+    def __init__(self, db_path: str, flights: Dict[str, dict],
+                 pool_size: int = 8, max_batch: int = 64):
+        """
+        Args:
+            db_path: Archivo SQLite
+            flights: Vuelos alternativos (datos estáticos y asientos iniciales)
+            pool_size: Conexiones de lectura
+            max_batch: Reservas máximas por commit
+        """
+        self.db_path = db_path
+        self.flights = flights
+        self.max_batch = max_batch
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA_SQL)
+        # Sembrar asientos iniciales en una sola transacción (no pisa valores existentes)
+        conn.execute("BEGIN")
+        conn.executemany(
+            _SEED_SEATS_SQL,
+            [(number, flight["available_seats"]) for number, flight in flights.items()]
+        )
+        conn.execute("COMMIT")
+
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._pool.put(conn)
+        for _ in range(pool_size - 1):
+            self._pool.put(self._connect())
+
+        self._write_queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="booking-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Crear una conexión configurada (autocommit; las transacciones son explícitas)"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                               timeout=5.0, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Tomar una conexión del pool y devolverla al terminar"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _writer_loop(self):
+        """Procesar reservas en lotes: una transacción y un commit por lote"""
+        conn = self._connect()
+        while True:
+            batch = [self._write_queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                # Fuera de la transacción: pedir un bloque de códigos usa otra conexión
+                results = self._assign_codes(conn, batch)
+                conn.execute("BEGIN IMMEDIATE")
+                for index, (booking, _allocate_code, _future) in enumerate(batch):
+                    if results[index] is None:
+                        results[index] = self._write_booking(conn, booking)
+                conn.execute("COMMIT")
+            except Exception as exc:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for _booking, _allocate_code, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            for (_booking, _allocate_code, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _assign_codes(self, conn: sqlite3.Connection, batch: list) -> list:
+        """
+        Dar código a las reservas del lote que entran en los asientos libres.
+
+        Este hilo es el único del proceso que descuenta asientos, así que la
+        lectura previa alcanza: un código solo se pierde si otro proceso toma
+        el último asiento entre esta lectura y el lote.
+
+        Returns:
+            Por reserva: None (a escribir), False (sin asientos) o la excepción al generar el código
+        """
+        seats: Dict[str, int] = {}
+        results = []
+        for booking, allocate_code, _future in batch:
+            flight_number = booking["flight_number"]
+            if flight_number not in seats:
+                row = conn.execute(_SELECT_SEATS_SQL, (flight_number,)).fetchone()
+                seats[flight_number] = row[0] if row else 0
+            if seats[flight_number] <= 0:
+                results.append(False)
+                continue
+            try:
+                booking["confirmation_code"] = allocate_code()
+            except Exception as exc:
+                results.append(exc)
+                continue
+            seats[flight_number] -= 1
+            results.append(None)
+        return results
+
+    def _write_booking(self, conn: sqlite3.Connection, booking: dict):
+        """Descontar asiento e insertar la reserva dentro del lote actual"""
+        conn.execute("SAVEPOINT booking")
+        try:
+            if conn.execute(_RESERVE_SEAT_SQL, (booking["flight_number"],)).rowcount == 0:
+                conn.execute("RELEASE booking")
+                return False
+            # Asientos de la fila recién descontada (el lote tiene el lock de escritura)
+            booking["flight_details"] = self._with_seats(conn, booking["flight_number"])
+            conn.execute(_INSERT_BOOKING_SQL, (
+                booking["confirmation_code"],
+                booking["passenger_name"],
+                booking["flight_number"],
+                booking["booking_date"],
+                booking["status"]
+            ))
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK TO booking")
+            conn.execute("RELEASE booking")
+            return KeyError(f"Código de confirmación duplicado: {booking['confirmation_code']}")
+        conn.execute("RELEASE booking")
+        return True
+
+    def _with_seats(self, conn: sqlite3.Connection, flight_number: str) -> dict:
+        """Copia de los datos del vuelo con los asientos actuales de la base"""
+        row = conn.execute(_SELECT_SEATS_SQL, (flight_number,)).fetchone()
+        return {**self.flights[flight_number], "available_seats": row[0]}
+
+    def get_flights(self, flight_numbers: List[str]) -> List[dict]:
+        """Obtener vuelos alternativos con sus asientos actuales"""
+        with self._connection() as conn:
+            return [self._with_seats(conn, number) for number in flight_numbers]
+
+    def add_booking(self, booking: dict, allocate_code: Callable[[], str]) -> bool:
+        """
+        Reservar el asiento y guardar la reserva (espera al commit de su lote).
+        Completa `confirmation_code` y `flight_details` con los asientos que
+        quedaron en la base.
+
+        Args:
+            booking: Reserva sin código
+            allocate_code: Genera el código; se llama solo si el vuelo tiene
+                asiento para la reserva (ver _assign_codes)
+
+        Returns:
+            True si se guardó, False si el vuelo no tiene asientos
+        """
+        future: Future = Future()
+        self._write_queue.put((booking, allocate_code, future))
+        return future.result()
+
+    def get_booking(self, confirmation_code: str) -> Optional[dict]:
+        """Obtener una reserva por código"""
+        with self._connection() as conn:
+            row = conn.execute(_SELECT_BOOKING_SQL, (confirmation_code,)).fetchone()
+            if row is None:
+                return None
+            code, passenger_name, flight_number, booking_date, status = row
+            return {
+                "confirmation_code": code,
+                "passenger_name": passenger_name,
+                "flight_number": flight_number,
+                "flight_details": self._with_seats(conn, flight_number),
+                "booking_date": booking_date,
+                "status": status
+            }
+
+    def add_refund(self, refund: dict) -> dict:
+        """
+        Guardar un reembolso (idempotente: uno por pasajero y vuelo cancelado).
+
+        Returns:
+            El reembolso guardado (el existente si ya se había procesado)
+        """
+        passenger_key = _passenger_key(refund["passenger_name"])
+        with self._connection() as conn:
+            # Un solo INSERT en autocommit: la restricción UNIQUE evita duplicados entre procesos
+            conn.execute(_INSERT_REFUND_SQL, (
+                refund["refund_code"],
+                passenger_key,
+                refund["passenger_name"],
+                refund["flight_number"],
+                refund["refund_percentage"],
+                refund["refund_date"],
+                refund["status"]
+            ))
+            row = conn.execute(_SELECT_REFUND_SQL, (passenger_key, refund["flight_number"])).fetchone()
+        refund_code, passenger_name, flight_number, refund_percentage, refund_date, status = row
+        return {
+            "refund_code": refund_code,
+            "passenger_name": passenger_name,
+            "flight_number": flight_number,
+            "refund_percentage": refund_percentage,
+            "refund_date": refund_date,
+            "status": status
+        }
+
+    def next_code_block(self) -> int:
+        """Reservar un bloque de códigos de confirmación (único entre procesos)"""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(_NEXT_BLOCK_SQL)
+                block = conn.execute(_SELECT_BLOCK_SQL).fetchone()[0]
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            return block
@@ -0,0 +1,144 @@
+"""
+Generador de códigos de confirmación únicos
+Reemplaza los códigos aleatorios (que colisionan por la paradoja del cumpleaños)
+por una secuencia repartida en bloques.
+
+El proceso toma un bloque de números de la fuente y lo consume bajo un lock
+(sección crítica de una suma); solo al agotarlo pide otro. La unicidad depende
+únicamente de que la fuente no entregue dos veces el mismo bloque: en memoria
+alcanza con un contador del proceso; con almacenamiento compartido, la fuente
+puede ser un contador en la base (ver data/booking_store.py).
+
+Formato: ITTI-XXXXXXC
+- XXXXXX: número de secuencia mezclado (biyección) en base32 Crockford
+- C: dígito verificador (Luhn mod 32) para rechazar códigos mal tipeados
+"""
+
+import itertools
+import threading
+from typing import Callable
+
+# Alfabeto Crockford base32 (sin I, L, O, U para evitar confusiones al dictarlo)
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+CODE_PREFIX = "ITTI-"
+BODY_LENGTH = 6
+CODE_SPACE = len(ALPHABET) ** BODY_LENGTH  # 2^30 códigos
+
+# Mezcla lineal mod 2^30 con multiplicador impar: es una biyección, así que
+# preserva la unicidad y hace que reservas consecutivas no tengan códigos
+# parecidos. No es secreta (se invierte trivialmente): el código no sirve
+# como credencial de la reserva
+_SCRAMBLE_MULTIPLIER = 0x2C1B3C6D
+_SCRAMBLE_OFFSET = 0x1F3D5B79
+
+_CHAR_VALUES = {char: value for value, char in enumerate(ALPHABET)}
+
+
+class CodeSpaceExhaustedError(Exception):
+    """No quedan secuencias libres en el espacio de códigos"""
+
+
+def _check_char(body: str) -> str:
+    """Calcular el dígito verificador Luhn mod 32 de un cuerpo de código"""
+    base = len(ALPHABET)
+    factor = 2
+    total = 0
+    for char in reversed(body):
+        addend = factor * _CHAR_VALUES[char]
+        total += addend // base + addend % base
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(base - total % base) % base]
+
+
+def encode_code(sequence: int) -> str:
+    """
+    Convertir un número de secuencia en código de confirmación.
+
+    Args:
+        sequence: Número de secuencia único (0 <= sequence < 2^30)
+
+    Returns:
+        Código con formato ITTI-XXXXXXC
+    """
+    if not 0 <= sequence < CODE_SPACE:
+        raise ValueError(f"Secuencia fuera del espacio de códigos: {sequence}")
+
+    value = (sequence * _SCRAMBLE_MULTIPLIER + _SCRAMBLE_OFFSET) % CODE_SPACE
+    chars = []
+    for _ in range(BODY_LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    body = "".join(reversed(chars))
+
+    return f"{CODE_PREFIX}{body}{_check_char(body)}"
+
+
+def is_valid_code(code: str) -> bool:
+    """Verificar formato y dígito verificador de un código de confirmación"""
+    code = code.upper().strip()
+    if not code.startswith(CODE_PREFIX) or len(code) != len(CODE_PREFIX) + BODY_LENGTH + 1:
+        return False
+
+    body, check = code[len(CODE_PREFIX):-1], code[-1]
+    if any(char not in _CHAR_VALUES for char in body):
+        return False
+    return _check_char(body) == check
+
+
+def make_memory_block_source() -> Callable[[], int]:
+    """
+    Fuente de bloques local al proceso.
+
+    `next()` sobre itertools.count es atómico en CPython, así que no hace
+    falta lock para repartir bloques entre hilos. Es única solo dentro del
+    proceso: cada worker empieza desde el bloque 0, así que con varios
+    procesos hay que usar una fuente compartida (BOOKING_STORE=sqlite).
+    """
+    counter = itertools.count()
+    return lambda: next(counter)
+
+
+class ConfirmationCodeAllocator:
+    """
+    Asigna códigos de confirmación únicos en O(1).
+
+    El bloque de `block_size` secuencias es del proceso (no del hilo):
+    Streamlit atiende cada rerun en un hilo nuevo, y un bloque por hilo
+    descartaría casi todo el bloque en cada reserva. Solo se vuelve a la
+    fuente al agotarlo.
+
+    Los códigos son tan únicos como los bloques de la fuente: con la fuente
+    en memoria (la de por defecto) lo son solo dentro del proceso, y dos
+    workers con reservas compartidas repetirían códigos.
+    """
+
+    def __init__(self, block_source: Callable[[], int] = None, block_size: int = 256):
+        """
+        Args:
+            block_source: Función que devuelve un número de bloque nuevo en cada
+                llamada (por defecto, un contador del proceso)
+            block_size: Cantidad de códigos por bloque
+        """
+        self.block_source = block_source or make_memory_block_source()
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next_sequence = 0
+        self._block_end = 0
+
+    def next_code(self) -> str:
+        """
+        Obtener el siguiente código de confirmación.
+
+        Raises:
+            CodeSpaceExhaustedError: Si la fuente ya entregó todo el espacio de códigos
+        """
+        with self._lock:
+            if self._next_sequence >= self._block_end:
+                block = self.block_source()
+                self._next_sequence = block * self.block_size
+                self._block_end = self._next_sequence + self.block_size
+            sequence = self._next_sequence
+            if sequence >= CODE_SPACE:
+                raise CodeSpaceExhaustedError(f"Espacio de códigos agotado (secuencia {sequence})")
+            self._next_sequence += 1
+        return encode_code(sequence)
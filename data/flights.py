@@ -5,7 +5,16 @@ En producción, estas funciones harían llamadas HTTP a la API real.
 """
 
 from datetime import datetime
-import random
+from typing import Callable, List
+import asyncio
+import os
+
+from data.airline_api_client import AirlineAPIClient
+from data.booking_store import MemoryBookingStore, SQLiteBookingStore
+from data.confirmation_codes import CodeSpaceExhaustedError, ConfirmationCodeAllocator
+from data.inventory import SeatInventory
+from utils.metrics import BOOKINGS, SEAT_EXHAUSTED
+from utils.singleflight import SingleFlight
 
 # Base de datos de vuelos cancelados (ITTI-FLY-001 a 008)
 CANCELLED_FLIGHTS = {
@@ -346,9 +355,66 @@ FLIGHT_ALTERNATIVES_MAP = {
     "ITTI-FLY-008": ["ITTI-FLY-042", "ITTI-FLY-043", "ITTI-FLY-044"]
 }
 
+# Vuelos cancelados que ofrecen cada vuelo alternativo (índice inverso)
+CANCELLED_BY_ALTERNATIVE = {}
+for _cancelled, _alternatives in FLIGHT_ALTERNATIVES_MAP.items():
+    for _alternative in _alternatives:
+        CANCELLED_BY_ALTERNATIVE.setdefault(_alternative, []).append(_cancelled)
+
 # Base de datos de reservas (se va llenando)
 BOOKINGS_DATABASE = {}
 
+# Reembolsos procesados por (pasajero, vuelo cancelado)
+REFUNDS_DATABASE = {}
+
+# Inventario de asientos de los vuelos alternativos (reserva atómica por vuelo)
+SEAT_INVENTORY = SeatInventory(ALTERNATIVE_FLIGHTS)
+
+# Almacenamiento de reservas y asientos
+# BOOKING_STORE=memory (por defecto) o sqlite (persistente y compartido entre procesos)
+if os.getenv("BOOKING_STORE", "memory").lower() == "sqlite":
+    BOOKING_STORE = SQLiteBookingStore(
+        os.getenv("BOOKING_DB_PATH", "bookings.sqlite"),
+        ALTERNATIVE_FLIGHTS
+    )
+else:
+    BOOKING_STORE = MemoryBookingStore(ALTERNATIVE_FLIGHTS, BOOKINGS_DATABASE, SEAT_INVENTORY, REFUNDS_DATABASE)
+
+# Generador de códigos de confirmación únicos (los bloques salen del almacenamiento)
+CODE_ALLOCATOR = ConfirmationCodeAllocator(BOOKING_STORE.next_code_block)
+
+# Cliente de la API real de la aerolínea (AIRLINE_API_BASE_URL)
+# Si está configurado, las funciones de abajo delegan en él en vez de usar los mocks
+API_CLIENT = AirlineAPIClient.from_env()
+
+# Consultas idénticas concurrentes (ej: tras una cancelación masiva) comparten
+# una sola llamada al backend; cada llamador recibe su propia copia del resultado
+LOOKUP_COALESCER = SingleFlight()
+
+# Motivo ("reason") de una reserva fallida porque el vuelo se quedó sin asientos.
+# La API real y el stub lo devuelven igual; no depender del texto de "error".
+REASON_SOLD_OUT = "sold_out"
+
+# Funciones a notificar cuando una reserva cambia los asientos de un vuelo
+# (ej: invalidar cachés de las herramientas). Reciben el número de vuelo.
+BOOKING_LISTENERS: List[Callable[[str], None]] = []
+
+
+def add_booking_listener(listener: Callable[[str], None]):
+    """Registrar una función que se llama tras cada reserva confirmada"""
+    BOOKING_LISTENERS.append(listener)
+
+
+def _notify_booking(result: dict, flight_number: str) -> dict:
+    """Avisar a los listeners si la reserva se confirmó y contarla (devuelve el resultado)"""
+    if result.get("success"):
+        BOOKINGS.inc(flight_number)
+        for listener in BOOKING_LISTENERS:
+            listener(flight_number)
+    elif result.get("reason") == REASON_SOLD_OUT:
+        SEAT_EXHAUSTED.inc(flight_number)
+    return result
+
 
 # ============================================================================
 # FUNCIONES QUE SIMULAN API CALLS
@@ -362,6 +428,13 @@ def get_flight_status(flight_number: str) -> dict:
     Retorna información del estado de un vuelo.
     """
     flight_number = flight_number.upper().strip()
+    return LOOKUP_COALESCER.do(("status", flight_number), _fetch_flight_status, flight_number)
+
+
+def _fetch_flight_status(flight_number: str) -> dict:
+    """Consultar el estado de un vuelo en el backend (API real o datos locales)"""
+    if API_CLIENT is not None:
+        return API_CLIENT.get_flight_status(flight_number)
     
     # Buscar en vuelos cancelados
     if flight_number in CANCELLED_FLIGHTS:
@@ -374,7 +447,7 @@ def get_flight_status(flight_number: str) -> dict:
     if flight_number in ALTERNATIVE_FLIGHTS:
         return {
             "found": True,
-            "flight": ALTERNATIVE_FLIGHTS[flight_number]
+            "flight": BOOKING_STORE.get_flights([flight_number])[0]
         }
     
     # No encontrado
@@ -391,6 +464,15 @@ def find_alternatives(cancelled_flight_number: str) -> dict:
     Busca vuelos alternativos para un vuelo cancelado.
     """
     cancelled_flight_number = cancelled_flight_number.upper().strip()
+    return LOOKUP_COALESCER.do(
+        ("alternatives", cancelled_flight_number), _fetch_alternatives, cancelled_flight_number
+    )
+
+
+def _fetch_alternatives(cancelled_flight_number: str) -> dict:
+    """Buscar alternativas en el backend (API real o datos locales)"""
+    if API_CLIENT is not None:
+        return API_CLIENT.find_alternatives(cancelled_flight_number)
     
     # Verificar que el vuelo esté en la lista de cancelados
     if cancelled_flight_number not in CANCELLED_FLIGHTS:
@@ -401,7 +483,7 @@ def find_alternatives(cancelled_flight_number: str) -> dict:
     
     # Obtener las alternativas
     alternative_numbers = FLIGHT_ALTERNATIVES_MAP.get(cancelled_flight_number, [])
-    alternatives = [ALTERNATIVE_FLIGHTS[num] for num in alternative_numbers]
+    alternatives = BOOKING_STORE.get_flights(alternative_numbers)
     
     original_flight = CANCELLED_FLIGHTS[cancelled_flight_number]
     
@@ -420,6 +502,9 @@ def create_booking(passenger_name: str, flight_number: str) -> dict:
     Crea una nueva reserva para un pasajero en un vuelo específico.
     """
     flight_number = flight_number.upper().strip()
+
+    if API_CLIENT is not None:
+        return _notify_booking(API_CLIENT.create_booking(passenger_name, flight_number), flight_number)
     
     # Verificar que el vuelo existe y está disponible
     if flight_number not in ALTERNATIVE_FLIGHTS:
@@ -428,38 +513,36 @@ def create_booking(passenger_name: str, flight_number: str) -> dict:
             "error": f"El vuelo {flight_number} no está disponible para reservar"
         }
     
-    flight = ALTERNATIVE_FLIGHTS[flight_number]
-    
-    # Verificar disponibilidad de asientos
-    if flight["available_seats"] <= 0:
-        return {
-            "success": False,
-            "error": f"No hay asientos disponibles en el vuelo {flight_number}"
-        }
-    
-    # Generar código de confirmación
-    confirmation_code = f"ITTI-{random.randint(100000, 999999)}"
-    
-    # Crear reserva
+    # Crear reserva (el código se asigna recién con el asiento reservado)
     booking = {
-        "confirmation_code": confirmation_code,
+        "confirmation_code": None,
         "passenger_name": passenger_name,
         "flight_number": flight_number,
-        "flight_details": flight,
         "booking_date": datetime.now().isoformat(),
         "status": "CONFIRMED"
     }
     
-    # Guardar en base de datos
-    BOOKINGS_DATABASE[confirmation_code] = booking
-    
-    # Reducir asientos disponibles
-    ALTERNATIVE_FLIGHTS[flight_number]["available_seats"] -= 1
+    # Reservar el asiento, generar el código (único, sin reintentos) y guardar
+    # la reserva de forma atómica; el almacenamiento completa flight_details
+    # con los asientos que quedaron. Sin asientos no se gasta ningún código
+    try:
+        saved = BOOKING_STORE.add_booking(booking, CODE_ALLOCATOR.next_code)
+    except CodeSpaceExhaustedError:
+        return _notify_booking({
+            "success": False,
+            "error": "No se pudo generar el código de confirmación. Comuníquese al 0800-ITTI"
+        }, flight_number)
+    if not saved:
+        return _notify_booking({
+            "success": False,
+            "error": f"No hay asientos disponibles en el vuelo {flight_number}",
+            "reason": REASON_SOLD_OUT
+        }, flight_number)
     
-    return {
+    return _notify_booking({
         "success": True,
         "booking": booking
-    }
+    }, flight_number)
 
 
 def get_booking(confirmation_code: str) -> dict:
@@ -468,13 +551,123 @@ def get_booking(confirmation_code: str) -> dict:
     
     Obtiene información de una reserva por su código de confirmación.
     """
-    if confirmation_code in BOOKINGS_DATABASE:
+    confirmation_code = confirmation_code.upper().strip()
+
+    if API_CLIENT is not None:
+        return API_CLIENT.get_booking(confirmation_code)
+
+    booking = BOOKING_STORE.get_booking(confirmation_code)
+    if booking is not None:
         return {
             "found": True,
-            "booking": BOOKINGS_DATABASE[confirmation_code]
+            "booking": booking
         }
     
     return {
         "found": False,
         "error": f"No se encontró reserva con código {confirmation_code}"
     }
+
+
+def create_refund(passenger_name: str, flight_number: str) -> dict:
+    """
+    Simula: POST /api/refunds
+
+    Procesa el reembolso del 100% del boleto de un vuelo cancelado.
+    Es idempotente: un segundo pedido del mismo pasajero devuelve el mismo reembolso.
+    """
+    flight_number = flight_number.upper().strip()
+
+    if API_CLIENT is not None:
+        return API_CLIENT.create_refund(passenger_name, flight_number)
+
+    if flight_number not in CANCELLED_FLIGHTS:
+        return {
+            "success": False,
+            "error": f"El vuelo {flight_number} no está en la lista de cancelados: no corresponde reembolso"
+        }
+
+    try:
+        refund_code = CODE_ALLOCATOR.next_code()
+    except CodeSpaceExhaustedError:
+        return {
+            "success": False,
+            "error": "No se pudo generar el código del reembolso. Comuníquese al 0800-ITTI"
+        }
+
+    refund = BOOKING_STORE.add_refund({
+        "refund_code": refund_code,
+        "passenger_name": passenger_name,
+        "flight_number": flight_number,
+        "refund_percentage": 100,
+        "refund_date": datetime.now().isoformat(),
+        "status": "PROCESSED"
+    })
+
+    return {
+        "success": True,
+        "refund": refund
+    }
+
+
+# ============================================================================
+# VARIANTES ASYNC
+# Permiten que el agente (ainvoke) atienda muchas conversaciones en un proceso
+# mientras espera E/S. Con la API real se usa el cliente HTTP async; si el
+# almacenamiento local bloquea (SQLite), la llamada corre en un hilo del
+# executor; en memoria se ejecuta directo, sin costo extra.
+# ============================================================================
+
+async def _run_data_call(func, *args) -> dict:
+    """Ejecutar una función del data-layer sin bloquear el event loop"""
+    if BOOKING_STORE.blocking_io:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+async def aget_flight_status(flight_number: str) -> dict:
+    """Versión async de get_flight_status"""
+    flight_number = flight_number.upper().strip()
+    return await LOOKUP_COALESCER.ado(("status", flight_number), _afetch_flight_status, flight_number)
+
+
+async def _afetch_flight_status(flight_number: str) -> dict:
+    if API_CLIENT is not None:
+        return await API_CLIENT.aget_flight_status(flight_number)
+    return await _run_data_call(_fetch_flight_status, flight_number)
+
+
+async def afind_alternatives(cancelled_flight_number: str) -> dict:
+    """Versión async de find_alternatives"""
+    cancelled_flight_number = cancelled_flight_number.upper().strip()
+    return await LOOKUP_COALESCER.ado(
+        ("alternatives", cancelled_flight_number), _afetch_alternatives, cancelled_flight_number
+    )
+
+
+async def _afetch_alternatives(cancelled_flight_number: str) -> dict:
+    if API_CLIENT is not None:
+        return await API_CLIENT.afind_alternatives(cancelled_flight_number)
+    return await _run_data_call(_fetch_alternatives, cancelled_flight_number)
+
+
+async def acreate_booking(passenger_name: str, flight_number: str) -> dict:
+    """Versión async de create_booking"""
+    if API_CLIENT is not None:
+        flight_number = flight_number.upper().strip()
+        return _notify_booking(await API_CLIENT.acreate_booking(passenger_name, flight_number), flight_number)
+    return await _run_data_call(create_booking, passenger_name, flight_number)
+
+
+async def acreate_refund(passenger_name: str, flight_number: str) -> dict:
+    """Versión async de create_refund"""
+    if API_CLIENT is not None:
+        return await API_CLIENT.acreate_refund(passenger_name, flight_number.upper().strip())
+    return await _run_data_call(create_refund, passenger_name, flight_number)
+
+
+async def aget_booking(confirmation_code: str) -> dict:
+    """Versión async de get_booking"""
+    if API_CLIENT is not None:
+        return await API_CLIENT.aget_booking(confirmation_code.upper().strip())
+    return await _run_data_call(get_booking, confirmation_code)
@@ -0,0 +1,95 @@
+"""
+Inventario de asientos de los vuelos alternativos
+Reserva y libera asientos de forma atómica, con un lock por vuelo.
+
+Streamlit atiende cada sesión en un hilo del mismo proceso: sin lock, dos
+reservas simultáneas pueden leer el mismo `available_seats` y sobrevender.
+"""
+
+import threading
+import time
+from typing import Dict
+
+
+class SeatInventory:
+    """
+    Contador de asientos con reserva/liberación atómica por vuelo.
+
+    Opera sobre los diccionarios de vuelos existentes (campo `available_seats`),
+    así las herramientas siguen leyendo la disponibilidad como hasta ahora.
+    Cada vuelo tiene su propio lock: reservas en vuelos distintos no compiten.
+
+    También mide cuánto esperan las operaciones por el lock (contención),
+    para los benchmarks de carga.
+    """
+
+    def __init__(self, flights: Dict[str, dict]):
+        """
+        Args:
+            flights: Vuelos indexados por número (ej: ALTERNATIVE_FLIGHTS)
+        """
+        self._flights = flights
+        self._locks = {number: threading.Lock() for number in flights}
+        # Espera por vuelo: [operaciones, segundos totales, máximo]; se actualiza con el lock del vuelo tomado
+        self._waits = {number: [0, 0.0, 0.0] for number in flights}
+
+    def _acquire(self, flight_number: str, lock: threading.Lock):
+        """Tomar el lock de un vuelo registrando la espera"""
+        start = time.perf_counter()
+        lock.acquire()
+        waited = time.perf_counter() - start
+        wait = self._waits[flight_number]
+        wait[0] += 1
+        wait[1] += waited
+        if waited > wait[2]:
+            wait[2] = waited
+
+    def reserve(self, flight_number: str) -> bool:
+        """
+        Reservar un asiento si queda alguno.
+
+        Returns:
+            True si se descontó un asiento, False si el vuelo no existe o está lleno
+        """
+        lock = self._locks.get(flight_number)
+        if lock is None:
+            return False
+
+        self._acquire(flight_number, lock)
+        try:
+            flight = self._flights[flight_number]
+            if flight["available_seats"] <= 0:
+                return False
+            flight["available_seats"] -= 1
+            return True
+        finally:
+            lock.release()
+
+    def release(self, flight_number: str):
+        """Devolver un asiento reservado (ej: si la reserva falla después)"""
+        lock = self._locks[flight_number]
+        self._acquire(flight_number, lock)
+        try:
+            self._flights[flight_number]["available_seats"] += 1
+        finally:
+            lock.release()
+
+    def available(self, flight_number: str) -> int:
+        """Obtener los asientos disponibles de un vuelo"""
+        return self._flights[flight_number]["available_seats"]
+
+    def get_lock_stats(self) -> dict:
+        """Obtener operaciones, espera total/promedio y máxima por el lock (todos los vuelos)"""
+        operations = sum(wait[0] for wait in self._waits.values())
+        total_wait = sum(wait[1] for wait in self._waits.values())
+        return {
+            "operations": operations,
+            "total_wait_ms": total_wait * 1000,
+            "avg_wait_ms": total_wait / operations * 1000 if operations else 0.0,
+            "max_wait_ms": max((wait[2] for wait in self._waits.values()), default=0.0) * 1000
+        }
+
+    def reset_lock_stats(self):
+        """Reiniciar las mediciones de espera (ej: entre rondas de un benchmark)"""
+        for number in self._waits:
+            self._waits[number] = [0, 0.0, 0.0]
@@ -0,0 +1,115 @@
+"""
+Servidor stub de la API de la aerolínea
+Sirve los datos mockeados de data/flights.py por HTTP (keep-alive), con los
+mismos endpoints que consume data/airline_api_client.py. Permite probar el
+cliente HTTP y hacer pruebas de carga sin la API real.
+
+Uso:
+    python -m data.stub_server --port 8080
+    python -m data.stub_server --port 8080 --latency-ms 40   # simular latencia de red
+"""
+
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from data import flights
+
+# El stub siempre sirve los datos locales, aunque AIRLINE_API_BASE_URL esté definida
+flights.API_CLIENT = None
+
+_FLIGHT_STATUS_PATH = re.compile(r"^/api/flights/([^/]+)/status$")
+_BOOKING_PATH = re.compile(r"^/api/bookings/([^/]+)$")
+
+
+class AirlineStubHandler(BaseHTTPRequestHandler):
+    """Handler HTTP/1.1 (conexiones persistentes) de los endpoints de la API"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers y body salen en escrituras separadas: sin esto, Nagle + ACK
+    # diferido suman ~40 ms por request en conexiones keep-alive
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate_latency(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def do_GET(self):
+        self._simulate_latency()
+        url = urlparse(self.path)
+
+        match = _FLIGHT_STATUS_PATH.match(url.path)
+        if match:
+            return self._send_json(flights.get_flight_status(unquote(match.group(1))))
+
+        if url.path == "/api/flights/alternatives":
+            cancelled = parse_qs(url.query).get("cancelled", [""])[0]
+            return self._send_json(flights.find_alternatives(cancelled))
+
+        match = _BOOKING_PATH.match(url.path)
+        if match:
+            return self._send_json(flights.get_booking(unquote(match.group(1))))
+
+        self._send_json({"error": f"Ruta no encontrada: {url.path}"}, status=404)
+
+    def do_POST(self):
+        self._simulate_latency()
+        path = urlparse(self.path).path
+        actions = {"/api/bookings": flights.create_booking, "/api/refunds": flights.create_refund}
+        if path not in actions:
+            return self._send_json({"error": f"Ruta no encontrada: {self.path}"}, status=404)
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            passenger_name = payload["passenger_name"]
+            flight_number = payload["flight_number"]
+        except (ValueError, KeyError):
+            return self._send_json(
+                {"success": False, "error": "Se requieren passenger_name y flight_number"},
+                status=400
+            )
+
+        self._send_json(actions[path](passenger_name, flight_number))
+
+    def log_message(self, format, *args):
+        """Silenciar el log por request (ruido en pruebas de carga)"""
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8080, latency_ms: float = 0.0) -> ThreadingHTTPServer:
+    """Crear el servidor stub (llamar a serve_forever() para atender)"""
+    handler = type("ConfiguredAirlineStubHandler", (AirlineStubHandler,), {"latency": latency_ms / 1000})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de la API de la aerolínea")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latencia simulada por request")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms)
+    print(f"Stub de la API escuchando en http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
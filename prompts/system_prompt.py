@@ -41,28 +41,11 @@ Por favor, dígame qué opción prefiere y lo ayudaré inmediatamente.
     return message
 
 
-def get_system_message(passenger_name: str, flight_number: str, origin: str,
-                       destination: str, cancellation_reason: str) -> str:
-    """
-    Genera el mensaje del sistema con el contexto específico del pasajero
-
-    Args:
-        passenger_name: Nombre del pasajero
-        flight_number: Número del vuelo cancelado
-        origin: Origen del vuelo
-        destination: Destino del vuelo
-        cancellation_reason: Motivo de la cancelación
-
-    Returns:
-        Mensaje del sistema formateado
-    """
-    return f"""Eres un asistente de servicio al cliente de VuelaConNosotros, una aerolínea profesional.
-
-CONTEXTO DEL ESCENARIO:
-- Pasajero: {passenger_name}
-- Vuelo cancelado: {flight_number}
-- Ruta: {origin} → {destination}
-- Motivo: {cancellation_reason}
+# Parte estática del mensaje del sistema (personalidad, reglas y herramientas).
+# Va primero y es idéntica en todas las sesiones y turnos: el proveedor puede
+# cachear ese prefijo (prompt caching) y cobrarlo/procesarlo más barato.
+# Los datos del pasajero y las instrucciones del estado van al final.
+SYSTEM_PROMPT_PREFIX = """Eres un asistente de servicio al cliente de VuelaConNosotros, una aerolínea profesional.
 
 TU PERSONALIDAD:
 - Empático y comprensivo con la situación del pasajero
@@ -75,11 +58,12 @@ OPCIONES DISPONIBLES PARA EL PASAJERO:
 2. 💰 Reembolso del costo total del boleto
 
 HERRAMIENTAS DISPONIBLES:
-Tienes acceso a 3 herramientas para ayudar al pasajero:
+Tienes acceso a 4 herramientas para ayudar al pasajero:
 
 1. check_flight_status: Verifica el estado de cualquier vuelo
 2. find_alternative_flights: Busca opciones alternativas para un vuelo cancelado
 3. make_booking: Realiza una nueva reserva cuando el pasajero confirme
+4. process_refund: Procesa el reembolso del boleto cuando el pasajero confirme
 
 TU MISIÓN:
 1. Ayudar al pasajero a elegir entre las 2 opciones disponibles
@@ -119,7 +103,7 @@ TU MISIÓN:
 
      Por favor confirme escribiendo 'Sí, confirmo el reembolso'."
 
-   - SOLO procesa después de confirmación explícita
+   - SOLO USA process_refund después de recibir confirmación explícita (ej: "sí, confirmo el reembolso")
    - IMPORTANTE: Cuando confirmes el reembolso, DEBES incluir EXACTAMENTE la frase "✅ Reembolso confirmado" en tu respuesta
 
 4. Responder todas sus dudas sobre el proceso
@@ -128,7 +112,8 @@ TU MISIÓN:
 REGLAS IMPORTANTES:
 - SIEMPRE usa las herramientas cuando necesites información de vuelos
 - NO inventes números de vuelo, horarios o disponibilidad
-- CRÍTICO: NUNCA uses make_booking sin haber recibido confirmación EXPLÍCITA del usuario
+- CRÍTICO: NUNCA uses make_booking ni process_refund sin haber recibido confirmación EXPLÍCITA del usuario
+- CRÍTICO: NUNCA digas que una reserva o un reembolso están confirmados sin haber usado la herramienta correspondiente
 - CRÍTICO: SIEMPRE pide confirmación usando el formato especificado arriba antes de acciones irreversibles
 - CRÍTICO: En cada confirmación DEBES mencionar que no podrán hacer cambios sin llamar al 0800-ITTI
 - NO pidas confirmación si el usuario no ha elegido una opción todavía
@@ -148,6 +133,233 @@ MANEJO DE CONTEXTO CONVERSACIONAL (MUY IMPORTANTE):
 - Si el usuario dice "2" después de ver vuelos, significa Opción 2 de vuelos, NO reembolso"""
 
 
+# Variante compacta (~la mitad de los tokens): mismas reglas, formatos de confirmación
+# y herramientas, sin repeticiones. Se elige con PROMPT_VARIANT en config/settings.py
+# y se compara con la completa usando benchmarks/eval_prompts.py
+SYSTEM_PROMPT_PREFIX_COMPACT = """Eres el asistente de servicio al cliente de VuelaConNosotros, una aerolínea profesional. Tono empático, profesional, claro y conciso.
+
+El vuelo del pasajero fue cancelado. Tiene 2 opciones:
+1. ✈️ Vuelos alternativos (hoy o mañana)
+2. 💰 Reembolso del costo total del boleto
+
+HERRAMIENTAS:
+- check_flight_status: estado de un vuelo
+- find_alternative_flights: alternativas para el vuelo cancelado
+- make_booking: reservar un vuelo (solo con confirmación explícita)
+- process_refund: reembolsar el boleto (solo con confirmación explícita)
+
+FLUJO:
+- Vuelos alternativos: usa find_alternative_flights, recomienda la mejor opción y pregunta "¿Cuál opción prefiere?". Cuando elija un vuelo, pide confirmación con este formato:
+  "Ha seleccionado el vuelo [NÚMERO] con destino a [DESTINO] que sale [DÍA] a las [HORA].
+  ⚠️ **¿Está completamente seguro de esta decisión?**
+  Una vez confirmada la reserva, NO PODRÁ hacer cambios directamente. Para cualquier modificación posterior necesitará comunicarse con nuestro centro de atención al **0800-ITTI**.
+  Por favor confirme escribiendo 'Sí, confirmo' o si desea reconsiderar, puede decirme 'No, quiero ver otras opciones'."
+  Solo con la confirmación ("sí, confirmo") usa make_booking.
+- Reembolso: pide confirmación con este formato:
+  "Procesaremos el reembolso del 100% del valor de su boleto.
+  ⚠️ **¿Está completamente seguro de solicitar el reembolso?**
+  Una vez procesado, NO PODRÁ volver hacia atrás. Para cualquier modificación necesitará comunicarse al **0800-ITTI**.
+  El reembolso se procesará en 5-7 días hábiles.
+  Por favor confirme escribiendo 'Sí, confirmo el reembolso'."
+  Solo con la confirmación usa process_refund e incluye EXACTAMENTE la frase "✅ Reembolso confirmado" en tu respuesta.
+- Preguntas no relacionadas: responde brevemente y vuelve al tema.
+
+REGLAS:
+- La información de vuelos sale SIEMPRE de las herramientas: no inventes números, horarios ni disponibilidad.
+- CRÍTICO: nunca uses make_booking ni process_refund sin confirmación EXPLÍCITA, ni digas que algo quedó confirmado sin usar la herramienta.
+- No pidas confirmación si el pasajero todavía no eligió una opción.
+- Después de mostrar vuelos, "1", "2", "3", "opción N", "la primera" se refieren a ESOS vuelos, no al reembolso (salvo que diga explícitamente "reembolso" o "devolver dinero")."""
+
+SYSTEM_PROMPT_PREFIXES = {
+    "full": SYSTEM_PROMPT_PREFIX,
+    "compact": SYSTEM_PROMPT_PREFIX_COMPACT
+}
+
+
+def get_system_prompt_prefix(variant: str = "full") -> str:
+    """
+    Prefijo estático del mensaje del sistema (constante, igual para todas las sesiones)
+
+    Args:
+        variant: "full" (completo) o "compact" (compacto)
+    """
+    if variant not in SYSTEM_PROMPT_PREFIXES:
+        raise ValueError(f"Variante de prompt desconocida: {variant} (opciones: {', '.join(SYSTEM_PROMPT_PREFIXES)})")
+    return SYSTEM_PROMPT_PREFIXES[variant]
+
+
+def get_system_prompt_tail(passenger_name: str, flight_number: str, origin: str,
+                           destination: str, cancellation_reason: str) -> str:
+    """
+    Genera la parte dinámica del mensaje del sistema (datos del pasajero)
+
+    Args:
+        passenger_name: Nombre del pasajero
+        flight_number: Número del vuelo cancelado
+        origin: Origen del vuelo
+        destination: Destino del vuelo
+        cancellation_reason: Motivo de la cancelación
+
+    Returns:
+        Contexto del escenario a continuación del prefijo estático
+    """
+    return f"""
+
+CONTEXTO DEL ESCENARIO:
+- Pasajero: {passenger_name}
+- Vuelo cancelado: {flight_number}
+- Ruta: {origin} → {destination}
+- Motivo: {cancellation_reason}"""
+
+
+def get_system_message(passenger_name: str, flight_number: str, origin: str,
+                       destination: str, cancellation_reason: str, variant: str = "full") -> str:
+    """
+    Genera el mensaje del sistema con el contexto específico del pasajero:
+    prefijo estático + datos del pasajero (las instrucciones del estado,
+    get_state_instructions, se agregan a continuación)
+
+    Args:
+        passenger_name: Nombre del pasajero
+        flight_number: Número del vuelo cancelado
+        origin: Origen del vuelo
+        destination: Destino del vuelo
+        cancellation_reason: Motivo de la cancelación
+        variant: Variante del prefijo estático ("full" o "compact")
+
+    Returns:
+        Mensaje del sistema formateado
+    """
+    return get_system_prompt_prefix(variant) + get_system_prompt_tail(
+        passenger_name, flight_number, origin, destination, cancellation_reason
+    )
+
+
+def get_summary_prompt(previous_summary: str, transcript: str) -> str:
+    """
+    Genera el prompt para resumir turnos antiguos de la conversación
+
+    Args:
+        previous_summary: Resumen acumulado hasta ahora (puede estar vacío)
+        transcript: Turnos nuevos a incorporar al resumen
+
+    Returns:
+        Prompt de resumen formateado
+    """
+    return f"""Resume la conversación entre un pasajero y el asistente de VuelaConNosotros.
+
+Conserva SOLO los datos necesarios para continuar la atención:
+- Qué opción eligió el pasajero (vuelos alternativos o reembolso) y cambios de decisión
+- Vuelos mostrados, vuelo elegido y si ya confirmó o no
+- Códigos de confirmación, reembolsos procesados y pedidos pendientes
+
+Escribe como máximo 8 viñetas breves, en español, sin saludos ni relleno.
+
+RESUMEN ANTERIOR:
+{previous_summary or "(sin resumen previo)"}
+
+TURNOS NUEVOS:
+{transcript}"""
+
+
+def get_flight_selection_confirmation(flight: dict) -> str:
+    """
+    Genera el pedido de confirmación cuando el pasajero elige un vuelo alternativo
+    (mismo formato obligatorio que se le indica al agente)
+
+    Args:
+        flight: Datos del vuelo elegido (number, destination, departure_day, scheduled_time)
+
+    Returns:
+        Mensaje de confirmación formateado
+    """
+    departure_day_label = "hoy" if flight.get("departure_day") == "today" else "mañana"
+
+    return f"""Ha seleccionado el vuelo **{flight['number']}** con destino a **{flight['destination']}** que sale {departure_day_label} a las {flight['scheduled_time']}.
+
+⚠️ **¿Está completamente seguro de esta decisión?**
+
+Una vez confirmada la reserva, NO PODRÁ hacer cambios directamente. Para cualquier
+modificación posterior necesitará comunicarse con nuestro centro de atención al **0800-ITTI**.
+
+Por favor confirme escribiendo 'Sí, confirmo' o si desea reconsiderar, puede decirme 'No, quiero ver otras opciones'."""
+
+
+def get_budget_handoff_message(passenger_name: str) -> str:
+    """
+    Genera la derivación al centro de atención cuando la conversación agotó
+    su presupuesto de tokens
+
+    Args:
+        passenger_name: Nombre del pasajero
+
+    Returns:
+        Mensaje de derivación formateado
+    """
+    return f"""Estimado/a {passenger_name}, para darle la mejor atención en su caso vamos a continuar por nuestro centro de atención al cliente.
+
+📞 Por favor comuníquese al **0800-ITTI**: un agente revisará su reserva y le ayudará a completar la gestión.
+
+Lamentamos las molestias y le agradecemos su paciencia."""
+
+
+CONFIRMATION_INSTRUCTIONS = """
+
+## 🔒 ACCIÓN REQUERIDA: SOLICITAR CONFIRMACIÓN
+
+El usuario acaba de tomar una decisión importante. DEBES pedir confirmación explícita ANTES de proceder.
+
+### Formato de Confirmación Obligatorio:
+
+"Perfecto, ha elegido [la opción]. 
+
+⚠️ **¿Está completamente seguro de esta decisión?** 
+
+Una vez confirmado, procesaremos inmediatamente y NO podrá hacer cambios sin comunicarse al **0800-ITTI**.
+
+Por favor confirme con 'Sí, confirmo' o si desea reconsiderar, puede decirme 'No, quiero cambiar'."
+
+**CRÍTICO:** NO PROCESES NADA hasta recibir confirmación explícita del usuario.
+"""
+
+FINAL_STATE_INSTRUCTIONS = """
+
+## 🚫 ESTADO FINAL ALCANZADO - NO MÁS CAMBIOS
+
+El proceso ya fue completado al 100%. NO PUEDES realizar más cambios directamente.
+
+Si el usuario intenta cambiar algo, responde exactamente así:
+
+"Su [reserva/reembolso] ya ha sido procesado y confirmado exitosamente. ✅
+
+Para realizar cualquier modificación, necesitará comunicarse con nuestro centro de atención al cliente al **0800-ITTI**.
+
+Nuestro equipo estará encantado de ayudarle con cualquier cambio que necesite. ¿Hay algo más en lo que pueda asistirle?"
+
+**NO ofrezcas hacer cambios tú mismo. SIEMPRE redirige al 0800-ITTI.**
+"""
+
+
+def get_state_instructions(needs_confirmation: bool, is_final_state: bool) -> str:
+    """
+    Genera las instrucciones dinámicas que se agregan al mensaje del sistema
+    según el estado de la conversación (FSM)
+
+    Args:
+        needs_confirmation: Si hay una decisión pendiente de confirmar
+        is_final_state: Si el flujo ya está resuelto (cambios solo por el 0800-ITTI)
+
+    Returns:
+        Bloques de instrucciones a concatenar (vacío si no corresponde ninguno)
+    """
+    instructions = ""
+    if needs_confirmation:
+        instructions += CONFIRMATION_INSTRUCTIONS
+    if is_final_state:
+        instructions += FINAL_STATE_INSTRUCTIONS
+    return instructions
+
+
 def get_agent_prompt() -> ChatPromptTemplate:
     """
     Crea el prompt template del sistema para el agente con herramientas
@@ -175,11 +387,12 @@ OPCIONES DISPONIBLES PARA EL PASAJERO:
 2. 💰 Reembolso del costo total del boleto
 
 HERRAMIENTAS DISPONIBLES:
-Tienes acceso a 3 herramientas para ayudar al pasajero:
+Tienes acceso a 4 herramientas para ayudar al pasajero:
 
 1. check_flight_status: Verifica el estado de cualquier vuelo
 2. find_alternative_flights: Busca opciones alternativas para un vuelo cancelado
 3. make_booking: Realiza una nueva reserva cuando el pasajero confirme
+4. process_refund: Procesa el reembolso del boleto cuando el pasajero confirme
 
 TU MISIÓN:
 1. Ayudar al pasajero a elegir entre las 2 opciones disponibles
@@ -219,7 +432,7 @@ TU MISIÓN:
 
      Por favor confirme escribiendo 'Sí, confirmo el reembolso'."
 
-   - SOLO procesa después de confirmación explícita
+   - SOLO USA process_refund después de recibir confirmación explícita (ej: "sí, confirmo el reembolso")
    - IMPORTANTE: Cuando confirmes el reembolso, DEBES incluir EXACTAMENTE la frase "✅ Reembolso confirmado" en tu respuesta
 
 4. Responder todas sus dudas sobre el proceso
@@ -228,7 +441,8 @@ TU MISIÓN:
 REGLAS IMPORTANTES:
 - SIEMPRE usa las herramientas cuando necesites información de vuelos
 - NO inventes números de vuelo, horarios o disponibilidad
-- CRÍTICO: NUNCA uses make_booking sin haber recibido confirmación EXPLÍCITA del usuario
+- CRÍTICO: NUNCA uses make_booking ni process_refund sin haber recibido confirmación EXPLÍCITA del usuario
+- CRÍTICO: NUNCA digas que una reserva o un reembolso están confirmados sin haber usado la herramienta correspondiente
 - CRÍTICO: SIEMPRE pide confirmación usando el formato especificado arriba antes de acciones irreversibles
 - CRÍTICO: En cada confirmación DEBES mencionar que no podrán hacer cambios sin llamar al 0800-ITTI
 - NO pidas confirmación si el usuario no ha elegido una opción todavía
@@ -0,0 +1,458 @@
+"""
+Servidor headless del asistente de VuelaConNosotros
+API HTTP async (Starlette + uvicorn) para integrar canales (WhatsApp, web,
+call center) sin pasar por Streamlit: mismo agente, herramientas, prompts y
+FSM que bot.py, con el estado de cada pasajero en memoria del proceso.
+
+Endpoints:
+    POST   /sessions                   Crear sesión → mensaje proactivo de cancelación
+    POST   /sessions/{id}/messages     Enviar un mensaje → SSE (token, tool_start, tool_end, done)
+                                       o JSON con {"stream": false}
+    GET    /sessions/{id}              Estado del FSM e historial
+    DELETE /sessions/{id}              Cerrar la sesión
+    GET    /health
+    GET    /metrics                    Métricas en formato Prometheus
+
+Uso:
+    python -m server --port 8000
+    curl -N -X POST localhost:8000/sessions/<id>/messages -d '{"message": "Quiero ver los vuelos"}'
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, ToolMessage
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from config.settings import (
+    AVAILABLE_CANCELLED_FLIGHTS, BUDGET_TRIM_MAX_TURNS, BUDGET_TRIM_TOKEN_BUDGET, CONTEXT_MANAGEMENT_ENABLED, CONTEXT_MAX_TURNS, CONTEXT_TOKEN_BUDGET,
+    DEFAULT_CANCELLATION_REASONS, DEFAULT_MODEL, DEFAULT_PASSENGER_NAME, DEFAULT_TEMPERATURE,
+    FAST_PATH_ROUTER_ENABLED, LOG_FILE, LOG_LEVEL, LOG_MAX_FIELD_CHARS, LOG_SAMPLE_RATE, METRICS_ENABLED,
+    MODEL_PRICING_PER_1M_TOKENS, SESSION_BUDGET_ACTION, SESSION_TOKEN_BUDGET, SESSION_IDLE_TTL_SECONDS, SESSION_MAX_IN_MEMORY, SESSION_MEMORY_BUDGET_MB,
+    SESSION_SNAPSHOT_DIR, SESSION_SNAPSHOT_RETENTION_SECONDS, SESSION_SWEEP_INTERVAL_SECONDS,
+    TRACE_EXPORT_PATH, TRACING_ENABLED
+)
+from data import flights
+from prompts.system_prompt import get_budget_handoff_message
+from utils.agent_factory import get_agent_executor, get_chat_model, get_tool_names
+from utils.agent_stream import (
+    AgentStream, get_tool_events, get_tool_exchanges, get_tool_progress_label, get_turn_messages, get_turn_tool_events
+)
+from utils.chat_session import ChatSession
+from utils.context_manager import ConversationContext, make_llm_summarizer
+from utils.metrics import CONTENT_TYPE, REGISTRY, record_turn
+from utils.router import RoutedTurn, route_turn
+from utils.session_store import SessionStore
+from utils.state_manager import SIDE_EFFECT_EVENTS
+from utils.structured_logging import configure_logging, log_event
+from utils.token_usage import TokenUsageHandler, enforce_session_budget
+from utils.tracing import TurnTrace, get_trace_exporter
+
+
+def _sse(event: str, data: dict) -> str:
+    """Formatear un evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def _read_json(request: Request) -> Optional[dict]:
+    """Body JSON del request (None si no es un objeto JSON válido)"""
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+class _SessionStreamingResponse(StreamingResponse):
+    """Respuesta SSE que libera la sesión al terminar, también si el cliente se desconecta"""
+
+    def __init__(self, content, release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+class ChatServer:
+    """
+    Sesiones y turnos del servidor headless.
+
+    Un turno por sesión a la vez (lock por sesión); sesiones distintas se
+    atienden en paralelo en el mismo event loop (ainvoke/astream). Las
+    sesiones inactivas pasan a disco (SessionStore) y vuelven al usarse.
+    """
+
+    def __init__(self, agent_executor, summarizer=None, snapshot_dir: str = SESSION_SNAPSHOT_DIR):
+        """
+        Args:
+            agent_executor: Grafo compilado del agente (compartido entre sesiones)
+            summarizer: Resumidor del contexto acotado (None = historial completo)
+            snapshot_dir: Carpeta de los snapshots de sesiones desalojadas
+        """
+        self.agent_executor = agent_executor
+        self.summarizer = summarizer
+        self.sessions = SessionStore(
+            snapshot_dir,
+            restore=lambda snapshot: ChatSession.from_snapshot(snapshot, self._new_context()),
+            max_sessions=SESSION_MAX_IN_MEMORY,
+            idle_ttl=SESSION_IDLE_TTL_SECONDS,
+            max_memory_bytes=SESSION_MEMORY_BUDGET_MB * 1024 * 1024,
+            snapshot_retention=SESSION_SNAPSHOT_RETENTION_SECONDS,
+            is_busy=lambda session: session.turn_lock.locked()
+        )
+
+    def _new_context(self) -> Optional[ConversationContext]:
+        if self.summarizer is None:
+            return None
+        return ConversationContext(
+            summarizer=self.summarizer,
+            max_turns=CONTEXT_MAX_TURNS,
+            token_budget=CONTEXT_TOKEN_BUDGET
+        )
+
+    async def create_session(self, passenger_name: str, flight_number: str,
+                             cancellation_reason: Optional[str] = None) -> ChatSession:
+        session = ChatSession(passenger_name, flight_number, cancellation_reason, self._new_context())
+        await asyncio.to_thread(self.sessions.put, session)
+        log_event("session_started", session_id=session.session_id, passenger_name=passenger_name,
+                  flight_number=flight_number, cancellation_reason=session.cancellation_reason)
+        return session
+
+    async def find_session(self, session_id: str, pin: bool = False) -> Optional[ChatSession]:
+        """
+        Sesión en memoria, o restaurada desde su snapshot (lectura de disco en un hilo).
+
+        Con `pin=True` queda fijada en memoria hasta `self.sessions.unpin(session)`:
+        hasta que el turno toma el lock de la sesión, nada más evita que se desaloje.
+        """
+        session = self.sessions.get_in_memory(session_id, pin)
+        if session is None:
+            session = await asyncio.to_thread(self.sessions.get, session_id, pin)
+        return session
+
+    async def sweep_sessions(self, interval: float = SESSION_SWEEP_INTERVAL_SECONDS):
+        """Tarea de fondo: pasar a disco las sesiones inactivas cada `interval` segundos"""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.sessions.evict_idle)
+
+    async def _route(self, session: ChatSession, user_input: str):
+        """Router previo al LLM (en un hilo si el data-layer bloquea) y presupuesto de tokens"""
+        routed_turn = None
+        if FAST_PATH_ROUTER_ENABLED:
+            args = (user_input, session.messages, session.state_manager, session.flight_number)
+            if flights.API_CLIENT is None and not flights.BOOKING_STORE.blocking_io:
+                routed_turn = route_turn(*args)
+            else:
+                routed_turn = await asyncio.to_thread(route_turn, *args)
+
+        # Sesión que superó su presupuesto: contexto reducido o derivación al 0800-ITTI
+        if routed_turn is None and enforce_session_budget(
+                session.usage, SESSION_TOKEN_BUDGET, SESSION_BUDGET_ACTION, session.context,
+                BUDGET_TRIM_TOKEN_BUDGET, BUDGET_TRIM_MAX_TURNS):
+            routed_turn = RoutedTurn("budget_handoff", get_budget_handoff_message(session.passenger_name))
+        return routed_turn
+
+    async def _agent_messages(self, session: ChatSession, config: dict):
+        """Mensajes del turno (el resumen de contexto llama al modelo: fuera del loop)"""
+        if session.context is None:
+            return session.get_agent_messages()
+        return await asyncio.to_thread(session.get_agent_messages, config)
+
+    def _start_turn(self, session: ChatSession, user_input: str) -> TurnTrace:
+        """Registrar el mensaje del pasajero y abrir la traza del turno"""
+        trace = TurnTrace(session.session_id, turn=session.turn_count + 1)
+        log_event("user_message", sample=True, session_id=session.session_id, turn=trace.turn,
+                  state=session.state_manager.current_state.value, text=user_input)
+        with trace.span("prompt"):
+            session.add_user_message(user_input)
+        return trace
+
+    def _agent_config(self, trace: TurnTrace, token_usage: TokenUsageHandler) -> dict:
+        """Configuración de la ejecución (tokens del turno, spans del modelo y de las herramientas)"""
+        callbacks = [token_usage]
+        if TRACING_ENABLED:
+            callbacks.append(trace.callback_handler())
+        return {"callbacks": callbacks}
+
+    async def _finish_turn(self, session: ChatSession, trace: TurnTrace, user_input: str,
+                           response: str, route: str, events: Optional[list],
+                           token_usage: Optional[TokenUsageHandler] = None) -> dict:
+        """Registrar la respuesta, avanzar el FSM y devolver el resultado del turno"""
+        if route != "agent":
+            session.fast_path_turns += 1
+        state_manager = session.state_manager
+        previous_state = state_manager.current_state
+        previous_interruptions = state_manager.get_interruption_count()
+        transition_mark = state_manager.get_transition_count()
+        with trace.span("fsm"):
+            changed = session.add_agent_response(user_input, response, events)
+        if token_usage is not None:
+            session.usage.add_turn(token_usage)
+        await asyncio.to_thread(self.sessions.put, session)
+
+        if METRICS_ENABLED:
+            record_turn(
+                route,
+                [(start.value, end.value) for start, end in state_manager.get_transitions_since(transition_mark)],
+                state_manager.get_interruption_count() - previous_interruptions,
+                token_usage
+            )
+
+        if TRACING_ENABLED and TRACE_EXPORT_PATH:
+            get_trace_exporter(TRACE_EXPORT_PATH).export(trace)
+        log_event("bot_message", sample=True, session_id=session.session_id, turn=trace.turn, text=response)
+        log_event(
+            "turn_completed",
+            session_id=session.session_id,
+            turn=trace.turn,
+            route=route,
+            state=state_manager.current_state.value,
+            previous_state=previous_state.value,
+            progress=state_manager.get_progress_percentage(),
+            events=[event["type"] for event in events or []],
+            **(token_usage.to_dict() if token_usage is not None else {}),
+            session_tokens=session.usage.total_tokens,
+            duration_ms=round(trace.duration_ms, 1)
+        )
+        return {
+            "response": response,
+            "route": route,
+            "state_changed": changed,
+            "duration_ms": round(trace.duration_ms, 1),
+            **session.get_status()
+        }
+
+    def _abort_turn(self, session: ChatSession, trace: TurnTrace, turn_start: int, user_input: str,
+                    turn_messages: List[BaseMessage]):
+        """
+        Cerrar un turno que falló o se cortó antes de responder.
+
+        Si ninguna herramienta cambió nada se descarta, para poder reintentarlo.
+        Si ya se confirmó una reserva o un reembolso, eso no se deshace: se
+        conservan los pedidos de herramientas con sus resultados y se aplican
+        sus eventos al FSM, así el agente no la repite en el próximo turno.
+        """
+        exchanges = get_tool_exchanges(turn_messages)
+        tool_messages = [message for message in exchanges if isinstance(message, ToolMessage)]
+        events = get_tool_events(tool_messages) or []
+        if not any(event["type"] in SIDE_EFFECT_EVENTS for event in events):
+            del session.messages[turn_start:]
+            return
+
+        session.add_tool_results(user_input, exchanges, events)
+        log_event("turn_partial", logging.WARNING, session_id=session.session_id, turn=trace.turn,
+                  state=session.state_manager.current_state.value,
+                  tools=[message.name for message in tool_messages],
+                  events=[event["type"] for event in events])
+
+    async def run_turn(self, session: ChatSession, user_input: str) -> dict:
+        """Atender un turno completo y devolver la respuesta con el estado"""
+        async with session.turn_lock:
+            turn_start = len(session.messages)
+            trace = self._start_turn(session, user_input)
+            result = None
+            try:
+                with trace.span("router"):
+                    routed_turn = await self._route(session, user_input)
+                if routed_turn is not None:
+                    return await self._finish_turn(session, trace, user_input,
+                                                   routed_turn.response, routed_turn.route, [])
+
+                token_usage = TokenUsageHandler(MODEL_PRICING_PER_1M_TOKENS.get(DEFAULT_MODEL))
+                agent_config = self._agent_config(trace, token_usage)
+                with trace.span("context"):
+                    agent_messages = await self._agent_messages(session, agent_config)
+                with trace.span("agent"):
+                    # Estado tras cada paso: si el turno falla, se sabe qué herramientas corrieron
+                    async for result in self.agent_executor.astream({"messages": agent_messages},
+                                                                    config=agent_config,
+                                                                    stream_mode="values"):
+                        pass
+            except BaseException as error:
+                self._abort_turn(session, trace, turn_start, user_input,
+                                 get_turn_messages(result["messages"]) if result is not None else [])
+                log_event("turn_failed", logging.ERROR, exc_info=error,
+                          session_id=session.session_id, turn=trace.turn)
+                raise
+
+            return await self._finish_turn(session, trace, user_input, result["messages"][-1].content,
+                                           "agent", get_turn_tool_events(result["messages"]), token_usage)
+
+    async def stream_turn(self, session: ChatSession, user_input: str) -> AsyncIterator[str]:
+        """Atender un turno emitiendo eventos SSE a medida que responde el agente"""
+        async with session.turn_lock:
+            turn_start = len(session.messages)
+            trace = self._start_turn(session, user_input)
+            agent_stream = None
+            answered = False
+            try:
+                with trace.span("router"):
+                    routed_turn = await self._route(session, user_input)
+                if routed_turn is not None:
+                    done = await self._finish_turn(session, trace, user_input,
+                                                   routed_turn.response, routed_turn.route, [])
+                    answered = True
+                    yield _sse("token", {"text": routed_turn.response})
+                    yield _sse("done", done)
+                    return
+
+                token_usage = TokenUsageHandler(MODEL_PRICING_PER_1M_TOKENS.get(DEFAULT_MODEL))
+                agent_config = self._agent_config(trace, token_usage)
+                with trace.span("context"):
+                    agent_messages = await self._agent_messages(session, agent_config)
+                agent_stream = AgentStream(self.agent_executor, {"messages": agent_messages},
+                                           config=agent_config)
+                agent_started = time.perf_counter()
+                async for kind, value in agent_stream.aevents():
+                    if kind == "token":
+                        yield _sse("token", {"text": value})
+                    else:
+                        yield _sse(kind, {"tool": value, "label": get_tool_progress_label(value)})
+                trace.add_span("agent", "agent", agent_started, time.perf_counter())
+
+                done = await self._finish_turn(session, trace, user_input, agent_stream.final_response,
+                                               "agent", agent_stream.tool_events, token_usage)
+                answered = True
+                yield _sse("done", done)
+            except Exception as error:
+                log_event("turn_failed", logging.ERROR, exc_info=error,
+                          session_id=session.session_id, turn=trace.turn)
+                yield _sse("error", {"error": str(error)})
+            finally:
+                # Error o cliente desconectado antes de la respuesta
+                if not answered:
+                    self._abort_turn(session, trace, turn_start, user_input,
+                                     agent_stream.messages if agent_stream is not None else [])
+
+    # ===== HANDLERS HTTP =====
+
+    async def health(self, request: Request) -> Response:
+        return JSONResponse({"status": "ok", "sessions": self.sessions.get_stats()})
+
+    async def metrics(self, request: Request) -> Response:
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    async def post_session(self, request: Request) -> Response:
+        body = await _read_json(request)
+        if body is None:
+            return _error(400, "El body debe ser un objeto JSON")
+
+        flight_number = str(body.get("flight_number", AVAILABLE_CANCELLED_FLIGHTS[0])).upper().strip()
+        if flight_number not in AVAILABLE_CANCELLED_FLIGHTS:
+            return _error(400, f"El vuelo {flight_number} no está en la lista de vuelos cancelados")
+        reason = body.get("cancellation_reason")
+        if reason is not None and reason not in DEFAULT_CANCELLATION_REASONS:
+            return _error(400, f"Motivo de cancelación no válido: {reason}")
+
+        session = await self.create_session(body.get("passenger_name") or DEFAULT_PASSENGER_NAME, flight_number, reason)
+        return JSONResponse({"message": session.notification, **session.get_status()}, status_code=201)
+
+    async def get_session(self, request: Request) -> Response:
+        session = await self.find_session(request.path_params["session_id"])
+        if session is None:
+            return _error(404, "Sesión no encontrada")
+        return JSONResponse({**session.get_status(), "messages": session.get_transcript()})
+
+    async def delete_session(self, request: Request) -> Response:
+        if not await asyncio.to_thread(self.sessions.delete, request.path_params["session_id"]):
+            return _error(404, "Sesión no encontrada")
+        return Response(status_code=204)
+
+    async def post_message(self, request: Request) -> Response:
+        session = await self.find_session(request.path_params["session_id"], pin=True)
+        if session is None:
+            return _error(404, "Sesión no encontrada")
+        streaming = False
+        try:
+            body = await _read_json(request)
+            user_input = str(body.get("message", "")).strip() if body else ""
+            if not user_input:
+                return _error(400, "Falta el campo 'message'")
+
+            if body.get("stream", True):
+                streaming = True
+                return _SessionStreamingResponse(
+                    self.stream_turn(session, user_input),
+                    release=lambda: self.sessions.unpin(session),
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
+
+            try:
+                return JSONResponse(await self.run_turn(session, user_input))
+            except Exception as error:
+                return _error(502, f"Error al generar respuesta: {error}")
+        finally:
+            # La respuesta SSE libera la sesión cuando termina de enviarse
+            if not streaming:
+                self.sessions.unpin(session)
+
+
+def create_app(agent_executor=None, summarizer=None) -> Starlette:
+    """
+    Crear la aplicación ASGI.
+
+    Args:
+        agent_executor: Grafo del agente (por defecto, el mismo que usa bot.py sin checkpointer)
+        summarizer: Resumidor del contexto acotado (por defecto, según CONTEXT_MANAGEMENT_ENABLED)
+    """
+    configure_logging(LOG_LEVEL, LOG_FILE, LOG_SAMPLE_RATE, LOG_MAX_FIELD_CHARS)
+    if agent_executor is None:
+        agent_executor = get_agent_executor(DEFAULT_MODEL, DEFAULT_TEMPERATURE, get_tool_names())
+        if CONTEXT_MANAGEMENT_ENABLED and summarizer is None:
+            summarizer = make_llm_summarizer(get_chat_model(DEFAULT_MODEL, DEFAULT_TEMPERATURE))
+
+    server = ChatServer(agent_executor, summarizer)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        sweeper = asyncio.create_task(server.sweep_sessions())
+        yield
+        sweeper.cancel()
+        if flights.API_CLIENT is not None:
+            await flights.API_CLIENT.aclose()
+
+    app = Starlette(lifespan=lifespan, routes=[
+        Route("/health", server.health, methods=["GET"]),
+        Route("/metrics", server.metrics, methods=["GET"]),
+        Route("/sessions", server.post_session, methods=["POST"]),
+        Route("/sessions/{session_id}", server.get_session, methods=["GET"]),
+        Route("/sessions/{session_id}", server.delete_session, methods=["DELETE"]),
+        Route("/sessions/{session_id}/messages", server.post_message, methods=["POST"]),
+    ])
+    app.state.chat_server = server
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor headless del asistente de VuelaConNosotros")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    load_dotenv()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Fixtures compartidas: cada test arranca con los asientos originales de los
+vuelos alternativos y con el caché de las herramientas vacío.
+"""
+
+import pytest
+
+from data import flights
+from tools.flight_tools import TOOL_RESULT_CACHE
+
+
+@pytest.fixture(autouse=True)
+def restore_seats():
+    seats = {number: flight["available_seats"] for number, flight in flights.ALTERNATIVE_FLIGHTS.items()}
+    TOOL_RESULT_CACHE.clear()
+    yield
+    for number, available in seats.items():
+        flights.ALTERNATIVE_FLIGHTS[number]["available_seats"] = available
+    TOOL_RESULT_CACHE.clear()
@@ -0,0 +1,50 @@
+"""
+Códigos de confirmación de las reservas: se generan recién con el asiento
+reservado, así los intentos sobre un vuelo sin asientos no gastan códigos.
+"""
+
+import copy
+from datetime import datetime
+
+import pytest
+
+from data.booking_store import MemoryBookingStore, SQLiteBookingStore
+from data.confirmation_codes import ConfirmationCodeAllocator, encode_code
+from data.flights import ALTERNATIVE_FLIGHTS
+from data.inventory import SeatInventory
+
+FLIGHT = "ITTI-FLY-022"
+
+
+def _memory_store(tmp_path, flights):
+    return MemoryBookingStore(flights, {}, SeatInventory(flights))
+
+
+def _sqlite_store(tmp_path, flights):
+    return SQLiteBookingStore(str(tmp_path / "bookings.sqlite"), flights)
+
+
+def _booking(idx: int) -> dict:
+    return {
+        "confirmation_code": None,
+        "passenger_name": f"Pasajero {idx}",
+        "flight_number": FLIGHT,
+        "booking_date": datetime.now().isoformat(),
+        "status": "CONFIRMED"
+    }
+
+
+@pytest.mark.parametrize("make_store", [_memory_store, _sqlite_store])
+def test_sold_out_attempts_do_not_consume_codes(tmp_path, make_store):
+    flights = {FLIGHT: {**copy.deepcopy(ALTERNATIVE_FLIGHTS[FLIGHT]), "available_seats": 2}}
+    store = make_store(tmp_path, flights)
+    allocator = ConfirmationCodeAllocator(store.next_code_block)
+
+    saved = [store.add_booking(_booking(idx), allocator.next_code) for idx in range(5)]
+
+    assert saved == [True, True, False, False, False]
+    # Los tres intentos sin asiento no tocaron la secuencia
+    assert allocator.next_code() == encode_code(2)
+    booking = store.get_booking(encode_code(1))
+    assert booking["passenger_name"] == "Pasajero 1"
+    assert booking["flight_details"]["available_seats"] == 0
@@ -0,0 +1,53 @@
+"""
+Métricas del FSM: un turno puede pasar por varios estados (ej: una reserva
+directa va de NOTIFIED a REBOOKING y a RESOLVED) y se cuentan todas las
+transiciones, no solo el estado inicial y el final.
+"""
+
+import pickle
+
+from utils.metrics import FSM_TRANSITIONS, record_turn
+from utils.state_manager import (
+    EVENT_BOOKING_CONFIRMED,
+    STATE_HISTORY_SIZE,
+    ConversationState,
+    StateManager,
+)
+
+NOTIFIED = ConversationState.NOTIFIED.value
+REBOOKING = ConversationState.REBOOKING.value
+RESOLVED = ConversationState.RESOLVED.value
+
+
+def _turn_transitions(state_manager: StateManager, mark: int) -> list:
+    return [(start.value, end.value) for start, end in state_manager.get_transitions_since(mark)]
+
+
+def test_turn_records_intermediate_transitions():
+    state_manager = StateManager()
+    mark = state_manager.get_transition_count()
+    state_manager.update_state("Sí, confirmo", "Listo", events=[{"type": EVENT_BOOKING_CONFIRMED}])
+
+    transitions = _turn_transitions(state_manager, mark)
+    assert transitions == [(NOTIFIED, REBOOKING), (REBOOKING, RESOLVED)]
+
+    before = (FSM_TRANSITIONS.get(NOTIFIED, REBOOKING), FSM_TRANSITIONS.get(REBOOKING, RESOLVED),
+              FSM_TRANSITIONS.get(NOTIFIED, RESOLVED))
+    record_turn("agent", transitions, 0)
+    assert FSM_TRANSITIONS.get(NOTIFIED, REBOOKING) == before[0] + 1
+    assert FSM_TRANSITIONS.get(REBOOKING, RESOLVED) == before[1] + 1
+    assert FSM_TRANSITIONS.get(NOTIFIED, RESOLVED) == before[2]
+
+
+def test_transitions_since_wraps_history_and_survives_pickle():
+    state_manager = StateManager()
+    for _ in range(STATE_HISTORY_SIZE):
+        state_manager.transition_to(ConversationState.REFUND)
+        state_manager.transition_to(ConversationState.REBOOKING)
+
+    state_manager = pickle.loads(pickle.dumps(state_manager))
+    mark = state_manager.get_transition_count()
+    assert state_manager.get_transitions_since(mark) == []
+
+    state_manager.transition_to(ConversationState.RESOLVED)
+    assert _turn_transitions(state_manager, mark) == [(REBOOKING, RESOLVED)]
@@ -0,0 +1,51 @@
+"""
+KeywordMatcher: mismas categorías que `keyword in text.lower()` por cada
+keyword, incluidas keywords solapadas, en mayúsculas o contenidas en otra.
+"""
+
+from utils.keyword_matcher import KeywordMatcher
+from utils.state_manager import AGENT_KEYWORDS, USER_KEYWORDS
+
+
+def _expected(text: str, categories: dict) -> frozenset:
+    text = text.lower()
+    return frozenset(
+        category for category, keywords in categories.items()
+        if any(keyword.lower() in text for keyword in keywords)
+    )
+
+
+def test_matches_substring_semantics():
+    categories = {
+        "a": ["abc", "xyz"],
+        "b": ["bcd"],           # empieza dentro de "abc"
+        "c": ["ab"],            # prefijo de "abc"
+        "d": ["abcdef"],        # extiende a "abc"
+        "e": ["Código", "¡Listo!"],
+    }
+    matcher = KeywordMatcher(categories)
+    texts = [
+        "", "abcd", "ab", "xabcdefx", "zzz", "ABCDEF", "el CÓDIGO es", "¡LISTO!", "bc d",
+        "x" * 50 + "abc", "aabbccdd", "código ¡listo! bcd",
+    ]
+    for text in texts:
+        assert matcher.match(text) == _expected(text, categories), text
+
+
+def test_matches_state_manager_keywords():
+    agent = KeywordMatcher(AGENT_KEYWORDS)
+    user = KeywordMatcher(USER_KEYWORDS)
+    texts = [
+        "¡RESERVA CONFIRMADA! Código de Confirmación: ITTI-ABC123",
+        "✅ Reembolso procesado. Vuelos disponibles: ninguno",
+        "Estas son las Alternativas", "Quiero VER las opciones", "me devuelvan la plata",
+        "Hemos procesado su reembolso", "muéstrame", "MUÉSTRAME", "2",
+    ]
+    for text in texts:
+        assert agent.match(text) == _expected(text, AGENT_KEYWORDS), text
+        assert user.match(text) == _expected(text, USER_KEYWORDS), text
+
+
+def test_no_keywords():
+    assert KeywordMatcher({}).match("texto") == frozenset()
+    assert KeywordMatcher({"vacía": []}).match("texto") == frozenset()
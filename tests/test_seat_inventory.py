@@ -0,0 +1,37 @@
+"""
+Reservas concurrentes sobre un mismo vuelo: nunca se venden más asientos de
+los disponibles y cada reserva confirmada queda guardada. Todo se verifica
+por la API del almacenamiento, no por los diccionarios del módulo.
+"""
+
+import sys
+
+import pytest
+
+from benchmarks.stress_inventory import run_round
+from data import flights
+
+FLIGHT = "ITTI-FLY-022"
+
+
+@pytest.fixture
+def frequent_switches():
+    # Cambios de hilo muy frecuentes para forzar intercalados
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("threads", [5, 300])
+def test_concurrent_bookings_never_oversell(frequent_switches, threads):
+    seats = flights.BOOKING_STORE.get_flights([FLIGHT])[0]["available_seats"]
+
+    result = run_round(FLIGHT, threads)
+
+    assert result["seats_before"] == seats
+    assert result["confirmed"] == min(threads, seats)
+    assert result["stored"] == result["confirmed"]
+    assert result["final_seats"] == seats - result["confirmed"]
+    assert result["final_seats"] >= 0
+    assert result["ok"]
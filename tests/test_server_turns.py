@@ -0,0 +1,104 @@
+"""
+Turnos del servidor que no llegan a responder (error o cliente desconectado):
+se descartan solo si ninguna herramienta hizo cambios. Una reserva ya
+confirmada queda en el historial y en el FSM.
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from benchmarks.fake_chat_model import ScriptedChatModel, passenger_policy
+from data import flights
+from server import ChatServer
+from tools.flight_tools import get_flight_tools
+from utils.agent_factory import build_agent_executor
+from utils.state_manager import ConversationState
+
+CANCELLED_FLIGHT = "ITTI-FLY-003"
+CHOSEN_FLIGHT = flights.FLIGHT_ALTERNATIVES_MAP[CANCELLED_FLIGHT][0]
+
+
+def _server(tmp_path, policy=passenger_policy) -> ChatServer:
+    executor = build_agent_executor(ScriptedChatModel(script=policy), get_flight_tools())
+    return ChatServer(executor, snapshot_dir=str(tmp_path))
+
+
+async def _session_choosing_flight(server: ChatServer):
+    session = await server.create_session("Ana Torres", CANCELLED_FLIGHT)
+    await server.run_turn(session, "Quiero ver los vuelos alternativos")
+    await server.run_turn(session, f"Quiero el vuelo {CHOSEN_FLIGHT}")
+    return session
+
+
+async def _disconnect_after_tool(server: ChatServer, session, user_input: str, tool: str):
+    """Consumir el SSE hasta que termina `tool` y cortar, como un cliente que se desconecta"""
+    stream = server.stream_turn(session, user_input)
+    async for event in stream:
+        if event.startswith("event: tool_end") and f'"tool": "{tool}"' in event:
+            break
+    await stream.aclose()
+
+
+def test_disconnect_after_booking_keeps_booking(tmp_path):
+    server = _server(tmp_path)
+    seats_before = flights.ALTERNATIVE_FLIGHTS[CHOSEN_FLIGHT]["available_seats"]
+
+    async def scenario():
+        session = await _session_choosing_flight(server)
+        await _disconnect_after_tool(server, session, "Sí, confirmo", "make_booking")
+        return session
+
+    session = asyncio.run(scenario())
+
+    assert flights.ALTERNATIVE_FLIGHTS[CHOSEN_FLIGHT]["available_seats"] == seats_before - 1
+    assert session.state_manager.current_state == ConversationState.RESOLVED
+    user_message, tool_request, tool_result = session.messages[-3:]
+    assert isinstance(user_message, HumanMessage) and user_message.content == "Sí, confirmo"
+    assert isinstance(tool_request, AIMessage) and tool_request.tool_calls[0]["name"] == "make_booking"
+    assert isinstance(tool_result, ToolMessage) and tool_result.tool_call_id == tool_request.tool_calls[0]["id"]
+    assert session.get_transcript()[-1] == {"role": "user", "content": "Sí, confirmo"}
+
+    restored = type(session).from_snapshot(session.to_snapshot())
+    assert restored.messages[-2].tool_calls == tool_request.tool_calls
+    assert (restored.messages[-1].tool_call_id, restored.messages[-1].artifact) == (
+        tool_result.tool_call_id, tool_result.artifact
+    )
+
+
+def test_disconnect_after_lookup_discards_turn(tmp_path):
+    server = _server(tmp_path)
+
+    async def scenario():
+        session = await server.create_session("Ana Torres", CANCELLED_FLIGHT)
+        turn_start = len(session.messages)
+        await _disconnect_after_tool(server, session, "Quiero ver los vuelos alternativos",
+                                     "find_alternative_flights")
+        return session, turn_start
+
+    session, turn_start = asyncio.run(scenario())
+
+    assert len(session.messages) == turn_start
+    assert session.state_manager.current_state == ConversationState.NOTIFIED
+
+
+def test_failed_turn_after_booking_keeps_booking(tmp_path):
+    def fail_after_tool(messages):
+        if isinstance(messages[-1], ToolMessage) and messages[-1].name == "make_booking":
+            raise RuntimeError("sin red")
+        return passenger_policy(messages)
+
+    server = _server(tmp_path, fail_after_tool)
+
+    async def scenario():
+        session = await _session_choosing_flight(server)
+        with pytest.raises(RuntimeError):
+            await server.run_turn(session, "Sí, confirmo")
+        return session
+
+    session = asyncio.run(scenario())
+
+    assert session.state_manager.current_state == ConversationState.RESOLVED
+    assert [type(message) for message in session.messages[-3:]] == [HumanMessage, AIMessage, ToolMessage]
+    assert session.messages[-1].name == "make_booking"
@@ -0,0 +1,54 @@
+"""
+SessionStore: una sesión fijada por un request no se desaloja hasta liberarla,
+así un request concurrente no restaura una segunda copia desde disco.
+"""
+
+import time
+
+from utils.session_store import SessionStore
+
+
+class FakeSession:
+    def __init__(self, session_id: str, turns: int = 0):
+        self.session_id = session_id
+        self.turns = turns
+        self.last_active = time.time()
+
+    def estimate_memory(self) -> int:
+        return 100
+
+    def to_snapshot(self) -> dict:
+        return {"session_id": self.session_id, "turns": self.turns}
+
+
+def _store(tmp_path, **kwargs) -> SessionStore:
+    return SessionStore(str(tmp_path), restore=lambda snapshot: FakeSession(**snapshot), **kwargs)
+
+
+def test_pinned_session_survives_eviction_until_unpinned(tmp_path):
+    store = _store(tmp_path, max_sessions=1)
+    store.put(FakeSession("a"))
+    session = store.get("a", pin=True)
+
+    # Otro request registra una sesión nueva antes de que el turno de "a" tome su lock
+    store.put(FakeSession("b"))
+    session.turns += 1
+    assert store.get("a") is session
+    assert store.get_stats()["restores"] == 0
+
+    store.unpin(session)
+    store.put(FakeSession("c"))
+    assert store.get_in_memory("a") is None
+    assert store.get("a").turns == 1
+
+
+def test_pinned_session_is_not_evicted_when_idle(tmp_path):
+    store = _store(tmp_path, idle_ttl=10)
+    store.put(FakeSession("a"))
+    session = store.get_in_memory("a", pin=True)
+
+    assert store.evict_idle(now=time.time() + 60) == 0
+    assert store.get_in_memory("a") is session
+
+    store.unpin(session)
+    assert store.evict_idle(now=time.time() + 60) == 1
@@ -0,0 +1,70 @@
+"""
+Tokens del turno con contexto acotado: la llamada que resume el historial
+va a su propio bucket, con y sin checkpoints, y la primera llamada del agente
+sigue contando como prompt.
+"""
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from benchmarks.fake_chat_model import ScriptedChatModel, passenger_policy
+from tools.flight_tools import get_flight_tools
+from utils.agent_factory import build_agent_executor
+from utils.context_manager import ConversationContext, make_llm_summarizer
+from utils.token_usage import TokenUsageHandler
+
+SUMMARY = "El pasajero consultó el estado de su vuelo."
+
+
+def _policy(messages):
+    if messages[-1].content.startswith("Resume la conversación"):
+        return AIMessage(content=SUMMARY)
+    return passenger_policy(messages)
+
+
+def _history():
+    messages = [SystemMessage(content="Pasajero: Ana Torres\nVuelo cancelado: ITTI-FLY-003")]
+    for idx in range(4):
+        messages += [HumanMessage(content=f"Consulta {idx} sobre el equipaje"),
+                     AIMessage(content="Puede llevar una valija de 23 kg. " * 10)]
+    return messages + [HumanMessage(content="¿Cuál es el estado de mi vuelo?")]
+
+
+def _assert_summary_apart(token_usage: TokenUsageHandler, result: dict, agent_messages: int):
+    first_agent_call = next(message for message in result["messages"][agent_messages:]
+                            if isinstance(message, AIMessage))
+    assert token_usage.summary_tokens > 0
+    assert token_usage.llm_calls == token_usage.agent_calls + 1
+    assert token_usage.prompt_tokens == first_agent_call.usage_metadata["input_tokens"]
+    assert token_usage.total_tokens == (token_usage.input_tokens + token_usage.output_tokens
+                                        + token_usage.summary_tokens)
+
+
+def test_summary_tokens_without_checkpoint():
+    model = ScriptedChatModel(script=_policy)
+    context = ConversationContext(make_llm_summarizer(model), max_turns=1, token_budget=50)
+    executor = build_agent_executor(model, get_flight_tools())
+    token_usage = TokenUsageHandler()
+    config = {"callbacks": [token_usage]}
+
+    agent_messages = context.build(_history(), config=config)
+    result = executor.invoke({"messages": agent_messages}, config=config)
+
+    assert context.summary == SUMMARY
+    _assert_summary_apart(token_usage, result, len(agent_messages))
+
+
+def test_summary_tokens_with_checkpoint():
+    model = ScriptedChatModel(script=_policy)
+    context = ConversationContext(make_llm_summarizer(model), max_turns=1, token_budget=50)
+    executor = build_agent_executor(model, get_flight_tools(), checkpointer=InMemorySaver())
+    token_usage = TokenUsageHandler()
+    history = _history()
+
+    result = executor.invoke({"messages": history}, config={
+        "configurable": {"thread_id": "ana", "conversation_context": context},
+        "callbacks": [token_usage],
+    })
+
+    assert context.summary == SUMMARY
+    _assert_summary_apart(token_usage, result, len(history))
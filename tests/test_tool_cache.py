@@ -0,0 +1,55 @@
+"""
+Caché de las herramientas de consulta: una consulta que empezó antes de una
+reserva no debe dejar en el caché los asientos de antes de la reserva.
+"""
+
+import asyncio
+
+from data import flights
+from tools import flight_tools
+
+CANCELLED_FLIGHT = "ITTI-FLY-003"
+BOOKED_FLIGHT = flights.FLIGHT_ALTERNATIVES_MAP[CANCELLED_FLIGHT][0]
+
+
+def _seats_line(seats: int) -> str:
+    return f"Asientos disponibles: {seats}"
+
+
+def test_lookup_interleaved_with_booking_is_not_cached(monkeypatch):
+    seats_before = flights.ALTERNATIVE_FLIGHTS[BOOKED_FLIGHT]["available_seats"]
+    fetch = flight_tools.find_alternatives
+
+    def lookup_then_booking(cancelled_flight_number):
+        # La consulta lee los asientos y, antes de que se cachee, otra sesión reserva
+        result = fetch(cancelled_flight_number)
+        snapshot = {**result, "alternatives": [dict(flight) for flight in result["alternatives"]]}
+        assert flights.create_booking("Otra Sesión", BOOKED_FLIGHT)["success"]
+        return snapshot
+
+    monkeypatch.setattr(flight_tools, "find_alternatives", lookup_then_booking)
+    stale_text, _ = flight_tools._find_alternative_flights(CANCELLED_FLIGHT)
+    assert _seats_line(seats_before) in stale_text
+
+    monkeypatch.setattr(flight_tools, "find_alternatives", fetch)
+    fresh_text, _ = flight_tools._find_alternative_flights(CANCELLED_FLIGHT)
+    assert _seats_line(seats_before - 1) in fresh_text
+
+
+def test_async_status_lookup_interleaved_with_booking_is_not_cached(monkeypatch):
+    seats_before = flights.ALTERNATIVE_FLIGHTS[BOOKED_FLIGHT]["available_seats"]
+    fetch = flight_tools.aget_flight_status
+
+    async def lookup_then_booking(flight_number):
+        result = await fetch(flight_number)
+        snapshot = {**result, "flight": dict(result["flight"])}
+        assert (await flights.acreate_booking("Otra Sesión", BOOKED_FLIGHT))["success"]
+        return snapshot
+
+    monkeypatch.setattr(flight_tools, "aget_flight_status", lookup_then_booking)
+    stale_text, _ = asyncio.run(flight_tools._acheck_flight_status(BOOKED_FLIGHT))
+    assert _seats_line(seats_before) in stale_text
+
+    monkeypatch.setattr(flight_tools, "aget_flight_status", fetch)
+    fresh_text, _ = asyncio.run(flight_tools._acheck_flight_status(BOOKED_FLIGHT))
+    assert _seats_line(seats_before - 1) in fresh_text
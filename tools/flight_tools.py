@@ -1,14 +1,117 @@
 """
 Herramientas del agente de VuelaConNosotros
 Estas herramientas permiten al agente interactuar con el sistema de vuelos
+
+Cada herramienta tiene implementación sync (invoke) y async (ainvoke) que
+comparten el formateo de la respuesta.
+
+Las respuestas de las herramientas de consulta se cachean por número de vuelo
+(TTL + LRU); una reserva confirmada invalida las entradas del vuelo afectado.
+
+Todas las herramientas devuelven (texto para el agente, artifact). El artifact
+lleva los eventos estructurados del turno ({"events": [...]}) que mueven el
+StateManager sin tener que interpretar el texto de la respuesta.
+
+Cada llamada se cuenta y se mide (utils/metrics.py) por herramienta.
 """
 
-from langchain.tools import tool
-from data.flights import get_flight_status, find_alternatives, create_booking
+import functools
+import time
+from typing import Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+from config.settings import TOOL_CACHE_ENABLED, TOOL_CACHE_MAX_ENTRIES, TOOL_CACHE_TTL_SECONDS
+from data.flights import (
+    get_flight_status, find_alternatives, create_booking, create_refund,
+    aget_flight_status, afind_alternatives, acreate_booking, acreate_refund,
+    add_booking_listener, CANCELLED_BY_ALTERNATIVE, REASON_SOLD_OUT
+)
+from utils.metrics import TOOL_CALLS, TOOL_LATENCY
+from utils.state_manager import EVENT_ALTERNATIVES_SHOWN, EVENT_BOOKING_CONFIRMED, EVENT_REFUND_PROCESSED
+from utils.ttl_cache import TTLCache
+
+TOOL_RESULT_CACHE = TTLCache(max_entries=TOOL_CACHE_MAX_ENTRIES, ttl=TOOL_CACHE_TTL_SECONDS)
+
+
+def _cache_key(kind: str, flight_number: str) -> tuple:
+    """Clave del caché: tipo de consulta + número de vuelo normalizado"""
+    return (kind, flight_number.upper().strip())
+
+
+def _get_cached(key: tuple) -> Optional[Tuple[str, dict]]:
+    if not TOOL_CACHE_ENABLED:
+        return None
+    return TOOL_RESULT_CACHE.get(key)
+
+
+def _store(key: tuple, generation: int, result: dict, output: Tuple[str, dict]) -> Tuple[str, dict]:
+    """
+    Cachear la respuesta formateada (solo si la consulta encontró el vuelo).
+
+    `generation` se toma antes de la consulta: si una reserva invalidó la
+    clave mientras tanto, la respuesta (con los asientos de antes) no se cachea.
+    """
+    if TOOL_CACHE_ENABLED and result["found"]:
+        TOOL_RESULT_CACHE.set(key, output, generation)
+    return output
+
+
+def _with_events(content: str, *events: dict) -> Tuple[str, dict]:
+    """Salida de una herramienta: texto para el agente + eventos para el StateManager"""
+    return content, {"events": list(events)}
+
+
+def _invalidate_flight(flight_number: str):
+    """Una reserva cambió los asientos: descartar el estado del vuelo y las alternativas que lo incluyen"""
+    TOOL_RESULT_CACHE.invalidate(("status", flight_number))
+    for cancelled_flight_number in CANCELLED_BY_ALTERNATIVE.get(flight_number, []):
+        TOOL_RESULT_CACHE.invalidate(("alternatives", cancelled_flight_number))
+
+
+add_booking_listener(_invalidate_flight)
 
 
-@tool
-def check_flight_status(flight_number: str) -> str:
+def get_tool_cache_stats() -> dict:
+    """Obtener aciertos/fallos del caché de herramientas"""
+    return TOOL_RESULT_CACHE.get_stats()
+
+
+def _record_tool(name: str, started: float, status: str):
+    TOOL_CALLS.inc(name, status)
+    TOOL_LATENCY.observe(time.perf_counter() - started, name)
+
+
+def _timed(name: str, func):
+    """Contar la llamada y medir su latencia (la firma y el docstring quedan para el schema)"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            output = func(*args, **kwargs)
+        except Exception:
+            _record_tool(name, started, "error")
+            raise
+        _record_tool(name, started, "ok")
+        return output
+    return wrapper
+
+
+def _atimed(name: str, coroutine):
+    """Versión async de _timed"""
+    @functools.wraps(coroutine)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            output = await coroutine(*args, **kwargs)
+        except Exception:
+            _record_tool(name, started, "error")
+            raise
+        _record_tool(name, started, "ok")
+        return output
+    return wrapper
+
+
+def _check_flight_status(flight_number: str) -> Tuple[str, dict]:
     """
     Verifica el estado actual de un vuelo específico.
     
@@ -21,8 +124,28 @@ def check_flight_status(flight_number: str) -> str:
     Returns:
         Información detallada del estado del vuelo
     """
+    key = _cache_key("status", flight_number)
+    cached = _get_cached(key)
+    if cached is not None:
+        return cached
+    generation = TOOL_RESULT_CACHE.generation(key)
     result = get_flight_status(flight_number)
-    
+    return _store(key, generation, result, _with_events(_format_flight_status(result)))
+
+
+async def _acheck_flight_status(flight_number: str) -> Tuple[str, dict]:
+    """Versión async de check_flight_status"""
+    key = _cache_key("status", flight_number)
+    cached = _get_cached(key)
+    if cached is not None:
+        return cached
+    generation = TOOL_RESULT_CACHE.generation(key)
+    result = await aget_flight_status(flight_number)
+    return _store(key, generation, result, _with_events(_format_flight_status(result)))
+
+
+def _format_flight_status(result: dict) -> str:
+    """Formatear el resultado de get_flight_status para el agente"""
     if not result["found"]:
         return f"❌ {result['error']}"
     
@@ -54,8 +177,7 @@ Estado: {flight['status']}
     return response.strip()
 
 
-@tool
-def find_alternative_flights(cancelled_flight_number: str) -> str:
+def _find_alternative_flights(cancelled_flight_number: str) -> Tuple[str, dict]:
     """
     Busca vuelos alternativos disponibles para un vuelo cancelado.
     
@@ -68,8 +190,39 @@ def find_alternative_flights(cancelled_flight_number: str) -> str:
     Returns:
         Lista de vuelos alternativos disponibles con todos los detalles
     """
+    key = _cache_key("alternatives", cancelled_flight_number)
+    cached = _get_cached(key)
+    if cached is not None:
+        return cached
+    generation = TOOL_RESULT_CACHE.generation(key)
     result = find_alternatives(cancelled_flight_number)
-    
+    return _store(key, generation, result, _alternatives_output(result))
+
+
+async def _afind_alternative_flights(cancelled_flight_number: str) -> Tuple[str, dict]:
+    """Versión async de find_alternative_flights"""
+    key = _cache_key("alternatives", cancelled_flight_number)
+    cached = _get_cached(key)
+    if cached is not None:
+        return cached
+    generation = TOOL_RESULT_CACHE.generation(key)
+    result = await afind_alternatives(cancelled_flight_number)
+    return _store(key, generation, result, _alternatives_output(result))
+
+
+def _alternatives_output(result: dict) -> Tuple[str, dict]:
+    """Texto de las alternativas + evento con las opciones listadas"""
+    if not result["found"]:
+        return _with_events(_format_alternatives(result))
+    return _with_events(_format_alternatives(result), {
+        "type": EVENT_ALTERNATIVES_SHOWN,
+        "cancelled_flight_number": result["original_flight"]["number"],
+        "options": [flight["number"] for flight in result["alternatives"]]
+    })
+
+
+def _format_alternatives(result: dict) -> str:
+    """Formatear el resultado de find_alternatives para el agente"""
     if not result["found"]:
         return f"❌ {result['error']}"
     
@@ -104,8 +257,7 @@ Horario original: {original['scheduled_time']}
     return response.strip()
 
 
-@tool
-def make_booking(passenger_name: str, flight_number: str) -> str:
+def _make_booking(passenger_name: str, flight_number: str) -> Tuple[str, dict]:
     """
     Realiza una nueva reserva para un pasajero en un vuelo específico.
 
@@ -119,13 +271,33 @@ def make_booking(passenger_name: str, flight_number: str) -> str:
     Returns:
         Confirmación de la reserva con código de referencia
     """
-    result = create_booking(passenger_name, flight_number)
+    return _booking_output(create_booking(passenger_name, flight_number), flight_number)
 
+
+async def _amake_booking(passenger_name: str, flight_number: str) -> Tuple[str, dict]:
+    """Versión async de make_booking"""
+    return _booking_output(await acreate_booking(passenger_name, flight_number), flight_number)
+
+
+def _booking_output(result: dict, flight_number: str) -> Tuple[str, dict]:
+    """Texto de la reserva + evento si quedó confirmada"""
+    if not result["success"]:
+        return _with_events(_format_booking(result, flight_number))
+    booking = result["booking"]
+    return _with_events(_format_booking(result, flight_number), {
+        "type": EVENT_BOOKING_CONFIRMED,
+        "confirmation_code": booking["confirmation_code"],
+        "flight_number": booking["flight_number"]
+    })
+
+
+def _format_booking(result: dict, flight_number: str) -> str:
+    """Formatear el resultado de create_booking para el agente"""
     if not result["success"]:
         error_msg = result['error']
 
         # Mensaje empático y profesional cuando no hay asientos
-        if "no hay asientos disponibles" in error_msg.lower():
+        if result.get("reason") == REASON_SOLD_OUT:
             return f"""😔 **Lamentamos informarle que el vuelo {flight_number} ya no tiene asientos disponibles.**
 
 Esto puede ocurrir cuando varios pasajeros reservan simultáneamente. Entendemos que esto es frustrante.
@@ -168,6 +340,93 @@ Clase: {flight['class']}
     return response.strip()
 
 
+def _process_refund(passenger_name: str, flight_number: str) -> Tuple[str, dict]:
+    """
+    Procesa el reembolso del 100% del boleto de un vuelo cancelado.
+
+    Usa esta herramienta solo cuando el usuario confirme explícitamente
+    que desea el reembolso (ej: "sí, confirmo el reembolso").
+
+    Args:
+        passenger_name: Nombre completo del pasajero
+        flight_number: Número del vuelo cancelado (ej: ITTI-FLY-001)
+
+    Returns:
+        Confirmación del reembolso con código de referencia
+    """
+    return _refund_output(create_refund(passenger_name, flight_number))
+
+
+async def _aprocess_refund(passenger_name: str, flight_number: str) -> Tuple[str, dict]:
+    """Versión async de process_refund"""
+    return _refund_output(await acreate_refund(passenger_name, flight_number))
+
+
+def _refund_output(result: dict) -> Tuple[str, dict]:
+    """Texto del reembolso + evento si quedó procesado"""
+    if not result["success"]:
+        return _with_events(_format_refund(result))
+    refund = result["refund"]
+    return _with_events(_format_refund(result), {
+        "type": EVENT_REFUND_PROCESSED,
+        "refund_code": refund["refund_code"],
+        "flight_number": refund["flight_number"]
+    })
+
+
+def _format_refund(result: dict) -> str:
+    """Formatear el resultado de create_refund para el agente"""
+    if not result["success"]:
+        return f"❌ {result['error']}\n\nPara revisar su caso puede comunicarse con nuestro centro de atención al **0800-ITTI**."
+
+    refund = result["refund"]
+
+    response = f"""
+✅ Reembolso confirmado
+
+Código de reembolso: **{refund['refund_code']}**
+Pasajero: {refund['passenger_name']}
+Vuelo cancelado: {refund['flight_number']}
+Monto: {refund['refund_percentage']}% del valor del boleto
+Plazo de acreditación: 5-7 días hábiles
+
+📧 Le hemos enviado el comprobante del reembolso por email.
+
+¿Necesita ayuda con algo más?
+"""
+
+    return response.strip()
+
+
+check_flight_status = StructuredTool.from_function(
+    func=_timed("check_flight_status", _check_flight_status),
+    coroutine=_atimed("check_flight_status", _acheck_flight_status),
+    name="check_flight_status",
+    response_format="content_and_artifact"
+)
+
+find_alternative_flights = StructuredTool.from_function(
+    func=_timed("find_alternative_flights", _find_alternative_flights),
+    coroutine=_atimed("find_alternative_flights", _afind_alternative_flights),
+    name="find_alternative_flights",
+    response_format="content_and_artifact"
+)
+
+make_booking = StructuredTool.from_function(
+    func=_timed("make_booking", _make_booking),
+    coroutine=_atimed("make_booking", _amake_booking),
+    name="make_booking",
+    response_format="content_and_artifact"
+)
+
+process_refund = StructuredTool.from_function(
+    func=_timed("process_refund", _process_refund),
+    coroutine=_atimed("process_refund", _aprocess_refund),
+    name="process_refund",
+    response_format="content_and_artifact"
+)
+
+
 def get_flight_tools():
     """
     Retorna la lista de herramientas disponibles para el agente.
@@ -175,5 +434,6 @@ def get_flight_tools():
     return [
         check_flight_status,
         find_alternative_flights,
-        make_booking
+        make_booking,
+        process_refund
     ]
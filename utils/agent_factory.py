@@ -0,0 +1,127 @@
+"""
+Fábrica del agente de VuelaConNosotros
+Construye el modelo y el grafo compilado una sola vez por proceso.
+
+El grafo no depende del pasajero: el mensaje del sistema viaja en la lista de
+mensajes de cada invocación, así que todas las sesiones comparten el mismo grafo.
+"""
+
+import asyncio
+import sqlite3
+from functools import lru_cache
+from typing import AsyncIterator, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.base import CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.prebuilt import create_react_agent
+
+from tools.flight_tools import get_flight_tools
+from utils.context_manager import context_pre_model_hook
+
+
+@lru_cache(maxsize=8)
+def get_chat_model(model: str, temperature: float) -> ChatOpenAI:
+    """Crear modelo LLM con caché para evitar recreaciones"""
+    # stream_usage: también en streaming llega el usage_metadata (tokens por turno)
+    return ChatOpenAI(model=model, temperature=temperature, streaming=True, stream_usage=True)
+
+
+def get_tool_names() -> Tuple[str, ...]:
+    """Obtener los nombres de las herramientas del agente (clave de caché)"""
+    return tuple(tool.name for tool in get_flight_tools())
+
+
+class ThreadedSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver que también sirve a la API async del agente (ainvoke/astream).
+
+    El checkpointer es uno por proceso y lo usan tanto los turnos async (en el
+    único loop de fondo de utils/background_loop.py) como los sync
+    (ASYNC_AGENT_ENABLED = False, hilos de Streamlit). AsyncSqliteSaver
+    necesita una conexión aiosqlite propia del loop y no serviría a los sync;
+    acá las operaciones async delegan en las sync (que ya usan lock y conexión
+    compartida) dentro de un hilo del executor, así la E/S de SQLite no frena
+    el loop de fondo mientras atiende otras sesiones.
+    """
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes, task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+@lru_cache(maxsize=4)
+def get_checkpointer(db_path: str) -> SqliteSaver:
+    """
+    Obtener el checkpointer SQLite compartido por todas las sesiones del proceso.
+
+    El archivo usa WAL para que varios procesos puedan leer y escribir
+    los hilos de conversación a la vez.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return ThreadedSqliteSaver(conn)
+
+
+@lru_cache(maxsize=8)
+def get_agent_executor(model: str, temperature: float,
+                       tool_names: Optional[Tuple[str, ...]] = None,
+                       checkpoint_db_path: Optional[str] = None):
+    """
+    Obtener el agente ReAct compilado para un modelo, temperatura y set de herramientas.
+
+    Args:
+        model: Nombre del modelo (ej: gpt-4o-mini)
+        temperature: Temperatura del modelo
+        tool_names: Herramientas a incluir (por defecto, todas)
+        checkpoint_db_path: Archivo SQLite de checkpoints. Si se indica, el
+            grafo guarda el historial por `thread_id` y cada turno solo envía
+            los mensajes nuevos; el contexto se acota con un pre_model_hook.
+
+    Returns:
+        Grafo de LangGraph compilado, compartido entre sesiones
+    """
+    tools_by_name = {tool.name: tool for tool in get_flight_tools()}
+    if tool_names is None:
+        tool_names = tuple(tools_by_name)
+
+    tools = [tools_by_name[name] for name in tool_names]
+    checkpointer = get_checkpointer(checkpoint_db_path) if checkpoint_db_path else None
+    return build_agent_executor(get_chat_model(model, temperature), tools, checkpointer)
+
+
+def build_agent_executor(chat_model, tools: list, checkpointer: Optional[SqliteSaver] = None):
+    """
+    Compilar el agente ReAct sobre un modelo ya construido (sin caché).
+
+    Lo usa get_agent_executor y sirve para armar el mismo grafo con otro
+    modelo (ej: el modelo simulado de los benchmarks).
+    """
+    if checkpointer is None:
+        return create_react_agent(chat_model, tools)
+
+    return create_react_agent(
+        chat_model,
+        tools,
+        checkpointer=checkpointer,
+        pre_model_hook=context_pre_model_hook
+    )
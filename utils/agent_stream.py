@@ -0,0 +1,254 @@
+"""
+Streaming de respuestas del agente
+Convierte el stream de mensajes de LangGraph en un generador de tokens
+compatible con st.write_stream, notificando el progreso de las herramientas.
+"""
+
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.ai import add_ai_message_chunks
+
+from utils.background_loop import next_in_background_loop, run_in_background_loop
+
+
+# Etiquetas de progreso que se muestran mientras corre cada herramienta
+TOOL_PROGRESS_LABELS = {
+    "check_flight_status": "🔎 Consultando el estado del vuelo...",
+    "find_alternative_flights": "✈️ Buscando vuelos alternativos...",
+    "make_booking": "📝 Procesando la reserva...",
+    "process_refund": "💰 Procesando el reembolso...",
+}
+
+
+def get_tool_progress_label(tool_name: str) -> str:
+    """Obtener la etiqueta de progreso de una herramienta"""
+    return TOOL_PROGRESS_LABELS.get(tool_name, f"⚙️ Ejecutando {tool_name}...")
+
+
+def get_tool_events(tool_messages: Iterable[ToolMessage]) -> Optional[List[dict]]:
+    """
+    Juntar los eventos de estado que emitieron las herramientas (artifact).
+
+    Returns:
+        Lista de eventos, o None si alguna herramienta no informa eventos
+        (el StateManager usa entonces el fallback por keywords)
+    """
+    events = []
+    for message in tool_messages:
+        if message.status == "error":
+            # La herramienta falló: no cambió nada
+            continue
+        artifact = message.artifact
+        if not isinstance(artifact, dict) or "events" not in artifact:
+            return None
+        events.extend(artifact["events"])
+    return events
+
+
+def get_turn_messages(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Mensajes del último turno (posteriores al último mensaje del usuario)"""
+    for idx in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[idx], HumanMessage):
+            return messages[idx + 1:]
+    return list(messages)
+
+
+def get_turn_tool_events(messages: List[BaseMessage]) -> Optional[List[dict]]:
+    """Eventos de las herramientas del último turno (posteriores al último mensaje del usuario)"""
+    return get_tool_events(
+        message for message in get_turn_messages(messages) if isinstance(message, ToolMessage)
+    )
+
+
+def get_tool_exchanges(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Pedidos de herramientas del modelo con sus resultados, sin los pedidos
+    que no llegaron a tener respuesta (ej: turno cortado a mitad).
+    """
+    answered = {message.tool_call_id for message in messages if isinstance(message, ToolMessage)}
+    exchanges = []
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            exchanges.append(message)
+        elif isinstance(message, AIMessage) and message.tool_calls:
+            tool_calls = [call for call in message.tool_calls if call["id"] in answered]
+            if tool_calls:
+                exchanges.append(AIMessage(content=message.content, tool_calls=tool_calls, id=message.id))
+    return exchanges
+
+
+class AgentStream:
+    """
+    Iterador sobre los tokens que genera el agente durante un turno.
+
+    Recorre `agent_executor.stream(..., stream_mode="messages")` y:
+    - Emite el texto de los chunks del nodo del modelo a medida que llegan
+    - Avisa (callbacks) cuando el modelo pide una herramienta y cuando termina
+    - Guarda la respuesta final (el texto posterior a la última herramienta)
+    - Guarda los pedidos de herramientas y sus resultados (`messages`)
+
+    Uso:
+        stream = AgentStream(agent_executor, {"messages": messages})
+        st.write_stream(stream)            # o stream.iter_async() / `async for`
+        full_response = stream.final_response
+
+    Sin UI (ej: SSE), `stream.aevents()` emite también el progreso de las herramientas.
+    """
+
+    def __init__(self, agent_executor, inputs: dict,
+                 on_tool_start: Optional[Callable[[str], None]] = None,
+                 on_tool_end: Optional[Callable[[str], None]] = None,
+                 config: Optional[dict] = None):
+        """
+        Args:
+            agent_executor: Grafo compilado de LangGraph
+            inputs: Entrada del grafo (ej: {"messages": [...]})
+            on_tool_start: Callback con el nombre de la herramienta solicitada
+            on_tool_end: Callback con el nombre de la herramienta que terminó
+            config: Configuración opcional de la ejecución
+        """
+        self.agent_executor = agent_executor
+        self.inputs = inputs
+        self.on_tool_start = on_tool_start
+        self.on_tool_end = on_tool_end
+        self.config = config
+        self.tool_calls: List[str] = []
+        self.tool_messages: List[ToolMessage] = []
+        self.messages: List[BaseMessage] = []
+        self._final_chunks: List[str] = []
+        self._model_chunks: List[AIMessageChunk] = []
+
+    @property
+    def final_response(self) -> str:
+        """Texto de la respuesta final del agente"""
+        return "".join(self._final_chunks)
+
+    @property
+    def tool_events(self) -> Optional[List[dict]]:
+        """Eventos de estado emitidos por las herramientas del turno"""
+        return get_tool_events(self.tool_messages)
+
+    def _handle_chunk(self, chunk, metadata: dict) -> Optional[str]:
+        """Procesar un chunk del stream y devolver el texto a mostrar (si hay)"""
+        # Solo interesa el nodo del modelo (no, por ejemplo, el resumen del pre_model_hook)
+        if metadata.get("langgraph_node") not in (None, "agent", "tools"):
+            return None
+
+        if isinstance(chunk, ToolMessage):
+            # Lo que se haya escrito antes de la herramienta no es la respuesta final
+            self._final_chunks = []
+            if self._model_chunks:
+                # El pedido de herramientas ya llegó completo
+                request = add_ai_message_chunks(*self._model_chunks)
+                self.messages.append(AIMessage(content=request.content, tool_calls=request.tool_calls,
+                                               id=request.id))
+                self._model_chunks = []
+            self.messages.append(chunk)
+            self.tool_messages.append(chunk)
+            if self.on_tool_end:
+                self.on_tool_end(chunk.name)
+            return None
+
+        if not isinstance(chunk, AIMessageChunk):
+            return None
+
+        # Los chunks de un mismo mensaje del modelo comparten id
+        if self._model_chunks and self._model_chunks[0].id != chunk.id:
+            self._model_chunks = []
+        self._model_chunks.append(chunk)
+
+        for tool_chunk in chunk.tool_call_chunks:
+            if tool_chunk.get("name"):
+                self.tool_calls.append(tool_chunk["name"])
+                if self.on_tool_start:
+                    self.on_tool_start(tool_chunk["name"])
+
+        if isinstance(chunk.content, str) and chunk.content:
+            self._final_chunks.append(chunk.content)
+            return chunk.content
+        return None
+
+    def __iter__(self) -> Iterator[str]:
+        stream = self.agent_executor.stream(
+            self.inputs,
+            config=self.config,
+            stream_mode="messages"
+        )
+
+        for chunk, metadata in stream:
+            text = self._handle_chunk(chunk, metadata)
+            if text:
+                yield text
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        stream = self.agent_executor.astream(
+            self.inputs,
+            config=self.config,
+            stream_mode="messages"
+        )
+
+        async for chunk, metadata in stream:
+            text = self._handle_chunk(chunk, metadata)
+            if text:
+                yield text
+
+    async def aevents(self) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream async del turno como eventos, en orden de llegada:
+        ("token", texto), ("tool_start", herramienta), ("tool_end", herramienta).
+        """
+        pending: List[Tuple[str, str]] = []
+        on_tool_start, on_tool_end = self.on_tool_start, self.on_tool_end
+
+        def tool_start(name: str):
+            pending.append(("tool_start", name))
+            if on_tool_start:
+                on_tool_start(name)
+
+        def tool_end(name: str):
+            pending.append(("tool_end", name))
+            if on_tool_end:
+                on_tool_end(name)
+
+        self.on_tool_start, self.on_tool_end = tool_start, tool_end
+        try:
+            async for chunk, metadata in self.agent_executor.astream(
+                self.inputs,
+                config=self.config,
+                stream_mode="messages"
+            ):
+                text = self._handle_chunk(chunk, metadata)
+                for event in pending:
+                    yield event
+                pending.clear()
+                if text:
+                    yield ("token", text)
+        finally:
+            self.on_tool_start, self.on_tool_end = on_tool_start, on_tool_end
+
+    def iter_async(self) -> Iterator[str]:
+        """
+        Consumir el stream async (astream) desde código sync, como st.write_stream.
+
+        El stream corre en el event loop de fondo del proceso (las conexiones
+        del cliente HTTP async se reutilizan entre turnos); los chunks se
+        procesan en el hilo que itera, así los callbacks de progreso pueden
+        actualizar la UI de Streamlit.
+        """
+        stream = self.agent_executor.astream(
+            self.inputs,
+            config=self.config,
+            stream_mode="messages"
+        )
+        try:
+            while True:
+                try:
+                    chunk, metadata = next_in_background_loop(stream)
+                except StopAsyncIteration:
+                    break
+                text = self._handle_chunk(chunk, metadata)
+                if text:
+                    yield text
+        finally:
+            run_in_background_loop(stream.aclose())
@@ -0,0 +1,43 @@
+"""
+Event loop de fondo del proceso
+Streamlit ejecuta cada rerun en código sync. Correr el agente async con un
+event loop nuevo por turno (asyncio.run) descarta todo lo que queda atado a
+ese loop, como el pool keep-alive del AsyncClient de la API de la aerolínea.
+Un único loop de larga vida en un hilo daemon lo conserva entre turnos.
+"""
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Obtener (o iniciar, la primera vez) el event loop de fondo del proceso"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agent-event-loop", daemon=True).start()
+        return _loop
+
+
+def run_in_background_loop(coroutine: Coroutine) -> Any:
+    """Ejecutar una corrutina en el loop de fondo y esperar su resultado desde código sync"""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_background_loop()).result()
+
+
+async def _anext(iterator: AsyncIterator) -> Any:
+    return await iterator.__anext__()
+
+
+def next_in_background_loop(iterator: AsyncIterator) -> Any:
+    """
+    Avanzar un iterador async en el loop de fondo.
+
+    Raises:
+        StopAsyncIteration: si el iterador terminó
+    """
+    return run_in_background_loop(_anext(iterator))
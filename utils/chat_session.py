@@ -0,0 +1,241 @@
+"""
+Sesión de chat sin UI
+Estado de la conversación de un pasajero (historial, FSM y contexto acotado)
+para atender turnos fuera de Streamlit, ej: desde server.py.
+
+Hace lo mismo que bot.py en cada turno, sin el costo del rerun: el mensaje
+del sistema se rearma solo al recibir un mensaje y no se renderiza nada.
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from config.settings import PROMPT_VARIANT, SYSTEM_MESSAGE_ID, get_cancelled_flight_data
+from prompts.system_prompt import get_cancellation_notification, get_state_instructions, get_system_message
+from utils.context_manager import ConversationContext
+from utils.state_manager import StateManager
+from utils.token_usage import SessionUsage
+
+# Costo fijo aproximado en memoria (objetos de LangChain, StateManager, dicts)
+_SESSION_OVERHEAD_BYTES = 4096
+_MESSAGE_OVERHEAD_BYTES = 1024
+
+
+class ChatSession:
+    """Conversación de un pasajero con el agente"""
+
+    def __init__(self, passenger_name: str, flight_number: str,
+                 cancellation_reason: Optional[str] = None,
+                 context: Optional[ConversationContext] = None,
+                 session_id: Optional[str] = None):
+        """
+        Args:
+            passenger_name: Nombre del pasajero
+            flight_number: Vuelo cancelado (origen/destino/motivo salen de data/flights.py)
+            cancellation_reason: Motivo a informar (por defecto, el del vuelo)
+            context: Contexto acotado (resumen de turnos antiguos); None = historial completo
+            session_id: Identificador (por defecto, uno nuevo)
+        """
+        flight = get_cancelled_flight_data(flight_number)
+        self.session_id = session_id or uuid.uuid4().hex
+        self.passenger_name = passenger_name
+        self.flight_number = flight_number
+        self.origin = flight["origin"]
+        self.destination = flight["destination"]
+        self.cancellation_reason = cancellation_reason or flight["reason"]
+        self.context = context
+        self.state_manager = StateManager()
+        self.fast_path_turns = 0
+        self.usage = SessionUsage()
+        self.last_active = time.time()
+        self.turn_lock = asyncio.Lock()  # Un turno a la vez por sesión
+
+        # Mensaje proactivo: la conversación arranca notificando la cancelación
+        self.notification = get_cancellation_notification(
+            passenger_name, flight_number, self.destination, self.cancellation_reason
+        )
+        self.messages: List[BaseMessage] = [
+            self._system_message(),
+            AIMessage(content=self.notification)
+        ]
+
+    def _system_message(self) -> SystemMessage:
+        """Mensaje del sistema con las instrucciones del estado actual"""
+        content = get_system_message(
+            self.passenger_name, self.flight_number, self.origin,
+            self.destination, self.cancellation_reason, PROMPT_VARIANT
+        ) + get_state_instructions(
+            self.state_manager.needs_confirmation(),
+            self.state_manager.is_final_state()
+        )
+        return SystemMessage(content=content, id=SYSTEM_MESSAGE_ID)
+
+    @property
+    def turn_count(self) -> int:
+        """Mensajes del pasajero recibidos"""
+        return sum(1 for message in self.messages if isinstance(message, HumanMessage))
+
+    def add_user_message(self, user_input: str):
+        """Registrar el mensaje del pasajero (y actualizar el mensaje del sistema)"""
+        self.last_active = time.time()
+        self.messages[0] = self._system_message()
+        self.messages.append(HumanMessage(content=user_input))
+
+    def get_agent_messages(self, config: Optional[dict] = None) -> List[BaseMessage]:
+        """
+        Mensajes a enviar al agente en este turno.
+
+        Con contexto acotado puede llamar al modelo para resumir turnos
+        antiguos (bloqueante): desde async, ejecutarlo en un hilo.
+
+        Args:
+            config: Config del turno; el resumen se registra con sus callbacks
+        """
+        if self.context is not None:
+            return self.context.build(self.messages, config=config)
+        return self.messages
+
+    def add_agent_response(self, user_input: str, response: str,
+                           events: Optional[List[dict]] = None) -> bool:
+        """
+        Registrar la respuesta y avanzar el FSM.
+
+        Args:
+            user_input: Mensaje del pasajero de este turno
+            response: Respuesta final del agente (o del router)
+            events: Eventos de las herramientas del turno (None = fallback por keywords)
+
+        Returns:
+            True si el estado de la conversación cambió
+        """
+        self.last_active = time.time()
+        self.messages.append(AIMessage(content=response))
+        previous_state = self.state_manager.current_state
+        self.state_manager.update_state(user_input, response, events=events)
+        return self.state_manager.current_state != previous_state
+
+    def add_tool_results(self, user_input: str, messages: List[BaseMessage], events: List[dict]):
+        """
+        Registrar las herramientas de un turno que no llegó a responder y avanzar el FSM.
+
+        Args:
+            user_input: Mensaje del pasajero de este turno
+            messages: Pedidos de herramientas del modelo y sus resultados
+            events: Eventos de esas herramientas
+        """
+        self.last_active = time.time()
+        self.messages.extend(messages)
+        self.state_manager.update_state(user_input, "", events=events)
+
+    def get_status(self) -> dict:
+        """Estado de la conversación para clientes sin UI (sidebar de bot.py)"""
+        state_manager = self.state_manager
+        return {
+            "session_id": self.session_id,
+            "passenger_name": self.passenger_name,
+            "flight_number": self.flight_number,
+            "state": state_manager.current_state.value,
+            "state_label": state_manager.get_state_label(state_manager.current_state),
+            "progress": state_manager.get_progress_percentage(),
+            "interruptions": state_manager.get_interruption_count(),
+            "turns": self.turn_count,
+            "fast_path_turns": self.fast_path_turns,
+            "usage": self.usage.to_dict()
+        }
+
+    def get_transcript(self) -> List[dict]:
+        """Historial visible (sin el mensaje del sistema)"""
+        return [
+            {"role": "assistant" if isinstance(message, AIMessage) else "user", "content": message.content}
+            for message in self.messages
+            if isinstance(message, HumanMessage) or (isinstance(message, AIMessage) and not message.tool_calls)
+        ]
+
+    def estimate_memory(self) -> int:
+        """Bytes aproximados que ocupa la sesión en memoria"""
+        return (
+            _SESSION_OVERHEAD_BYTES
+            + sum(sys.getsizeof(message.content) + _MESSAGE_OVERHEAD_BYTES for message in self.messages)
+            + (sys.getsizeof(self.context.summary) if self.context is not None else 0)
+        )
+
+    def to_snapshot(self) -> dict:
+        """
+        Estado mínimo para guardar la sesión fuera de memoria.
+
+        Sin el mensaje del sistema (se rearma) ni objetos de LangChain: el
+        historial queda como (rol, texto), y los pedidos de herramientas y sus
+        resultados con lo necesario para volver a armarlos. El resumidor del
+        contexto no se guarda; lo vuelve a poner quien restaura.
+        """
+        return {
+            "session_id": self.session_id,
+            "passenger_name": self.passenger_name,
+            "flight_number": self.flight_number,
+            "cancellation_reason": self.cancellation_reason,
+            "notification": self.notification,
+            "messages": [_message_to_snapshot(message) for message in self.messages[1:]],
+            "context": (self.context.summary, self.context.summarized_count) if self.context is not None else None,
+            "state_manager": self.state_manager,
+            "fast_path_turns": self.fast_path_turns,
+            "usage": self.usage,
+            "last_active": self.last_active
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict, context: Optional[ConversationContext] = None) -> "ChatSession":
+        """
+        Reconstruir una sesión guardada con to_snapshot.
+
+        Args:
+            snapshot: Estado guardado
+            context: Contexto acotado nuevo (recibe el resumen guardado)
+        """
+        session = cls.__new__(cls)
+        flight = get_cancelled_flight_data(snapshot["flight_number"])
+        session.session_id = snapshot["session_id"]
+        session.passenger_name = snapshot["passenger_name"]
+        session.flight_number = snapshot["flight_number"]
+        session.origin = flight["origin"]
+        session.destination = flight["destination"]
+        session.cancellation_reason = snapshot["cancellation_reason"]
+        session.notification = snapshot["notification"]
+        session.state_manager = snapshot["state_manager"]
+        session.fast_path_turns = snapshot["fast_path_turns"]
+        session.usage = snapshot.get("usage") or SessionUsage()
+        session.last_active = snapshot["last_active"]
+        session.turn_lock = asyncio.Lock()
+
+        session.context = context
+        if context is not None and snapshot["context"] is not None:
+            context.summary, context.summarized_count = snapshot["context"]
+
+        session.messages = [session._system_message()] + [
+            _message_from_snapshot(entry) for entry in snapshot["messages"]
+        ]
+        return session
+
+
+def _message_to_snapshot(message: BaseMessage) -> tuple:
+    if isinstance(message, ToolMessage):
+        return ("tool", message.content, message.name, message.tool_call_id, message.artifact)
+    if isinstance(message, AIMessage):
+        if message.tool_calls:
+            return ("ai", message.content, message.tool_calls)
+        return ("ai", message.content)
+    return ("human", message.content)
+
+
+def _message_from_snapshot(entry: tuple) -> BaseMessage:
+    role, content = entry[:2]
+    if role == "tool":
+        name, tool_call_id, artifact = entry[2:]
+        return ToolMessage(content=content, name=name, tool_call_id=tool_call_id, artifact=artifact)
+    if role == "ai":
+        return AIMessage(content=content, tool_calls=entry[2] if len(entry) > 2 else [])
+    return HumanMessage(content=content)
@@ -0,0 +1,83 @@
+"""
+Circuit Breaker para llamadas a servicios externos
+Corta las llamadas a un backend que viene fallando para no acumular
+timeouts en cada turno, y lo vuelve a probar pasado un tiempo.
+
+Estados:
+- CLOSED: las llamadas pasan; se cuentan los fallos consecutivos
+- OPEN: las llamadas se rechazan de inmediato hasta que pase `reset_timeout`
+- HALF_OPEN: se deja pasar una llamada de prueba; si funciona, vuelve a CLOSED
+"""
+
+import threading
+import time
+from enum import Enum
+
+
+class CircuitState(Enum):
+    """Estados del circuit breaker"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """La llamada se rechazó porque el circuito está abierto"""
+
+
+class CircuitBreaker:
+    """Circuit breaker thread-safe basado en fallos consecutivos"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Fallos consecutivos que abren el circuito
+            reset_timeout: Segundos que el circuito queda abierto antes de probar
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Verificar si la llamada puede pasar.
+
+        Raises:
+            CircuitOpenError: si el circuito está abierto (o ya hay una prueba en curso)
+        """
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return
+            if self.state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Dejar pasar una única llamada de prueba
+                self.state = CircuitState.HALF_OPEN
+                return
+            raise CircuitOpenError("El circuito está abierto: el servicio viene fallando")
+
+    def record_success(self):
+        """Registrar una llamada exitosa (cierra el circuito)"""
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.failure_count = 0
+
+    def release_probe(self):
+        """
+        Liberar la llamada de prueba que terminó sin resultado (ej: cancelada).
+
+        No cuenta como fallo: el circuito vuelve a OPEN con el tiempo ya
+        cumplido, así la próxima llamada hace una prueba nueva.
+        """
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self.state = CircuitState.OPEN
+
+    def record_failure(self):
+        """Registrar una llamada fallida (puede abrir el circuito)"""
+        with self._lock:
+            self.failure_count += 1
+            if self.state == CircuitState.HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self.state = CircuitState.OPEN
+                self.opened_at = time.monotonic()
@@ -0,0 +1,167 @@
+"""
+Context Manager - Ventana deslizante con resumen acumulado
+Acota el contexto que se envía al agente en cada turno.
+
+Mientras el historial entra en el presupuesto de tokens se envía completo.
+Cuando lo supera, se envían el mensaje del sistema, un resumen de los turnos
+antiguos y los últimos N turnos textuales.
+"""
+
+from typing import Callable, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from prompts.system_prompt import get_summary_prompt
+from utils.token_usage import SUMMARY_TAG
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """
+    Estimar tokens de una lista de mensajes (~4 caracteres por token).
+
+    Es una aproximación barata: alcanza para decidir cuándo resumir
+    sin tokenizar todo el historial en cada turno.
+    """
+    return sum(len(str(msg.content)) // 4 + 4 for msg in messages)
+
+
+def format_transcript(messages: List[BaseMessage]) -> str:
+    """Formatear mensajes como transcripción de texto plano"""
+    lines = []
+    for msg in messages:
+        if isinstance(msg, AIMessage) and not msg.content:
+            continue  # Solo pedidos de herramientas, su resultado viene después
+
+        if isinstance(msg, HumanMessage):
+            role = "Pasajero"
+        elif isinstance(msg, ToolMessage):
+            role = f"Herramienta {msg.name}"
+        else:
+            role = "Asistente"
+        lines.append(f"{role}: {msg.content}")
+    return "\n".join(lines)
+
+
+def make_llm_summarizer(chat_model) -> Callable[[str, List[BaseMessage]], str]:
+    """
+    Crear un resumidor que usa el modelo de chat.
+
+    Args:
+        chat_model: Modelo de LangChain usado para resumir
+
+    Returns:
+        Función (resumen_anterior, mensajes) -> resumen_nuevo
+    """
+    # El tag separa estas llamadas de las del agente en TokenUsageHandler
+    summary_model = chat_model.with_config(tags=[SUMMARY_TAG])
+
+    def summarize(previous_summary: str, messages: List[BaseMessage]) -> str:
+        prompt = get_summary_prompt(previous_summary, format_transcript(messages))
+        return summary_model.invoke([HumanMessage(content=prompt)]).content.strip()
+
+    return summarize
+
+
+class ConversationContext:
+    """
+    Mantiene el resumen acumulado de una conversación y arma el contexto acotado.
+
+    El resumen se actualiza de forma incremental: solo se resumen los turnos
+    que salieron de la ventana desde el último resumen.
+    """
+
+    def __init__(self, summarizer: Callable[[str, List[BaseMessage]], str],
+                 max_turns: int = 6, token_budget: int = 3000):
+        """
+        Args:
+            summarizer: Función (resumen_anterior, mensajes) -> resumen_nuevo
+            max_turns: Turnos recientes que se envían textuales
+            token_budget: Tokens de historial a partir de los cuales se resume
+        """
+        self.summarizer = summarizer
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary = ""
+        self.summarized_count = 0
+
+    def _window_start(self, history: List[BaseMessage]) -> int:
+        """Índice del primer mensaje de los últimos `max_turns` turnos"""
+        turns_seen = 0
+        for idx in range(len(history) - 1, -1, -1):
+            if isinstance(history[idx], HumanMessage):
+                turns_seen += 1
+                if turns_seen == self.max_turns:
+                    return idx
+        return 0
+
+    def build(self, messages: List[BaseMessage], token_budget: Optional[int] = None,
+              config: Optional[RunnableConfig] = None) -> List[BaseMessage]:
+        """
+        Armar la lista de mensajes a enviar al agente.
+
+        Args:
+            messages: Historial completo (mensaje del sistema primero)
+            token_budget: Presupuesto puntual (por defecto, el configurado)
+            config: Config del turno fuera del grafo (ej: callbacks de tokens); la
+                llamada al modelo para resumir se ejecuta con ella. Dentro del
+                grafo (context_pre_model_hook) la hereda sola.
+
+        Returns:
+            Mensajes acotados: sistema, resumen (si hay) y turnos recientes
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+
+        if messages and isinstance(messages[0], SystemMessage):
+            system, history = messages[:1], messages[1:]
+        else:
+            system, history = [], messages
+
+        if self.summarized_count == 0 and estimate_tokens(history) <= budget:
+            return list(messages)
+
+        # Los turnos que salen de la ventana se incorporan al resumen
+        window_start = max(self._window_start(history), self.summarized_count)
+        to_fold = history[self.summarized_count:window_start]
+        if to_fold and estimate_tokens(history[self.summarized_count:]) > budget:
+            if config is None:
+                self.summary = self.summarizer(self.summary, to_fold)
+            else:
+                self.summary = RunnableLambda(
+                    lambda folded: self.summarizer(self.summary, folded)
+                ).invoke(to_fold, config)
+            self.summarized_count = window_start
+
+        if not self.summary:
+            return list(messages)
+
+        summary_message = SystemMessage(
+            content=f"RESUMEN DE LA CONVERSACIÓN PREVIA:\n{self.summary}"
+        )
+        return system + [summary_message] + history[self.summarized_count:]
+
+    def trim(self, token_budget: int, max_turns: int):
+        """Reducir el contexto que se envía (ej: sesión que superó su presupuesto de tokens)"""
+        self.token_budget = min(self.token_budget, token_budget)
+        self.max_turns = min(self.max_turns, max_turns)
+
+    def get_stats(self) -> dict:
+        """Obtener métricas del contexto para debug"""
+        return {
+            "summarized_messages": self.summarized_count,
+            "summary_tokens": len(self.summary) // 4,
+        }
+
+
+def context_pre_model_hook(state: dict, config: RunnableConfig) -> dict:
+    """
+    Hook previo al modelo para el agente con checkpointer.
+
+    El historial completo vive en el checkpoint; este hook solo acota lo que
+    se envía al modelo usando el ConversationContext de la sesión, recibido en
+    `config["configurable"]["conversation_context"]`.
+    """
+    context = config.get("configurable", {}).get("conversation_context")
+    if context is None:
+        return {"llm_input_messages": state["messages"]}
+    return {"llm_input_messages": context.build(state["messages"])}
@@ -0,0 +1,159 @@
+"""
+Matcher de palabras clave por categoría
+Compila una vez varias listas de keywords en una sola regex y devuelve, en
+una pasada sobre el texto, todas las categorías presentes.
+
+Se usa en StateManager.update_state y sirve para analizar transcripts offline.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Pattern, Tuple
+
+# Caracteres de texto en español, de más a menos frecuentes. Los que no
+# figuran (tildes, signos, emojis) cuentan como los más raros.
+_CHAR_FREQUENCY = " eaosrnidlctumpbgvyqhfzjñxkw"
+
+
+def _minimal_keywords(keywords: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Normalizar las keywords de una categoría: minúsculas, sin duplicados y sin
+    las que contienen a otra de la misma categoría (ej: "vuelos" ya está
+    cubierta por "vuelo"). Se mantiene el orden de declaración.
+    """
+    unique = list(dict.fromkeys(keyword.lower() for keyword in keywords))
+    return tuple(
+        keyword for keyword in unique
+        if not any(other != keyword and other in keyword for other in unique)
+    )
+
+
+def _anchor_offset(keyword: str) -> int:
+    """Posición del carácter más raro de la keyword, sin contar el último"""
+    candidates = range(max(len(keyword) - 1, 1))
+
+    def rarity(offset: int) -> int:
+        rank = _CHAR_FREQUENCY.find(keyword[offset])
+        return len(_CHAR_FREQUENCY) if rank < 0 else rank
+
+    return max(candidates, key=rarity)
+
+
+def _case_variants(char: str) -> List[str]:
+    """El carácter y su mayúscula (si es un solo carácter distinto)"""
+    upper = char.upper()
+    return [char, upper] if upper != char and len(upper) == 1 else [char]
+
+
+def _caseless(text: str) -> str:
+    """Regex que reconoce `text` sin distinguir mayúsculas, con clases explícitas"""
+    parts = []
+    for char in text:
+        variants = _case_variants(char)
+        parts.append(f"[{''.join(map(re.escape, variants))}]" if len(variants) > 1 else re.escape(char))
+    return "".join(parts)
+
+
+class KeywordMatcher:
+    """
+    Detecta qué categorías de keywords aparecen en un texto (substring, sin
+    distinguir mayúsculas, igual que `keyword in text.lower()`).
+
+    Todas las keywords van en una sola alternación compilada que se recorre
+    una vez con `search()`; no hace falta `lower()` del texto, que en
+    respuestas largas con emojis era la mayor parte del costo.
+
+    Cada keyword se ancla en su carácter más raro: la regex empieza con la
+    clase de esos caracteres, así el motor salta en C todo lo que no puede
+    iniciar un match y prueba la alternación solo en esas posiciones. Cada
+    alternativa sigue la keyword desde el ancla y la verifica completa con un
+    lookbehind. Por cada match, las categorías salen de las keywords de ese
+    ancla que coinciden en esa posición; la búsqueda sigue desde la posición
+    siguiente (sin perder keywords solapadas) con la alternación de las
+    categorías que faltan, y corta cuando ya aparecieron todas.
+
+    En respuestas del agente de 1K a 70K caracteres es ~1.3-1.7x más rápido
+    que `lower()` + `in` por keyword (ver benchmarks/bench_keyword_matcher.py).
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        """
+        Args:
+            categories: Keywords por categoría (ej: {"refund": ["reembolso", ...]})
+        """
+        keyword_categories: Dict[str, List[str]] = {}
+        for category, keywords in categories.items():
+            for keyword in _minimal_keywords(keywords):
+                keyword_categories.setdefault(keyword, []).append(category)
+
+        # (keyword, posición del ancla, categorías) y, por cada variante del
+        # ancla, las keywords que pueden empezar un match en ese carácter
+        self._keywords: List[Tuple[str, int, FrozenSet[str]]] = []
+        self._by_anchor: Dict[str, List[Tuple[str, int, FrozenSet[str]]]] = {}
+        for keyword, keyword_cats in keyword_categories.items():
+            entry = (keyword, _anchor_offset(keyword), frozenset(keyword_cats))
+            self._keywords.append(entry)
+            for variant in _case_variants(keyword[entry[1]]):
+                self._by_anchor.setdefault(variant, []).append(entry)
+        self.all_categories = frozenset(categories)
+        # Regex por conjunto de categorías que faltan encontrar (se arman al pedirlas)
+        self._patterns: Dict[FrozenSet[str], Pattern] = {}
+        self._pattern_for(self.all_categories)
+
+    def _pattern_for(self, categories: FrozenSet[str]) -> Pattern:
+        """Alternación compilada con las keywords de `categories`"""
+        pattern = self._patterns.get(categories)
+        if pattern is not None:
+            return pattern
+
+        anchors = set()
+        # Alternativas agrupadas por el carácter que sigue al ancla (literal,
+        # para que el motor descarte rápido las que no siguen)
+        branches: Dict[str, List[str]] = {}
+        for keyword, offset, keyword_cats in self._keywords:
+            if not keyword_cats & categories:
+                continue
+            anchors.update(_case_variants(keyword[offset]))
+            rest = keyword[offset + 1:]
+            check = f"(?<={_caseless(keyword)})"
+            if not rest:
+                branches.setdefault("", []).append(check)
+                continue
+            for variant in _case_variants(rest[0]):
+                branches.setdefault(variant, []).append(_caseless(rest[1:]) + check)
+
+        if not anchors:
+            # Sin keywords: una regex que nunca encuentra nada
+            pattern = re.compile("(?!)")
+            self._patterns[categories] = pattern
+            return pattern
+
+        alternatives = [
+            re.escape(first) + "(?:" + "|".join(tails) + ")" if first else "|".join(tails)
+            for first, tails in branches.items()
+        ]
+        pattern = re.compile(
+            "[" + "".join(map(re.escape, sorted(anchors))) + "](?:" + "|".join(alternatives) + ")"
+        )
+        self._patterns[categories] = pattern
+        return pattern
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Obtener todas las categorías con al menos una keyword en el texto"""
+        found: FrozenSet[str] = frozenset()
+        pattern = self._patterns[self.all_categories]
+        match = pattern.search(text)
+        while match is not None:
+            position = match.start()
+            for keyword, offset, keyword_cats in self._by_anchor[text[position]]:
+                if keyword_cats <= found:
+                    continue
+                start = position - offset
+                if start >= 0 and text[start:start + len(keyword)].lower() == keyword:
+                    found |= keyword_cats
+            missing = self.all_categories - found
+            if not missing:
+                break
+            # Las categorías ya encontradas dejan de frenar la búsqueda
+            pattern = self._pattern_for(missing)
+            match = pattern.search(text, position + 1)
+        return found
@@ -0,0 +1,236 @@
+"""
+Métricas del proceso en formato Prometheus
+Registro en memoria de contadores e histogramas con etiquetas, pensado para
+quedar siempre activo en los caminos calientes: cada observación es una suma
+bajo un lock por métrica (sin asignaciones más allá de la primera vez que
+aparece una combinación de etiquetas).
+
+El texto se expone en GET /metrics del servidor headless o, para la app de
+Streamlit, en un puerto local (start_metrics_server).
+"""
+
+import bisect
+import logging
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    """Contador monotónico por combinación de etiquetas"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        for labelvalues, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Histograma con buckets fijos por combinación de etiquetas"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float],
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # Por etiquetas: [conteos por bucket (+Inf al final), suma]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def get_count(self, *labelvalues: str) -> int:
+        entry = self._values.get(labelvalues)
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labelvalues, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas que se exportan juntas"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float],
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, documentation, buckets, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Texto en formato de exposición de Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# MÉTRICAS DE LA APLICACIÓN
+# ============================================================================
+
+REGISTRY = MetricsRegistry()
+
+TOOL_CALLS = REGISTRY.counter(
+    "vuela_tool_calls_total", "Llamadas a herramientas del agente", ("tool", "status")
+)
+TOOL_LATENCY = REGISTRY.histogram(
+    "vuela_tool_latency_seconds", "Latencia de las herramientas del agente",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5), ("tool",)
+)
+BOOKINGS = REGISTRY.counter(
+    "vuela_bookings_total", "Reservas confirmadas por vuelo", ("flight",)
+)
+SEAT_EXHAUSTED = REGISTRY.counter(
+    "vuela_booking_seat_exhausted_total", "Reservas rechazadas por falta de asientos", ("flight",)
+)
+FSM_TRANSITIONS = REGISTRY.counter(
+    "vuela_fsm_transitions_total", "Transiciones del estado de la conversación", ("from", "to")
+)
+FSM_INTERRUPTIONS = REGISTRY.counter(
+    "vuela_fsm_interruptions_total", "Cambios de decisión del pasajero (rebooking <-> reembolso)"
+)
+TURNS = REGISTRY.counter(
+    "vuela_turns_total", "Turnos atendidos por ruta (agente o router sin LLM)", ("route",)
+)
+LLM_TOKENS_PER_TURN = REGISTRY.histogram(
+    "vuela_llm_tokens_per_turn", "Tokens del modelo por turno (todas las llamadas del turno)",
+    (250, 500, 1000, 2000, 4000, 8000, 16000, 32000), ("kind",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "vuela_llm_tokens_total", "Tokens del modelo por tipo (prompt, tool_loop, completion, summary)", ("kind",)
+)
+LLM_COST = REGISTRY.counter(
+    "vuela_llm_cost_usd_total", "Costo estimado del modelo en USD"
+)
+BUDGET_EXCEEDED = REGISTRY.counter(
+    "vuela_session_budget_exceeded_total", "Sesiones que superaron su presupuesto de tokens", ("action",)
+)
+
+
+def record_turn(route: str, transitions: Iterable[Tuple[str, str]], new_interruptions: int,
+                token_usage=None):
+    """
+    Registrar las métricas de un turno terminado.
+
+    Se llama desde la UI/servidor (no desde StateManager) para no contar de
+    nuevo las transiciones al reconstruir el FSM desde un checkpoint.
+
+    Args:
+        transitions: Pares (desde, hacia) del turno, en orden (ej: NOTIFIED →
+            REBOOKING y REBOOKING → RESOLVED en una reserva directa)
+        token_usage: TokenUsageHandler del turno (None si no llamó al modelo)
+    """
+    TURNS.inc(route)
+    for previous_state, current_state in transitions:
+        FSM_TRANSITIONS.inc(previous_state, current_state)
+    if new_interruptions:
+        FSM_INTERRUPTIONS.inc(amount=new_interruptions)
+    if token_usage is not None:
+        LLM_TOKENS_PER_TURN.observe(token_usage.input_tokens, "input")
+        LLM_TOKENS_PER_TURN.observe(token_usage.output_tokens, "output")
+        LLM_TOKENS.inc("prompt", amount=token_usage.prompt_tokens)
+        LLM_TOKENS.inc("tool_loop", amount=token_usage.tool_loop_tokens)
+        LLM_TOKENS.inc("completion", amount=token_usage.output_tokens)
+        LLM_TOKENS.inc("summary", amount=token_usage.summary_tokens)
+        LLM_COST.inc(amount=token_usage.cost_usd)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Un scrape cada pocos segundos: sin log por request
+
+
+@lru_cache(maxsize=4)
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """
+    Servir GET /metrics en un hilo de fondo (una vez por proceso y puerto).
+
+    Returns:
+        El servidor, o None si el puerto ya está en uso (ej: otro worker)
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as exc:
+        logging.getLogger(__name__).warning("Endpoint de métricas no iniciado en %s:%s: %s", host, port, exc)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
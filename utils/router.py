@@ -0,0 +1,126 @@
+"""
+Router determinístico previo al LLM
+Resuelve sin llamar al agente los turnos simples que siguen a la lista de
+vuelos alternativos: "1", "2", "3", "opción 2" o un número de vuelo.
+
+- Elegir una opción mostrada → pedido de confirmación (formato obligatorio)
+- Número de vuelo que no está entre las opciones → consulta de estado
+
+Cualquier otro mensaje (o uno ambiguo) devuelve None y lo atiende el agente.
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from data.flights import get_flight_status
+from prompts.system_prompt import get_flight_selection_confirmation
+from tools.flight_tools import check_flight_status
+from utils.state_manager import StateManager
+
+# Entradas que se resuelven sin el LLM (ya normalizadas: minúsculas, sin puntuación final)
+_OPTION_INPUT = re.compile(r"^(?:(?:la\s+)?opci[oó]n\s*)?([1-9])$")
+_FLIGHT_INPUT = re.compile(r"^(?:(?:el\s+)?vuelo\s+)?(itti-fly-\d{3})$")
+
+# Opciones listadas por el agente (ej: "**Opción 2: ITTI-FLY-022**")
+_LISTED_OPTION = re.compile(r"opci[oó]n\s*([1-9])\W{0,6}(ITTI-FLY-\d{3})", re.IGNORECASE)
+_FLIGHT_NUMBER = re.compile(r"ITTI-FLY-\d{3}", re.IGNORECASE)
+_OPTION_WORD = re.compile(r"opci[oó]n", re.IGNORECASE)
+
+
+class RoutedTurn(NamedTuple):
+    """Respuesta resuelta por el router"""
+    route: str      # "select_option" | "flight_status"
+    response: str
+
+
+def get_last_ai_message(messages: List[BaseMessage]) -> Optional[AIMessage]:
+    """Obtener el último mensaje del asistente con texto"""
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and message.content:
+            return message
+    return None
+
+
+def parse_listed_options(text: str, cancelled_flight_number: str = "") -> List[str]:
+    """
+    Obtener los vuelos ofrecidos en un mensaje, en el orden de las opciones.
+
+    Usa las etiquetas "Opción N" si están; si no, los números de vuelo en orden
+    de aparición (sin el vuelo cancelado), solo si el mensaje pide elegir una opción.
+    """
+    labeled = {}
+    for index, number in _LISTED_OPTION.findall(text):
+        labeled.setdefault(int(index), number.upper())
+    if labeled:
+        # Solo sirve si las opciones son consecutivas desde 1
+        if sorted(labeled) != list(range(1, len(labeled) + 1)):
+            return []
+        return [labeled[index] for index in sorted(labeled)]
+
+    # Sin etiquetas, solo si el mensaje realmente ofrece opciones para elegir
+    if not _OPTION_WORD.search(text):
+        return []
+    options = []
+    for number in _FLIGHT_NUMBER.findall(text):
+        number = number.upper()
+        if number != cancelled_flight_number and number not in options:
+            options.append(number)
+    return options if len(options) > 1 else []
+
+
+def _normalize_input(user_input: str) -> str:
+    return user_input.strip().lower().rstrip(".!").strip()
+
+
+def route_turn(user_input: str, messages: List[BaseMessage], state_manager: StateManager,
+               cancelled_flight_number: str = "") -> Optional[RoutedTurn]:
+    """
+    Intentar resolver el turno sin llamar al agente.
+
+    Args:
+        user_input: Mensaje del usuario
+        messages: Historial (el último mensaje del asistente define las opciones)
+        state_manager: Estado del flujo (en estado final no se enruta)
+        cancelled_flight_number: Vuelo cancelado del pasajero
+
+    Returns:
+        RoutedTurn con la respuesta, o None si debe atenderlo el agente
+    """
+    # Tras la resolución cualquier cambio se deriva al 0800: lo maneja el agente
+    if state_manager.is_final_state():
+        return None
+
+    text = _normalize_input(user_input)
+    option_match = _OPTION_INPUT.match(text)
+    flight_match = _FLIGHT_INPUT.match(text)
+    if not option_match and not flight_match:
+        return None
+
+    last_ai_message = get_last_ai_message(messages)
+    options = parse_listed_options(last_ai_message.content, cancelled_flight_number) if last_ai_message else []
+
+    if option_match:
+        # "1"/"2"/"3" solo son vuelos si se acaban de listar opciones de vuelo
+        index = int(option_match.group(1))
+        if not options or index > len(options):
+            return None
+        return _confirm_selection(options[index - 1])
+
+    flight_number = flight_match.group(1).upper()
+    if flight_number in options:
+        return _confirm_selection(flight_number)
+    return RoutedTurn("flight_status", check_flight_status.invoke({"flight_number": flight_number}))
+
+
+def _confirm_selection(flight_number: str) -> Optional[RoutedTurn]:
+    """Pedir confirmación del vuelo elegido (si no está disponible, decide el agente)"""
+    result = get_flight_status(flight_number)
+    if not result["found"]:
+        return None
+
+    flight = result["flight"]
+    if flight["status"] != "AVAILABLE" or not flight.get("available_seats"):
+        return None
+    return RoutedTurn("select_option", get_flight_selection_confirmation(flight))
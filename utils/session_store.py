@@ -0,0 +1,269 @@
+"""
+Registro de sesiones con desalojo a disco
+Mantiene en memoria solo las sesiones activas: las inactivas (TTL) y las
+menos usadas cuando se supera el tope de sesiones o de memoria se guardan
+como snapshot comprimido en disco y se restauran al volver a pedirlas.
+
+Así la memoria del worker queda acotada aunque un pico de cancelaciones deje
+miles de chats abandonados.
+"""
+
+import os
+import pickle
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+# Los ids llegan en la URL: solo caracteres seguros para un nombre de archivo
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class SessionStore:
+    """
+    Sesiones por id con desalojo LRU/TTL a snapshots en disco.
+
+    Las sesiones deben tener `session_id`, `last_active` (hora de reloj),
+    `estimate_memory()` y `to_snapshot()`; `restore(snapshot)` las reconstruye.
+
+    Una sesión pedida con `pin=True` no se desaloja hasta `unpin()`: quien la
+    va a modificar la fija desde que la obtiene hasta terminar el turno. Si
+    se desalojara en el medio, el siguiente request restauraría otra copia y
+    uno de los dos turnos se perdería.
+    """
+
+    def __init__(self, snapshot_dir: str, restore: Callable[[dict], Any],
+                 max_sessions: int = 1000, idle_ttl: float = 900.0,
+                 max_memory_bytes: Optional[int] = None,
+                 snapshot_retention: float = 86400.0,
+                 is_busy: Optional[Callable[[Any], bool]] = None):
+        """
+        Args:
+            snapshot_dir: Carpeta de los snapshots (se crea si no existe)
+            restore: Función snapshot -> sesión
+            max_sessions: Sesiones máximas en memoria
+            idle_ttl: Segundos sin actividad antes de pasar a disco
+            max_memory_bytes: Memoria estimada máxima de las sesiones (None = sin tope)
+            snapshot_retention: Segundos que se conserva un snapshot sin uso
+            is_busy: Indica si una sesión está atendiendo un turno (no se desaloja)
+        """
+        self.snapshot_dir = snapshot_dir
+        self.restore = restore
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.snapshot_retention = snapshot_retention
+        self.is_busy = is_busy or (lambda session: False)
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._writing = {}  # Desalojadas cuyo snapshot se está escribiendo
+        self._memory = {}
+        self._memory_total = 0
+        self._pins = {}  # session_id -> requests que la tienen fijada
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.restores = 0
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    @staticmethod
+    def is_valid_id(session_id: str) -> bool:
+        return bool(_SESSION_ID.match(session_id))
+
+    def _snapshot_path(self, session_id: str) -> str:
+        return os.path.join(self.snapshot_dir, f"{session_id}.snap")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def put(self, session):
+        """
+        Registrar (o volver a registrar) una sesión y actualizar su memoria.
+
+        Llamarlo al terminar cada turno: si la sesión se había desalojado
+        mientras tanto, vuelve a memoria y reemplaza al snapshot viejo.
+        """
+        with self._lock:
+            stale = self._register(session)
+            to_evict = self._over_capacity()
+
+        if stale:
+            self._remove_snapshot(session.session_id)
+        self._write_snapshots(to_evict)
+
+    def get_in_memory(self, session_id: str, pin: bool = False):
+        """Obtener una sesión solo si está en memoria (sin E/S de disco); None si no"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                if pin:
+                    self._pin(session_id)
+            return session
+
+    def get(self, session_id: str, pin: bool = False):
+        """
+        Obtener una sesión (de memoria o restaurada desde disco); None si no existe.
+        Puede leer el disco: desde async, ejecutarlo en un hilo.
+
+        Args:
+            session_id: Id de la sesión
+            pin: Fijarla en memoria hasta llamar a unpin()
+        """
+        if not self.is_valid_id(session_id):
+            return None
+
+        with self._lock:
+            session = self._sessions.get(session_id) or self._writing.get(session_id)
+            if session is not None:
+                self._register(session)
+                if pin:
+                    self._pin(session_id)
+                return session
+
+        try:
+            with open(self._snapshot_path(session_id), "rb") as snapshot_file:
+                snapshot = pickle.loads(zlib.decompress(snapshot_file.read()))
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            # Otro request pudo restaurarla mientras se leía el archivo
+            session = self._sessions.get(session_id)
+            if session is not None:
+                if pin:
+                    self._pin(session_id)
+                return session
+            session = self.restore(snapshot)
+            self._register(session)
+            if pin:
+                self._pin(session_id)
+            self.restores += 1
+            to_evict = self._over_capacity()
+
+        self._remove_snapshot(session_id)
+        self._write_snapshots(to_evict)
+        return session
+
+    def unpin(self, session):
+        """Liberar una sesión obtenida con `pin=True` (vuelve a poder desalojarse)"""
+        with self._lock:
+            pins = self._pins.get(session.session_id, 0)
+            if pins > 1:
+                self._pins[session.session_id] = pins - 1
+            else:
+                self._pins.pop(session.session_id, None)
+
+    def _pin(self, session_id: str):
+        self._pins[session_id] = self._pins.get(session_id, 0) + 1
+
+    def _evictable(self, session) -> bool:
+        """La sesión no está atendiendo un turno ni fijada por un request (con el lock tomado)"""
+        return session.session_id not in self._pins and not self.is_busy(session)
+
+    def delete(self, session_id: str) -> bool:
+        """Eliminar una sesión (de memoria y de disco)"""
+        if not self.is_valid_id(session_id):
+            return False
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+            removed = self._writing.pop(session_id, None) is not None or removed
+            self._memory_total -= self._memory.pop(session_id, 0)
+        return self._remove_snapshot(session_id) or removed
+
+    def _register(self, session) -> bool:
+        """
+        Poner la sesión como la más reciente y recalcular su memoria (con el lock tomado).
+
+        Returns:
+            True si no estaba en memoria (puede quedar un snapshot viejo en disco)
+        """
+        session_id = session.session_id
+        memory = session.estimate_memory()
+        self._memory_total += memory - self._memory.get(session_id, 0)
+        self._memory[session_id] = memory
+        stale = self._sessions.get(session_id) is not session
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        return stale
+
+    def _over_capacity(self) -> list:
+        """Quitar de memoria las menos usadas mientras se supere algún tope (con el lock tomado)"""
+        evicted = []
+        # La más reciente (la que se acaba de usar) nunca se desaloja
+        for session_id in list(self._sessions)[:-1]:
+            over_sessions = len(self._sessions) > self.max_sessions
+            over_memory = self.max_memory_bytes is not None and self._memory_total > self.max_memory_bytes
+            if not (over_sessions or over_memory):
+                break
+            if self._evictable(self._sessions[session_id]):
+                evicted.append(self._pop(session_id))
+        return evicted
+
+    def _pop(self, session_id: str):
+        """Sacar una sesión de memoria; queda en `_writing` hasta que su snapshot esté en disco"""
+        self._memory_total -= self._memory.pop(session_id, 0)
+        self.evictions += 1
+        session = self._sessions.pop(session_id)
+        self._writing[session_id] = session
+        return session
+
+    def _write_snapshots(self, sessions: list):
+        """Guardar sesiones desalojadas (escritura atómica: archivo temporal + rename)"""
+        for session in sessions:
+            path = self._snapshot_path(session.session_id)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as snapshot_file:
+                snapshot_file.write(zlib.compress(pickle.dumps(session.to_snapshot(), pickle.HIGHEST_PROTOCOL)))
+            os.replace(temp_path, path)
+
+            with self._lock:
+                pending = self._writing.get(session.session_id) is session
+                if pending:
+                    del self._writing[session.session_id]
+                # Si se volvió a pedir (o se eliminó) mientras se escribía, el snapshot ya no sirve
+                obsolete = not pending or self._sessions.get(session.session_id) is session
+            if obsolete:
+                self._remove_snapshot(session.session_id)
+
+    def _remove_snapshot(self, session_id: str) -> bool:
+        try:
+            os.remove(self._snapshot_path(session_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Pasar a disco las sesiones inactivas y borrar snapshots vencidos.
+        Hace E/S de disco: desde async, ejecutarlo en un hilo.
+
+        Returns:
+            Cantidad de sesiones desalojadas
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [
+                self._pop(session_id) for session_id, session in list(self._sessions.items())
+                if now - session.last_active > self.idle_ttl and self._evictable(session)
+            ]
+        self._write_snapshots(idle)
+
+        for name in os.listdir(self.snapshot_dir):
+            path = os.path.join(self.snapshot_dir, name)
+            try:
+                if name.endswith(".snap") and now - os.path.getmtime(path) > self.snapshot_retention:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(idle)
+
+    def get_stats(self) -> dict:
+        """Sesiones y memoria estimada en memoria, desalojos y restauraciones"""
+        with self._lock:
+            return {
+                "in_memory": len(self._sessions),
+                "memory_bytes": self._memory_total,
+                "evictions": self.evictions,
+                "restores": self.restores
+            }
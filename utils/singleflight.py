@@ -0,0 +1,122 @@
+"""
+Singleflight - Coalescencia de llamadas idénticas concurrentes
+Si varias sesiones piden lo mismo a la vez (ej: cientos de pasajeros buscando
+alternativas para el mismo vuelo tras una cancelación), solo la primera llama
+al backend; el resto espera ese resultado. Cada llamador recibe su propia copia.
+"""
+
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """Llamada en curso compartida por los hilos que piden la misma clave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class _AsyncCall:
+    """Tarea en curso compartida por las corrutinas que piden la misma clave"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una sola ejecución.
+
+    - do(): para código sync (hilos)
+    - ado(): para código async (tareas de un mismo event loop)
+
+    No es un caché: apenas termina la llamada, la siguiente vuelve a consultar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], _AsyncCall] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """
+        Ejecutar `fn(*args)` o esperar la ejecución en curso de la misma clave.
+
+        Returns:
+            Copia propia del resultado
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if is_leader:
+            try:
+                call.result = fn(*args)
+            except BaseException as error:
+                call.error = error
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Versión async de do(): las tareas del mismo loop comparten la ejecución.
+
+        `fn` corre en su propia tarea: si se cancela quien la inició (ej: el
+        cliente se desconectó), los demás siguen esperando el resultado. La
+        tarea solo se cancela cuando ya no queda nadie esperándola.
+
+        Returns:
+            Copia propia del resultado
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        call = self._async_calls.get(call_key)
+
+        if call is None:
+            call = _AsyncCall(loop.create_task(fn(*args)))
+            self._async_calls[call_key] = call
+            call.task.add_done_callback(lambda _task: self._forget(call_key, call))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nadie espera el resultado: liberar la clave y cancelar la llamada
+                self._forget(call_key, call)
+                call.task.cancel()
+        return copy.deepcopy(result)
+
+    def _forget(self, call_key: Tuple[int, Hashable], call: _AsyncCall):
+        """Quitar la llamada de las llamadas en curso (si sigue siendo la registrada)"""
+        if self._async_calls.get(call_key) is call:
+            del self._async_calls[call_key]
+
+    def get_stats(self) -> dict:
+        """Obtener llamadas reales al backend y llamadas que se sumaron a una en curso"""
+        return {"calls": self.calls, "shared": self.shared}
@@ -7,7 +7,10 @@ FSM Simplificado: 4 estados que reflejan los 2 flujos principales del negocio.
 
 from enum import Enum
 from datetime import datetime
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+import time
+
+from utils.keyword_matcher import KeywordMatcher
 
 
 class ConversationState(Enum):
@@ -18,6 +21,76 @@ class ConversationState(Enum):
     RESOLVED = "resolved"      # Problema resuelto (reserva confirmada o reembolso procesado)
 
 
+# Un bit por estado: los estados alcanzados se guardan en un entero
+STATE_BITS = {state: 1 << index for index, state in enumerate(ConversationState)}
+
+# Progreso del flujo por estado (ver get_progress_percentage)
+STATE_WEIGHTS = {
+    ConversationState.NOTIFIED: 25,
+    ConversationState.REBOOKING: 50,
+    ConversationState.REFUND: 50,
+    ConversationState.RESOLVED: 100,
+}
+
+STATE_EMOJIS = {
+    ConversationState.NOTIFIED: "📢",
+    ConversationState.REBOOKING: "✈️",
+    ConversationState.REFUND: "💰",
+    ConversationState.RESOLVED: "✅",
+}
+
+STATE_LABELS = {
+    ConversationState.NOTIFIED: "Pasajero notificado",
+    ConversationState.REBOOKING: "Procesando rebooking",
+    ConversationState.REFUND: "Procesando reembolso",
+    ConversationState.RESOLVED: "Problema resuelto",
+}
+
+# Transiciones que se conservan en el historial (las más recientes)
+STATE_HISTORY_SIZE = 32
+
+# Eventos estructurados que emiten las herramientas (artifact de su ToolMessage)
+EVENT_ALTERNATIVES_SHOWN = "alternatives_shown"    # find_alternative_flights listó opciones
+EVENT_BOOKING_CONFIRMED = "booking_confirmed"      # make_booking confirmó una reserva
+EVENT_REFUND_PROCESSED = "refund_processed"        # process_refund procesó el reembolso
+
+# Eventos de acciones que ya quedaron hechas en el backend (no se deshacen
+# aunque el turno no llegue a responder)
+SIDE_EFFECT_EVENTS = frozenset({EVENT_BOOKING_CONFIRMED, EVENT_REFUND_PROCESSED})
+
+# Keywords que se buscan en la respuesta del agente
+AGENT_KEYWORDS = {
+    # Problema resuelto (estado final)
+    "resolution": [
+        # Keywords para rebooking exitoso
+        "reserva confirmada", "booking confirmado", "¡reserva confirmada!",
+        "código de confirmación", "reserva exitosa",
+        # Keywords para reembolso exitoso (más variaciones)
+        "reembolso confirmado", "reembolso procesado", "devolución confirmada",
+        "✅ reembolso", "reembolso exitoso", "hemos procesado su reembolso",
+        "su reembolso ha sido", "reembolso aprobado"
+    ],
+    # El agente mostró opciones de vuelo
+    "options_shown": ["opciones", "alternativas", "vuelos disponibles"],
+}
+
+# Keywords que se buscan en el mensaje del usuario
+USER_KEYWORDS = {
+    "rebooking": [
+        "vuelo", "vuelos", "alternativas", "opciones", "disponibles",
+        "muéstr", "busca", "ver", "reserva", "reservar", "booking"
+    ],
+    "refund": [
+        "reembolso", "devol", "dinero", "plata",
+        "refund", "money back", "me devuelvan"
+    ],
+}
+
+# Compilados una sola vez: cada mensaje se recorre en una única pasada
+AGENT_MATCHER = KeywordMatcher(AGENT_KEYWORDS)
+USER_MATCHER = KeywordMatcher(USER_KEYWORDS)
+
+
 class StateManager:
     """
     Gestiona el estado de la conversación de forma simplificada.
@@ -32,20 +105,62 @@ class StateManager:
     Los micro-estados (buscando, seleccionando, confirmando) son detalles de
     implementación que el agente maneja internamente. El FSM solo trackea los
     estados que importan al negocio: ¿Está rebooking o pidiendo reembolso?
+
+    Memoria acotada (hay miles de sesiones vivas por worker):
+    - __slots__: sin __dict__ por instancia
+    - Estados alcanzados como bitmask y progreso máximo acumulado: las
+      consultas del sidebar son O(1) y no dependen del historial
+    - Historial en un buffer circular de (estado, time.monotonic()) sobre una
+      lista que crece solo hasta STATE_HISTORY_SIZE (un deque reserva 64
+      posiciones de entrada); la hora legible se calcula solo al pedirla
     """
 
+    __slots__ = ("current_state", "previous_state", "interruption_count",
+                 "_reached", "_max_progress", "_history", "_head", "_history_count")
+
     def __init__(self):
         """Inicializar el state manager"""
         self.current_state = ConversationState.NOTIFIED
         self.previous_state = None
         self.interruption_count = 0
-        self.state_history: List[Tuple[ConversationState, str]] = []
+        self._reached = 0
+        self._max_progress = 0
+        self._history: List[Tuple[ConversationState, float]] = []
+        self._head = 0  # Posición de la entrada más antigua una vez lleno el buffer
+        self._history_count = 0  # Entradas agregadas desde el inicio (no se recorta)
         self._add_to_history(ConversationState.NOTIFIED)
 
     def _add_to_history(self, state: ConversationState):
         """Agregar transición al historial"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.state_history.append((state, timestamp))
+        self._reached |= STATE_BITS[state]
+        self._max_progress = max(self._max_progress, STATE_WEIGHTS.get(state, 0))
+        entry = (state, time.monotonic())
+        self._history_count += 1
+        if len(self._history) < STATE_HISTORY_SIZE:
+            self._history.append(entry)
+        else:
+            self._history[self._head] = entry
+            self._head = (self._head + 1) % STATE_HISTORY_SIZE
+
+    def __getstate__(self) -> dict:
+        """Serializar con los instantes del historial en hora de reloj (time.monotonic no sirve entre procesos)"""
+        state = {slot: getattr(self, slot) for slot in self.__slots__}
+        offset = time.time() - time.monotonic()
+        state["_history"] = [(entry_state, offset + timestamp) for entry_state, timestamp in self._history]
+        return state
+
+    def __setstate__(self, state: dict):
+        offset = time.monotonic() - time.time()
+        # Sesiones guardadas antes de contar las entradas: alcanza con el largo del buffer
+        state.setdefault("_history_count", len(state["_history"]))
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._history = [(entry_state, offset + timestamp) for entry_state, timestamp in self._history]
+
+    @property
+    def state_history(self) -> List[Tuple[ConversationState, str]]:
+        """Historial de transiciones (más recientes) con hora HH:MM:SS"""
+        return self.get_state_history()
 
     def transition_to(self, new_state: ConversationState):
         """Transición explícita a un nuevo estado"""
@@ -54,53 +169,78 @@ class StateManager:
             self.current_state = new_state
             self._add_to_history(new_state)
 
-    def update_state(self, user_message: str, agent_response: str):
+    def apply_event(self, event: dict):
+        """
+        Aplicar un evento emitido por una herramienta.
+
+        Las acciones confirmadas pasan por el estado de su flujo antes de
+        RESOLVED, así el progreso refleja el flujo real aunque el usuario no
+        lo haya pedido con palabras clave.
+        """
+        event_type = event.get("type")
+
+        if event_type == EVENT_ALTERNATIVES_SHOWN:
+            if self.current_state == ConversationState.REFUND:
+                self.interruption_count += 1
+            if self.current_state in (ConversationState.NOTIFIED, ConversationState.REFUND):
+                self.transition_to(ConversationState.REBOOKING)
+
+        elif event_type == EVENT_BOOKING_CONFIRMED:
+            if not self.has_reached_state(ConversationState.REBOOKING):
+                self.transition_to(ConversationState.REBOOKING)
+            self.transition_to(ConversationState.RESOLVED)
+
+        elif event_type == EVENT_REFUND_PROCESSED:
+            if not self.has_reached_state(ConversationState.REFUND):
+                self.transition_to(ConversationState.REFUND)
+            self.transition_to(ConversationState.RESOLVED)
+
+    def update_state(self, user_message: str, agent_response: str,
+                     events: Optional[List[dict]] = None):
         """
         Actualizar el estado basándose en el mensaje del usuario y la respuesta del agente.
 
         Lógica simplificada:
         - Detecta si el usuario pide REBOOKING (vuelos, alternativas, opciones)
         - Detecta si el usuario pide REEMBOLSO (reembolso, devolución, dinero)
-        - Detecta cuando se RESUELVE (confirmación en respuesta del agente)
+        - Detecta cuando se RESUELVE (eventos de las herramientas)
         - Detecta INTERRUPCIONES (cambio de flujo mid-conversation)
 
         Args:
             user_message: Lo que dijo el usuario
             agent_response: Lo que respondió el agente
+            events: Eventos de las herramientas ejecutadas en el turno. Si es
+                None (no hay información de herramientas, ej: transcripts
+                viejos) se buscan keywords en la respuesta como fallback
         """
-        user_lower = user_message.lower()
-        agent_lower = agent_response.lower()
-
-        # 1. Detectar si el problema se resolvió (estado final)
-        resolution_keywords = [
-            # Keywords para rebooking exitoso
-            "reserva confirmada", "booking confirmado", "¡reserva confirmada!",
-            "código de confirmación", "reserva exitosa",
-            # Keywords para reembolso exitoso (más variaciones)
-            "reembolso confirmado", "reembolso procesado", "devolución confirmada",
-            "✅ reembolso", "reembolso exitoso", "hemos procesado su reembolso",
-            "su reembolso ha sido", "reembolso aprobado"
-        ]
+        user_matches = USER_MATCHER.match(user_message)
 
-        if any(keyword in agent_lower for keyword in resolution_keywords):
-            if self.current_state != ConversationState.RESOLVED:
-                self.transition_to(ConversationState.RESOLVED)
+        if events is None:
+            agent_matches = AGENT_MATCHER.match(agent_response)
+
+            # 1. Detectar si el problema se resolvió (estado final)
+            if "resolution" in agent_matches:
+                if self.current_state != ConversationState.RESOLVED:
+                    self.transition_to(ConversationState.RESOLVED)
+                    return
+        else:
+            # 1. Los eventos de las herramientas mandan: no se lee la respuesta
+            agent_matches = frozenset()
+            was_resolved = self.current_state == ConversationState.RESOLVED
+            for event in events:
+                self.apply_event(event)
+            if self.current_state == ConversationState.RESOLVED and not was_resolved:
                 return
 
         # 2. Detectar inicio de REBOOKING (Flujo A) - PRIMERO porque es más específico
-        rebooking_keywords = [
-            "vuelo", "vuelos", "alternativas", "opciones", "disponibles",
-            "muéstr", "busca", "ver", "reserva", "reservar", "booking"
-        ]
-
-        if any(keyword in user_lower for keyword in rebooking_keywords):
+        if "rebooking" in user_matches:
             # Detectar interrupción: estaba en reembolso y ahora pide rebooking
             if self.current_state == ConversationState.REFUND:
                 self.interruption_count += 1
 
             # También detectar si el agente muestra opciones
             if self.current_state == ConversationState.NOTIFIED:
-                if any(kw in agent_lower for kw in ["opciones", "alternativas", "vuelos disponibles"]):
+                if "options_shown" in agent_matches:
                     self.transition_to(ConversationState.REBOOKING)
                     return
 
@@ -109,12 +249,7 @@ class StateManager:
                 return
 
         # 3. Detectar solicitud de REEMBOLSO (Flujo B) - SEGUNDO
-        refund_keywords = [
-            "reembolso", "devol", "dinero", "plata",
-            "refund", "money back", "me devuelvan"
-        ]
-
-        if any(keyword in user_lower for keyword in refund_keywords):
+        if "refund" in user_matches:
             # Detectar interrupción: estaba en rebooking y ahora pide reembolso
             if self.current_state == ConversationState.REBOOKING:
                 self.interruption_count += 1
@@ -132,12 +267,34 @@ class StateManager:
         return self.interruption_count
 
     def get_state_history(self) -> List[Tuple[ConversationState, str]]:
-        """Obtener el historial completo de estados"""
-        return self.state_history
+        """Obtener el historial de estados (últimas STATE_HISTORY_SIZE transiciones)"""
+        # Convertir los instantes monotónicos a hora de reloj
+        offset = time.time() - time.monotonic()
+        ordered = self._history[self._head:] + self._history[:self._head]
+        return [
+            (state, datetime.fromtimestamp(offset + timestamp).strftime("%H:%M:%S"))
+            for state, timestamp in ordered
+        ]
+
+    def get_transition_count(self) -> int:
+        """Marca para get_transitions_since (tomarla antes del turno)"""
+        return self._history_count
+
+    def get_transitions_since(self, count: int) -> List[Tuple[ConversationState, ConversationState]]:
+        """
+        Transiciones (desde, hacia) registradas después de la marca `count`,
+        en orden: todas las del turno, no solo el estado inicial y el final.
+        """
+        new_entries = min(self._history_count - count, len(self._history) - 1)
+        if new_entries <= 0:
+            return []
+        ordered = self._history[self._head:] + self._history[:self._head]
+        states = [state for state, _timestamp in ordered[-new_entries - 1:]]
+        return list(zip(states, states[1:]))
 
     def has_reached_state(self, state: ConversationState) -> bool:
         """Verificar si alguna vez se alcanzó un estado específico"""
-        return any(s == state for s, _ in self.state_history)
+        return bool(self._reached & STATE_BITS[state])
 
     def get_progress_percentage(self) -> int:
         """
@@ -149,43 +306,19 @@ class StateManager:
         Flujo B - Reembolso:
         NOTIFIED(25%) → REFUND(50%) → RESOLVED(100%)
         """
-        state_weights = {
-            ConversationState.NOTIFIED: 25,
-            ConversationState.REBOOKING: 50,
-            ConversationState.REFUND: 50,
-            ConversationState.RESOLVED: 100,
-        }
-
-        # Buscar el estado de mayor progreso alcanzado
-        max_progress = 0
-        for state, _ in self.state_history:
-            progress = state_weights.get(state, 0)
-            max_progress = max(max_progress, progress)
-
-        return max_progress
+        # Mayor progreso alcanzado (se acumula en cada transición)
+        return self._max_progress
 
     def get_state_emoji(self, state: ConversationState) -> str:
         """Obtener emoji representativo del estado"""
-        emojis = {
-            ConversationState.NOTIFIED: "📢",
-            ConversationState.REBOOKING: "✈️",
-            ConversationState.REFUND: "💰",
-            ConversationState.RESOLVED: "✅",
-        }
-        return emojis.get(state, "❓")
+        return STATE_EMOJIS.get(state, "❓")
 
     def get_state_label(self, state: ConversationState) -> str:
         """Obtener etiqueta legible del estado"""
         if state is None:
             return "Sin Estado"
 
-        labels = {
-            ConversationState.NOTIFIED: "Pasajero notificado",
-            ConversationState.REBOOKING: "Procesando rebooking",
-            ConversationState.REFUND: "Procesando reembolso",
-            ConversationState.RESOLVED: "Problema resuelto",
-        }
-        return labels.get(state, "Desconocido")
+        return STATE_LABELS.get(state, "Desconocido")
 
     def is_final_state(self) -> bool:
         """
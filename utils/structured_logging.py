@@ -0,0 +1,118 @@
+"""
+Logging estructurado (JSON lines) sin bloquear los turnos
+Cada evento se encola en memoria (QueueHandler) y un hilo de fondo lo
+serializa y lo escribe en stdout o en un archivo: escribir un historial
+largo no demora la respuesta al pasajero.
+
+Los eventos con el texto de los mensajes (sample=True) se muestrean por
+sesión (se loguea la conversación completa o nada) y los campos largos se
+truncan; los eventos de estado, tiempos y errores se loguean siempre.
+
+Uso:
+    configure_logging(level="INFO", path="bot.jsonl", sample_rate=0.1)
+    log_event("turn_completed", session_id=session_id, turn=3, duration_ms=812.4)
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import zlib
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOGGER = logging.getLogger("vuelaconnosotros")
+
+
+def _truncate(value, max_chars: int):
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}… (+{len(value) - max_chars} caracteres)"
+    return value
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Un objeto JSON por línea: ts, level, event y los campos del evento"""
+
+    def __init__(self, max_field_chars: int = 2000):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "event": record.getMessage()
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = _truncate(value, self.max_field_chars)
+        if record.exc_info:
+            entry["exception"] = _truncate(self.formatException(record.exc_info), self.max_field_chars)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SessionSampler(logging.Filter):
+    """Deja pasar los eventos con sample=True de una fracción de las sesiones"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sample", False) or self.rate >= 1:
+            return True
+        session_id = getattr(record, "fields", {}).get("session_id")
+        # Mismo resultado para todos los eventos de una sesión
+        position = zlib.crc32(session_id.encode()) / 2**32 if session_id else random.random()
+        return position < self.rate
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Sin formatear en el hilo del turno: lo hace el hilo de fondo
+        return record
+
+
+@lru_cache(maxsize=1)
+def configure_logging(level: str = "INFO", path: Optional[str] = None,
+                      sample_rate: float = 1.0, max_field_chars: int = 2000) -> QueueListener:
+    """
+    Configurar el logger de la aplicación (una vez por proceso).
+
+    Args:
+        level: Nivel mínimo (DEBUG, INFO, WARNING, ERROR)
+        path: Archivo de salida (None = stdout)
+        sample_rate: Fracción de sesiones cuyo texto de mensajes se loguea
+        max_field_chars: Largo máximo de cada campo de texto
+    """
+    output = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonLinesFormatter(max_field_chars))
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(SessionSampler(sample_rate))
+    LOGGER.addHandler(handler)
+    LOGGER.setLevel(level.upper())
+    LOGGER.propagate = False
+
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    # Al salir se vacía la cola antes de cerrar
+    atexit.register(listener.stop)
+    return listener
+
+
+def log_event(event: str, level: int = logging.INFO, sample: bool = False,
+              exc_info=None, **fields):
+    """
+    Loguear un evento con sus campos (session_id, turn, state, tiempos, ...).
+
+    Args:
+        event: Nombre del evento (ej: "turn_completed")
+        level: Nivel de logging
+        sample: True para eventos con texto de mensajes (sujetos a muestreo)
+        exc_info: Excepción a incluir (ej: True dentro de un except)
+    """
+    if LOGGER.isEnabledFor(level):
+        LOGGER.log(level, event, exc_info=exc_info, extra={"fields": fields, "sample": sample})
@@ -0,0 +1,198 @@
+"""
+Consumo de tokens del modelo
+Suma el usage_metadata de cada llamada al modelo durante un turno (el loop
+del agente puede llamar al modelo varias veces: antes y después de cada
+herramienta) y lo acumula por sesión, con costo estimado y presupuesto.
+
+Por turno se separan:
+- prompt: entrada de la primera llamada del agente (sistema + historial + mensaje)
+- tool loop: entrada de las llamadas siguientes (se reenvía todo + resultados de herramientas)
+- completion: salida de las llamadas del agente
+- summary: entrada y salida de las llamadas que resumen el historial (tag
+  SUMMARY_TAG), que no son parte del loop del agente
+"""
+
+from typing import List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from utils.metrics import BUDGET_EXCEEDED
+
+# Tag de las llamadas al modelo que resumen el historial (ver make_llm_summarizer)
+SUMMARY_TAG = "summary"
+
+
+def estimate_cost(input_tokens: int, output_tokens: int,
+                  pricing: Optional[Tuple[float, float]]) -> float:
+    """Costo en USD según el precio por millón de tokens (entrada, salida); 0 si no hay precio"""
+    if pricing is None:
+        return 0.0
+    return (input_tokens * pricing[0] + output_tokens * pricing[1]) / 1_000_000
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Callback de LangChain que acumula los tokens de las llamadas al modelo de un turno"""
+
+    run_inline = True
+
+    def __init__(self, pricing: Optional[Tuple[float, float]] = None):
+        """
+        Args:
+            pricing: USD por millón de tokens (entrada, salida) del modelo
+        """
+        self.pricing = pricing
+        self.prompt_tokens = 0
+        self.tool_loop_tokens = 0
+        self.output_tokens = 0
+        self.summary_input_tokens = 0
+        self.summary_output_tokens = 0
+        self.agent_calls = 0
+        self.llm_calls = 0
+
+    def on_llm_end(self, response, *, tags: Optional[List[str]] = None, **kwargs):
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        self.add_usage(getattr(getattr(generation, "message", None), "usage_metadata", None),
+                       summary=SUMMARY_TAG in (tags or ()))
+
+    def add_usage(self, usage: Optional[dict], summary: bool = False):
+        """
+        Sumar una llamada al modelo: la primera del agente en el turno es el
+        prompt y las demás, el tool loop; las del resumen van aparte.
+        """
+        self.llm_calls += 1
+        if summary:
+            if usage:
+                self.summary_input_tokens += usage.get("input_tokens", 0)
+                self.summary_output_tokens += usage.get("output_tokens", 0)
+            return
+
+        self.agent_calls += 1
+        if usage:
+            if self.agent_calls == 1:
+                self.prompt_tokens += usage.get("input_tokens", 0)
+            else:
+                self.tool_loop_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    @property
+    def input_tokens(self) -> int:
+        """Entrada de las llamadas del agente (sin el resumen)"""
+        return self.prompt_tokens + self.tool_loop_tokens
+
+    @property
+    def summary_tokens(self) -> int:
+        return self.summary_input_tokens + self.summary_output_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens + self.summary_tokens
+
+    @property
+    def cost_usd(self) -> float:
+        return estimate_cost(self.input_tokens + self.summary_input_tokens,
+                             self.output_tokens + self.summary_output_tokens, self.pricing)
+
+    def to_dict(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.output_tokens,
+            "tool_loop_tokens": self.tool_loop_tokens,
+            "summary_tokens": self.summary_tokens,
+            "llm_calls": self.llm_calls,
+            "cost_usd": round(self.cost_usd, 6)
+        }
+
+
+class SessionUsage:
+    """Tokens y costo acumulados de una conversación"""
+
+    # Valor para sesiones guardadas en disco antes de separar el resumen
+    summary_tokens = 0
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_loop_tokens = 0
+        self.summary_tokens = 0
+        self.llm_calls = 0
+        self.cost_usd = 0.0
+        self.agent_turns = 0
+        self.last_turn: Optional[dict] = None
+        self.budget_exceeded = False
+
+    def add_turn(self, turn: TokenUsageHandler):
+        """Sumar el consumo de un turno atendido por el agente"""
+        self.prompt_tokens += turn.prompt_tokens
+        self.completion_tokens += turn.output_tokens
+        self.tool_loop_tokens += turn.tool_loop_tokens
+        self.summary_tokens += turn.summary_tokens
+        self.llm_calls += turn.llm_calls
+        self.cost_usd += turn.cost_usd
+        self.agent_turns += 1
+        self.last_turn = turn.to_dict()
+
+    @classmethod
+    def from_messages(cls, messages: List[BaseMessage],
+                      pricing: Optional[Tuple[float, float]] = None) -> "SessionUsage":
+        """Reconstruir el consumo desde el usage_metadata del historial (ej: al retomar un checkpoint)"""
+        usage, turn = cls(), None
+        for message in messages:
+            if isinstance(message, HumanMessage):
+                if turn is not None:
+                    usage.add_turn(turn)
+                turn = None
+            elif isinstance(message, AIMessage) and message.usage_metadata:
+                turn = turn or TokenUsageHandler(pricing)
+                turn.add_usage(message.usage_metadata)
+        if turn is not None:
+            usage.add_turn(turn)
+        return usage
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens + self.tool_loop_tokens + self.summary_tokens
+
+    def is_over_budget(self, budget: Optional[int]) -> bool:
+        return budget is not None and self.total_tokens > budget
+
+    def to_dict(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_loop_tokens": self.tool_loop_tokens,
+            "summary_tokens": self.summary_tokens,
+            "total_tokens": self.total_tokens,
+            "llm_calls": self.llm_calls,
+            "agent_turns": self.agent_turns,
+            "cost_usd": round(self.cost_usd, 6),
+            "budget_exceeded": self.budget_exceeded
+        }
+
+
+def enforce_session_budget(usage: SessionUsage, budget: Optional[int], action: str,
+                           context=None, trim_token_budget: int = 1000, trim_max_turns: int = 2) -> bool:
+    """
+    Aplicar el presupuesto de tokens de la sesión antes de llamar al agente.
+
+    Args:
+        usage: Consumo acumulado de la sesión
+        budget: Tokens máximos de la sesión (None = sin tope)
+        action: "trim" (contexto reducido) o "handoff" (derivar al 0800-ITTI)
+        context: ConversationContext de la sesión; sin contexto, "trim" deriva
+        trim_token_budget: Presupuesto de historial del contexto reducido
+        trim_max_turns: Turnos textuales del contexto reducido
+
+    Returns:
+        True si el turno se deriva al 0800-ITTI en lugar de ir al agente
+    """
+    if not usage.is_over_budget(budget):
+        return False
+    handoff = action != "trim" or context is None
+    if not usage.budget_exceeded:
+        usage.budget_exceeded = True
+        BUDGET_EXCEEDED.inc("handoff" if handoff else "trim")
+    if not handoff:
+        # Idempotente: también reaplica el recorte a un contexto restaurado
+        context.trim(trim_token_budget, trim_max_turns)
+    return handoff
@@ -0,0 +1,156 @@
+"""
+Trazas por turno
+Registra spans (inicio relativo y duración) de cada etapa de un turno:
+armado del prompt, router, cada llamada al modelo, cada herramienta,
+actualización del FSM y render. Se muestran como cascada en el Modo Debug
+y se pueden exportar como JSON lines para diagnosticar turnos lentos.
+
+Uso:
+    trace = TurnTrace(session_id, turn=3)
+    with trace.span("fsm"):
+        state_manager.update_state(...)
+    agent_executor.invoke(inputs, config={"callbacks": [trace.callback_handler()]})
+"""
+
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class TurnTrace:
+    """Spans de un turno, con tiempos relativos al inicio del turno"""
+
+    def __init__(self, session_id: str = "", turn: int = 0, start: Optional[float] = None):
+        """
+        Args:
+            session_id: Sesión o hilo de la conversación
+            turn: Número de turno dentro de la sesión
+            start: Inicio del turno (time.perf_counter); por defecto, ahora
+        """
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.turn = turn
+        self.started_at = time.time() - (time.perf_counter() - start if start is not None else 0.0)
+        self._origin = time.perf_counter() if start is None else start
+        self.spans: List[dict] = []
+
+    def add_span(self, name: str, kind: str, start: float, end: float, **attributes):
+        """Agregar un span medido con time.perf_counter"""
+        span = {
+            "name": name,
+            "kind": kind,
+            "start_ms": round((start - self._origin) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3)
+        }
+        if attributes:
+            span["attributes"] = attributes
+        self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, kind: Optional[str] = None, **attributes):
+        """Medir un bloque como span"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, kind or name, start, time.perf_counter(), **attributes)
+
+    def callback_handler(self) -> "TraceCallbackHandler":
+        """Callback de LangChain que agrega los spans del modelo y de las herramientas"""
+        return TraceCallbackHandler(self)
+
+    @property
+    def duration_ms(self) -> float:
+        """Duración del turno (fin del último span)"""
+        return max((span["start_ms"] + span["duration_ms"] for span in self.spans), default=0.0)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "session_id": self.session_id,
+            "turn": self.turn,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"])
+        }
+
+    def format_waterfall(self, width: int = 20) -> str:
+        """Cascada en texto monoespaciado (una línea por span)"""
+        total = self.duration_ms or 1.0
+        lines = []
+        for span in sorted(self.spans, key=lambda span: span["start_ms"]):
+            offset = int(span["start_ms"] / total * width)
+            length = max(1, round(span["duration_ms"] / total * width))
+            bar = (" " * offset + "█" * length)[:width].ljust(width)
+            lines.append(f"{span['name'][:16]:<16} |{bar}| {span['duration_ms']:>8.1f} ms")
+        return "\n".join(lines)
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Agrega a un TurnTrace un span por llamada al modelo y por herramienta"""
+
+    # En el mismo hilo/loop de la ejecución: los tiempos no incluyen saltos de executor
+    run_inline = True
+
+    def __init__(self, trace: TurnTrace):
+        self.trace = trace
+        self._started: Dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        model = (kwargs.get("metadata") or {}).get("ls_model_name") or "llm"
+        self._started[run_id] = (time.perf_counter(), model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        attributes = {}
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            attributes = {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
+        self.trace.add_span(started[1], "llm", started[0], time.perf_counter(), **attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.trace.add_span(started[1], "llm", started[0], time.perf_counter(), error=str(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), (serialized or {}).get("name") or kwargs.get("name", "tool"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.trace.add_span(started[1], "tool", started[0], time.perf_counter())
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.trace.add_span(started[1], "tool", started[0], time.perf_counter(), error=str(error))
+
+
+class TraceExporter:
+    """Exporta trazas como JSON lines (una línea por turno), thread-safe"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: TurnTrace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as trace_file:
+                trace_file.write(line)
+
+
+@lru_cache(maxsize=4)
+def get_trace_exporter(path: str) -> TraceExporter:
+    """Exportador compartido por todas las sesiones del proceso"""
+    return TraceExporter(path)
@@ -0,0 +1,97 @@
+"""
+Caché TTL + LRU thread-safe
+Guarda resultados por clave durante `ttl` segundos y, al superar `max_entries`,
+descarta el menos usado. Lleva contadores de aciertos/fallos para poder medir
+si el caché realmente ayuda.
+
+Cada clave tiene una generación que sube al invalidarla: quien consulta el
+backend la toma antes de la consulta y la pasa a set(), así un resultado
+leído antes de una invalidación no vuelve a entrar al caché después de ella.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Caché con expiración por tiempo y desalojo LRU"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0):
+        """
+        Args:
+            max_entries: Entradas máximas (al superarlas se descarta la menos usada)
+            ttl: Segundos que una entrada es válida
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obtener el valor vigente de una clave (None si no está o expiró)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, key: Hashable) -> int:
+        """Generación actual de una clave (tomarla antes de consultar el backend)"""
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Guardar un valor (reinicia su TTL).
+
+        Args:
+            generation: Generación tomada antes de calcular el valor; si la
+                clave se invalidó desde entonces, el valor no se guarda
+
+        Returns:
+            True si se guardó
+        """
+        with self._lock:
+            if generation is not None and self._generations.get(key, 0) != generation:
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, key: Hashable):
+        """Descartar una clave (si existe) y descartar los set() de consultas ya en curso"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Descartar todas las entradas"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Obtener aciertos, fallos, tasa de acierto e invalidaciones"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations
+            }